@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+draw/下基准测试CSV的统一加载
+支持三种格式：
+- 宽表（data.csv）：第一行为"Tools,基准1,基准2,..."，之后每行一个工具；空行分隔的后续块（unopt/percent/average）
+  使用同一个表头；第一列为Suite的行是各基准所属的测试集
+- 行表（mem.csv、opt.csv）：每行一个基准，第一列为名称；第一行不是数值时作为表头
+- 长表：表头包含benchmark、tool、value列，可选suite、repetition列，每行一次测量（重复测量为多行）
+数值统一为float64，空单元格和nan显式转为NaN；基准名称保留完整（例如"SqueezeNet 600"），
+图中需要短名称时用short_name。解析结果缓存为CSV旁边的.npz，CSV未变化时直接加载
+
+用法：
+    python bench_data.py data.csv mem.csv opt.csv
+"""
+
+import csv
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 缓存格式版本，变化时旧的.npz失效
+LOADER_VERSION = 1
+
+SUITE_ROW = 'Suite'
+
+
+def short_name(name):
+    """图中使用的短名称：名称中的第一个词（"lud 10240" -> "lud"）"""
+    parts = name.split()
+    return parts[0] if parts else name
+
+
+def _float(cell, path, line):
+    """单元格转为float，空单元格和nan为NaN，其他无法解析的内容报错"""
+    text = cell.strip()
+    if not text or text.lower() == 'nan':
+        return np.nan
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"{path}:{line}: not a number: {cell!r}") from None
+
+
+def _is_number(cell):
+    try:
+        float(cell)
+        return True
+    except ValueError:
+        return False
+
+
+def _read_rows(path):
+    """读取CSV，返回(行号, 去掉首尾空白的单元格)；空行（全部单元格为空）保留为[]"""
+    with open(path, 'r', newline='') as f:
+        rows = []
+        for line, row in enumerate(csv.reader(f), 1):
+            row = [cell.strip() for cell in row]
+            rows.append((line, row if any(row) else []))
+        return rows
+
+
+def _cache_path(path):
+    return path.with_name(path.name + '.npz')
+
+
+def _cached(path, layout, parse):
+    """带.npz缓存的解析：CSV的大小和修改时间与缓存中记录的一致时直接加载"""
+    path = Path(path)
+    st = os.stat(path)
+    stamp = np.array([LOADER_VERSION, st.st_size, st.st_mtime_ns], dtype=np.int64)
+    cache = _cache_path(path)
+    if cache.exists():
+        try:
+            with np.load(cache, allow_pickle=False) as data:
+                if str(data['_layout']) == layout and np.array_equal(data['_stamp'], stamp):
+                    return {key: data[key] for key in data.files if not key.startswith('_')}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: ignoring cache {cache}: {e}")
+    table = parse(path)
+    tmp = cache.with_name(cache.name + '.tmp')
+    try:
+        with open(tmp, 'wb') as f:
+            np.savez(f, _layout=np.array(layout), _stamp=stamp, **table)
+        os.replace(tmp, cache)
+    except OSError as e:
+        print(f"Warning: cannot write cache {cache}: {e}")
+    return table
+
+
+def _parse_wide(path):
+    header = None
+    block = 0
+    tools, blocks, values, suites = [], [], [], None
+    for line, row in _read_rows(path):
+        if not row:
+            if header is not None and tools:
+                block += 1
+            continue
+        if header is None:
+            header = row
+            continue
+        n = len(header) - 1
+        cells = (row[1:] + [''] * n)[:n]
+        if row[0] == SUITE_ROW:
+            suites = cells
+            continue
+        tools.append(row[0])
+        blocks.append(block)
+        values.append([_float(cell, path, line) for cell in cells])
+    if header is None:
+        raise ValueError(f"{path}: empty table")
+    table = {
+        'benchmarks': np.array(header[1:], dtype=str),
+        'tools': np.array(tools, dtype=str),
+        'block': np.array(blocks, dtype=np.int16),
+        'values': np.array(values, dtype=np.float64).reshape(len(tools), len(header) - 1)
+    }
+    if suites is not None:
+        table['suites'] = np.array(suites, dtype=str)
+    return table
+
+
+def _parse_rows(path):
+    rows = [(line, row) for line, row in _read_rows(path) if row]
+    columns = None
+    if rows and not all(_is_number(cell) or cell.lower() in ('', 'nan') for cell in rows[0][1][1:]):
+        columns = rows[0][1][1:]
+        rows = rows[1:]
+    width = max((len(row) - 1 for _, row in rows), default=0) if columns is None else len(columns)
+    if columns is None:
+        columns = [str(i) for i in range(width)]
+    suite_column = next((i for i, c in enumerate(columns) if c.lower() == 'suite'), None)
+    benchmarks, suites, values = [], [], []
+    for line, row in rows:
+        cells = (row[1:] + [''] * width)[:width]
+        benchmarks.append(row[0])
+        if suite_column is not None:
+            suites.append(cells[suite_column])
+        values.append([_float(cell, path, line) for i, cell in enumerate(cells) if i != suite_column])
+    numeric = [c for i, c in enumerate(columns) if i != suite_column]
+    table = {
+        'benchmarks': np.array(benchmarks, dtype=str),
+        'columns': np.array(numeric, dtype=str),
+        'values': np.array(values, dtype=np.float64).reshape(len(benchmarks), len(numeric))
+    }
+    if suite_column is not None:
+        table['suites'] = np.array(suites, dtype=str)
+    return table
+
+
+def _parse_long(path):
+    rows = [(line, row) for line, row in _read_rows(path) if row]
+    if not rows:
+        raise ValueError(f"{path}: empty table")
+    header = [c.lower() for c in rows[0][1]]
+    missing = {'benchmark', 'tool', 'value'} - set(header)
+    if missing:
+        raise ValueError(f"{path}: missing columns {', '.join(sorted(missing))}")
+    index = {name: header.index(name) for name in header}
+    records = {name: [] for name in ('suites', 'benchmarks', 'tools', 'repetitions', 'values')}
+    for line, row in rows[1:]:
+        row = row + [''] * (len(header) - len(row))
+        records['suites'].append(row[index['suite']] if 'suite' in index else '')
+        records['benchmarks'].append(row[index['benchmark']])
+        records['tools'].append(row[index['tool']])
+        records['repetitions'].append(int(row[index['repetition']] or 0) if 'repetition' in index else 0)
+        records['values'].append(_float(row[index['value']], path, line))
+    return {
+        'suites': np.array(records['suites'], dtype=str),
+        'benchmarks': np.array(records['benchmarks'], dtype=str),
+        'tools': np.array(records['tools'], dtype=str),
+        'repetitions': np.array(records['repetitions'], dtype=np.int32),
+        'values': np.array(records['values'], dtype=np.float64)
+    }
+
+
+def load_wide(path):
+    """加载宽表，返回benchmarks、tools、block（行所在的块）、values（工具 x 基准），有Suite行时还有suites"""
+    return _cached(path, 'wide', _parse_wide)
+
+
+def load_rows(path):
+    """加载行表，返回benchmarks、columns、values（基准 x 列），有suite列时还有suites"""
+    return _cached(path, 'rows', _parse_rows)
+
+
+def load_long(path):
+    """加载长表，返回每次测量的suites、benchmarks、tools、repetitions、values"""
+    return _cached(path, 'long', _parse_long)
+
+
+def block_rows(table, block=0):
+    """宽表中某个块的(工具名, 数值矩阵)"""
+    mask = table['block'] == block
+    return table['tools'][mask], table['values'][mask]
+
+
+def wide_to_long(table, block=0):
+    """宽表的一个块转为长表格式（每个工具x基准一次测量，repetition为0）"""
+    tools, values = block_rows(table, block)
+    n_tools, n_benchmarks = values.shape
+    suites = table['suites'] if 'suites' in table else np.full(n_benchmarks, '', dtype=str)
+    return {
+        'suites': np.tile(suites, n_tools),
+        'benchmarks': np.tile(table['benchmarks'], n_tools),
+        'tools': np.repeat(tools, n_benchmarks),
+        'repetitions': np.zeros(n_tools * n_benchmarks, dtype=np.int32),
+        'values': values.ravel()
+    }
+
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        with open(path, 'r', newline='') as f:
+            first = next(csv.reader(f), [])
+        if first and first[0].strip() == 'Tools':
+            table = load_wide(path)
+        elif {'benchmark', 'tool', 'value'} <= {c.strip().lower() for c in first}:
+            table = load_long(path)
+        else:
+            table = load_rows(path)
+        print(f"{path}:")
+        for key, value in table.items():
+            nans = int(np.isnan(value).sum()) if value.dtype.kind == 'f' else '-'
+            print(f"  {key}: {value.dtype} {value.shape}, NaN: {nans}")
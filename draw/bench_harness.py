@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+重复测量的开销基准测试
+从清单（CSV：suite,name,command[,args][,cwd][,timeout]）读取负载，在每个工具包装器下各运行若干次
+（先做预热运行，超时或非零退出码的运行记为NaN），记录每次运行的墙钟时间。
+工具包装器是加在命令前面的参数前缀，可以用--tool NAME=PREFIX替换，本地测试时可以用任意替代命令。
+输出：
+- runs.csv：每次运行一行（长表格式，bench_data.load_long可以直接加载）
+- data.csv：draw.py使用的宽表（各次运行的中位数），Suite行来自清单，draw.py据此分组
+- slowdown.csv：各测试集相对第一个工具的几何平均减速比，以及bootstrap置信区间（NumPy向量化）
+
+用法：
+    python bench_harness.py workloads.csv --repetitions 5 --warmup 1 --out-dir bench_results
+    python bench_harness.py workloads.csv --tool vanilla= --tool CuSan="env LD_PRELOAD=./libcusan.so"
+    python bench_harness.py --from-runs bench_results/runs.csv   # 只重新计算统计
+"""
+
+import argparse
+import csv
+import os
+import shlex
+import subprocess
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from bench_data import load_long
+
+# 默认的工具包装器（第一个为基线）；CuSan通过LD_PRELOAD加载，库路径由CUSAN_PRELOAD指定
+DEFAULT_TOOLS = {
+    'vanilla': [],
+    'CuSan': ['env', f"LD_PRELOAD={os.environ.get('CUSAN_PRELOAD', 'libcusan.so')}"],
+    'compute-sanitizer': ['compute-sanitizer', '--tool', 'memcheck']
+}
+
+DEFAULT_TIMEOUT = 3600
+BOOTSTRAP_SAMPLES = 10000
+# 每块bootstrap重采样的下标数上限（int64，32 MB），内存占用与n_boot无关
+BOOTSTRAP_CHUNK_ELEMENTS = 1 << 22
+CONFIDENCE = 0.95
+
+
+def load_manifest(path):
+    """读取负载清单，返回负载列表（argv为命令和参数拆分后的列表）"""
+    with open(path, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        missing = {'suite', 'name', 'command'} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"{path}: missing columns {', '.join(sorted(missing))}")
+        workloads = []
+        for row in reader:
+            if not row['name'] or row['name'].startswith('#'):
+                continue
+            timeout = (row.get('timeout') or '').strip()
+            workloads.append({
+                'suite': row['suite'].strip(),
+                'name': row['name'].strip(),
+                'argv': shlex.split(row['command']) + shlex.split(row.get('args') or ''),
+                'cwd': (row.get('cwd') or '').strip() or None,
+                'timeout': float(timeout) if timeout else None
+            })
+    return workloads
+
+
+def parse_tool(spec):
+    """--tool NAME=PREFIX，PREFIX为空表示直接运行"""
+    name, _, prefix = spec.partition('=')
+    return name.strip(), shlex.split(prefix)
+
+
+def run_once(argv, cwd=None, timeout=DEFAULT_TIMEOUT):
+    """运行一次，返回(墙钟秒数, 状态)；状态为ok、timeout、exit N或启动失败的错误信息"""
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(argv, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, timeout=timeout)
+        status = 'ok' if result.returncode == 0 else f"exit {result.returncode}"
+    except subprocess.TimeoutExpired:
+        status = 'timeout'
+    except OSError as e:
+        status = f"error: {e.strerror}"
+    return time.perf_counter() - start, status
+
+
+def run_harness(workloads, tools, repetitions=5, warmup=1, timeout=DEFAULT_TIMEOUT):
+    """在每个工具下运行每个负载，返回每次运行的记录
+
+    预热运行不记录；每次重复中依次运行所有工具（交错运行，机器状态的漂移对各工具的影响相同）
+    """
+    records = []
+    for workload in workloads:
+        limit = workload['timeout'] or timeout
+        for tool, prefix in tools.items():
+            for _ in range(warmup):
+                run_once(prefix + workload['argv'], workload['cwd'], limit)
+        for rep in range(repetitions):
+            for tool, prefix in tools.items():
+                seconds, status = run_once(prefix + workload['argv'], workload['cwd'], limit)
+                records.append({'suite': workload['suite'], 'benchmark': workload['name'], 'tool': tool,
+                                'repetition': rep, 'value': seconds if status == 'ok' else float('nan'),
+                                'status': status})
+                if status != 'ok':
+                    print(f"  {workload['name']} [{tool}] #{rep}: {status}")
+        print(f"{workload['suite']}/{workload['name']}: done")
+    return records
+
+
+def write_runs(path, records):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['suite', 'benchmark', 'tool', 'repetition', 'value', 'status'])
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def records_table(records):
+    """记录转为与load_long相同的数组格式"""
+    return {
+        'suites': np.array([r['suite'] for r in records], dtype=str),
+        'benchmarks': np.array([r['benchmark'] for r in records], dtype=str),
+        'tools': np.array([r['tool'] for r in records], dtype=str),
+        'repetitions': np.array([r['repetition'] for r in records], dtype=np.int32),
+        'values': np.array([r['value'] for r in records], dtype=np.float64)
+    }
+
+
+def _first_order(values):
+    """按首次出现的顺序去重"""
+    _, first = np.unique(values, return_index=True)
+    return values[np.sort(first)]
+
+
+def time_cube(table):
+    """长表转为(工具, 基准, 重复次数)的时间数组，缺失的运行为NaN
+
+    返回(cube, 工具名, 基准名, 各基准的测试集)，工具和基准按首次出现的顺序
+    """
+    tools = _first_order(table['tools'])
+    benchmarks = _first_order(table['benchmarks'])
+    tool_index = {t: i for i, t in enumerate(tools)}
+    bench_index = {b: i for i, b in enumerate(benchmarks)}
+    t = np.array([tool_index[x] for x in table['tools']], dtype=np.intp)
+    b = np.array([bench_index[x] for x in table['benchmarks']], dtype=np.intp)
+    cube = np.full((len(tools), len(benchmarks), int(table['repetitions'].max()) + 1 if len(b) else 0), np.nan)
+    cube[t, b, table['repetitions']] = table['values']
+    suites = np.empty(len(benchmarks), dtype=table['suites'].dtype)
+    suites[b] = table['suites']
+    return cube, tools, benchmarks, suites
+
+
+def _nanmean(values, axis):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmean(values, axis=axis)
+
+
+def geomean_slowdown(base, tool, n_boot=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE, rng=None):
+    """多个基准的几何平均减速比及其bootstrap置信区间
+
+    base、tool为(基准, 重复次数)的时间数组；每个基准取各次运行的平均值，减速比为tool/base。
+    bootstrap在每个基准内对重复运行有放回地重采样（base和tool独立），
+    n_boot个样本分块向量化计算，每块的下标数不超过BOOTSTRAP_CHUNK_ELEMENTS。返回(点估计, 下界, 上界, 参与的基准数)
+    """
+    valid = ~np.isnan(base).all(axis=1) & ~np.isnan(tool).all(axis=1)
+    base, tool = base[valid], tool[valid]
+    n, reps = base.shape
+    if n == 0:
+        return np.nan, np.nan, np.nan, 0
+    point = np.exp(np.mean(np.log(_nanmean(tool, 1) / _nanmean(base, 1))))
+    if rng is None:
+        rng = np.random.default_rng(0)
+    rows = np.arange(n)[None, :, None]
+    chunk = max(1, BOOTSTRAP_CHUNK_ELEMENTS // (n * reps))
+    parts = []
+    for start in range(0, n_boot, chunk):
+        size = (min(chunk, n_boot - start), n, reps)
+        base_boot = _nanmean(base[rows, rng.integers(0, reps, size=size)], 2)
+        tool_boot = _nanmean(tool[rows, rng.integers(0, reps, size=size)], 2)
+        # 某个样本恰好只抽到失败的运行时该基准为NaN，几何平均忽略它
+        parts.append(np.exp(_nanmean(np.log(tool_boot / base_boot), 1)))
+    boot = np.concatenate(parts)
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(boot, [alpha, 1 - alpha])
+    return float(point), float(low), float(high), int(n)
+
+
+def slowdown_table(cube, tools, suites, n_boot=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE, seed=0):
+    """各测试集（以及All）中每个工具相对第一个工具的几何平均减速比"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    groups = [(suite, suites == suite) for suite in _first_order(suites)] + [('All', np.ones(len(suites), bool))]
+    for t in range(1, len(tools)):
+        for suite, mask in groups:
+            point, low, high, n = geomean_slowdown(cube[0][mask], cube[t][mask], n_boot, confidence, rng)
+            rows.append({'suite': suite, 'tool': tools[t], 'baseline': tools[0], 'geomean_slowdown': point,
+                         'ci_low': low, 'ci_high': high, 'benchmarks': n})
+    return rows
+
+
+def write_wide(path, cube, tools, benchmarks, suites):
+    """写出draw.py使用的宽表：表头、Suite行和每个工具一行（各次运行的中位数）"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        medians = np.nanmedian(cube, axis=2)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Tools'] + list(benchmarks))
+        writer.writerow(['Suite'] + list(suites))
+        for tool, row in zip(tools, medians):
+            writer.writerow([tool] + ['nan' if np.isnan(v) else f"{v:.6g}" for v in row])
+
+
+def write_slowdown(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['suite'])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_slowdown(rows, confidence=CONFIDENCE):
+    print(f"\nGeomean slowdown vs {rows[0]['baseline'] if rows else '-'} ({confidence:.0%} bootstrap CI):")
+    for row in rows:
+        print(f"  {row['tool']:>20s}  {row['suite']:<10s} {row['geomean_slowdown']:8.3f}x  "
+              f"[{row['ci_low']:.3f}, {row['ci_high']:.3f}]  (n={row['benchmarks']})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Repeated-measurement overhead benchmark harness')
+    parser.add_argument('manifest', nargs='?', help='workload manifest CSV (suite,name,command[,args][,cwd][,timeout])')
+    parser.add_argument('--tool', action='append', default=None, metavar='NAME=PREFIX',
+                        help='tool wrapper (repeatable, first is the baseline); default: ' + ', '.join(DEFAULT_TOOLS))
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='seconds per run')
+    parser.add_argument('--out-dir', default='bench_results')
+    parser.add_argument('--from-runs', default=None, help='recompute outputs from an existing runs.csv')
+    parser.add_argument('--bootstrap', type=int, default=BOOTSTRAP_SAMPLES)
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if args.from_runs:
+        table = load_long(args.from_runs)
+    elif args.manifest:
+        tools = dict(parse_tool(spec) for spec in args.tool) if args.tool else DEFAULT_TOOLS
+        records = run_harness(load_manifest(args.manifest), tools, args.repetitions, args.warmup, args.timeout)
+        write_runs(out_dir / 'runs.csv', records)
+        print(f"Saved: {out_dir / 'runs.csv'}")
+        table = records_table(records)
+    else:
+        parser.error('a manifest or --from-runs is required')
+
+    if not len(table['values']):
+        print("No runs recorded")
+        sys.exit(1)
+    cube, tools, benchmarks, suites = time_cube(table)
+    rows = slowdown_table(cube, tools, suites, args.bootstrap, args.confidence, args.seed)
+    write_wide(out_dir / 'data.csv', cube, tools, benchmarks, suites)
+    write_slowdown(out_dir / 'slowdown.csv', rows)
+    print_slowdown(rows, args.confidence)
+    print(f"\nSaved: {out_dir / 'data.csv'}, {out_dir / 'slowdown.csv'}")
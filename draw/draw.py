@@ -1,33 +1,18 @@
 from matplotlib import pyplot as plt
 import matplotlib.ticker as ticker
 import matplotlib
-from csv import reader
+import sys
 import numpy as np
 
-matplotlib.use('qtagg')
+from bench_data import block_rows, load_wide, short_name
 
-reader = reader(open('data.csv', 'r'))
-status = "HEADER"
+# 默认使用data.csv，也可以传入bench_harness.py生成的data.csv
+table = load_wide(sys.argv[1] if len(sys.argv) > 1 else 'data.csv')
+benchmarks = table["benchmarks"]
+xticks = np.array(range(0, len(benchmarks)))
 
-table = {"header": None, "data": []}
-for row in reader:
-    row = [x.strip() for x in row]
-    row = list(filter(lambda x: x != '', row))
-    row = [x.split()[0] for x in row]
-
-    if status == "HEADER":
-        status = "DATA"
-        table["header"] = row
-    elif status == "DATA" and len(row) > 0:
-        table["data"].append(row)
-    elif status == "DATA" and len(row) == 0:
-        status = "HEADER"
-        break
-
-xticks = np.array(range(0, len(table["header"]) - 1))
-
-x = table["header"]
-y_list = np.array([[float(row[i]) for i in range(1, len(row))] for row in table["data"]])
+# 第一个块：vanilla、CuSan、compute-sanitizer
+tools, y_list = block_rows(table)
 
 plt.figure(figsize=(20, 3))
 cs = plt.get_cmap('gray', 3)
@@ -43,20 +28,17 @@ plt.bar(xticks - 0.3, y_list[0] / y_list[0], label='\\textbf{baseline}', width=0
 plt.bar(xticks, y_list[1] / y_list[0], label='\\textbf{\\textsc{CuSan}}', width=0.2, color='0.5')
 plt.bar(xticks + 0.3, y_list[2] / y_list[0], label='\\textbf{compute-sanitizer}', width=0.2, color='0.8')
 
-plt.text(x=-0.4, y=0.64, s="\\textbf{Tango}", ha='left', va='top',
-         fontsize=12, transform=plt.gca().get_xaxis_transform())
-plt.axvline(x=5.5, color='black', linestyle='--', linewidth=0.8)
-plt.text(x=5.6, y=0.64, s="\\textbf{Rodinia}", ha='left', va='top',
-         fontsize=12, transform=plt.gca().get_xaxis_transform())
-plt.axvline(x=22.5, color='black', linestyle='--', linewidth=0.8)
-plt.text(x=22.6, y=0.64, s="\\textbf{PolyBench}", ha='left', va='top',
-         fontsize=12, transform=plt.gca().get_xaxis_transform())
-plt.axvline(x=41.5, color='black', linestyle='--', linewidth=0.8)
-plt.text(x=41.6, y=0.64, s="\\textbf{LLaMA}", ha='left', va='top',
-         fontsize=12, transform=plt.gca().get_xaxis_transform())
-
-plt.xticks(xticks, labels=table["header"][1:], rotation=30, ha='right')
-plt.xlim(-0.5, len(table["header"]) - 1 - 0.5)
+# 测试集分组来自Suite行：每组的第一个基准之前画分隔线，并标注测试集名称
+suites = table["suites"]
+starts = [i for i in range(len(suites)) if i == 0 or suites[i] != suites[i - 1]]
+for start in starts:
+    if start > 0:
+        plt.axvline(x=start - 0.5, color='black', linestyle='--', linewidth=0.8)
+    plt.text(x=start - 0.4, y=0.64, s="\\textbf{%s}" % suites[start], ha='left', va='top',
+             fontsize=12, transform=plt.gca().get_xaxis_transform())
+
+plt.xticks(xticks, labels=[short_name(name) for name in benchmarks], rotation=30, ha='right')
+plt.xlim(-0.5, len(benchmarks) - 0.5)
 plt.legend(fontsize=12)
 
 plt.ylabel('Execution time (s)\n($\\leftarrow$ is better)', fontsize=15)
@@ -1,8 +1,10 @@
-import csv
+import sys
 import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
 
+from bench_data import load_rows
+
 matplotlib.rcParams.update({
     "text.usetex": True,
     "font.size": 12,
@@ -11,30 +13,34 @@ matplotlib.rcParams.update({
     "axes.unicode_minus": False  # 让负号正常显示
 })
 
-reader = csv.reader(open('mem.csv', 'r'))
-rows = []
-max_abs = [(0, "")] * 3
-max_per = [(0, "")] * 3
-
-total = [0] * 4
-
-for row in reader:
-    print(row)
-    if len(row) < 5:
-        continue
-    name = row[0]
-    row = [float(c) for c in row[1:]]
-    for i in range(1, 4):
-        print(row[i])
-        if row[i] - row[0] > max_abs[i - 1][0]:
-            max_abs[i - 1] = (row[i] - row[0], name)
-
-        if row[i] / row[0] > max_per[i - 1][0]:
-            max_per[i - 1] = (row[i] / row[0], name)
+# 默认使用mem.csv，也可以传入mem_sampler.py生成的文件（带表头和suite列）
+table = load_rows(sys.argv[1] if len(sys.argv) > 1 else 'mem.csv')
+# 每行：基准名, 原始占用, 以及三种工具下的占用
+names = table['benchmarks']
+values = table['values']
+columns = table['columns']
+suites = table['suites'] if 'suites' in table else np.full(len(names), 'All')
+# 有缺失值（NaN）的行不参与比较
+valid = ~np.isnan(values).any(axis=1)
+if not valid.all():
+    print(f"Skipping rows with missing values: {', '.join(names[~valid])}")
+names, values, suites = names[valid], values[valid], suites[valid]
 
-    for i in range(4):
-        total[i] += row[i]
+diff_abs = values[:, 1:] - values[:, :1]
+diff_per = values[:, 1:] / values[:, :1]
+for i in range(values.shape[1] - 1):
+    j = int(np.argmax(diff_abs[:, i]))
+    k = int(np.argmax(diff_per[:, i]))
+    print(f"Max absolute difference for column {i + 2}: {diff_abs[j, i]} in {names[j]}")
+    print(f"Max percentage difference for column {i + 2}: {diff_per[k, i]} in {names[k]}")
 
-for i in range(3):
-    print(f"Max absolute difference for column {i + 2}: {max_abs[i][0]} in {max_abs[i][1]}")
-    print(f"Max percentage difference for column {i + 2}: {max_per[i][0]} in {max_per[i][1]}")
+# 各测试集中相对原始占用的倍数分布
+print("\nOverhead ratio by suite (min / median / geomean / p90 / max):")
+for suite in dict.fromkeys(suites):
+    mask = suites == suite
+    for i in range(values.shape[1] - 1):
+        ratio = diff_per[mask, i]
+        label = f"column {i + 2}" if columns[i + 1].isdigit() else f"column {i + 2} ({columns[i + 1]})"
+        print(f"  {suite:<10s} {label}, n={len(ratio)}: "
+              f"{ratio.min():.3f} / {np.median(ratio):.3f} / {np.exp(np.mean(np.log(ratio))):.3f} / "
+              f"{np.quantile(ratio, 0.9):.3f} / {ratio.max():.3f}")
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+进程树的峰值内存采样
+启动负载后，后台线程按固定间隔采样整个进程树的RSS（直接读取/proc，不依赖psutil），
+以及通过可插拔后端得到的显存占用，记录峰值、按时间加权的平均值和一条紧凑的时间线
+（点数超过上限时隔点抽稀并加倍间隔，长度有界）。采样线程自身的CPU时间也会记录，用于衡量采样开销。
+清单模式对清单中的每个负载、每个工具各测量一次，结果写为mem.csv格式（每行一个基准：名称、测试集、各工具的峰值）
+
+用法：
+    python mem_sampler.py run -- ./a.out args            # 测量单个命令
+    python mem_sampler.py manifest workloads.csv --out mem_measured.csv [--device nvml] [--interval 0.01]
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from bench_harness import DEFAULT_TIMEOUT, DEFAULT_TOOLS, load_manifest, parse_tool
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+DEFAULT_INTERVAL = 0.01
+# 时间线最多保留的点数
+TIMELINE_POINTS = 512
+
+
+def process_tree(pid):
+    """pid及其全部子孙进程；内核提供/proc/PID/task/TID/children时沿之遍历，否则扫描/proc"""
+    try:
+        tasks = os.listdir(f'/proc/{pid}/task')
+    except OSError:
+        return []
+    if os.path.exists(f'/proc/{pid}/task/{tasks[0]}/children'):
+        pids, stack = [], [pid]
+        while stack:
+            p = stack.pop()
+            pids.append(p)
+            try:
+                for tid in os.listdir(f'/proc/{p}/task'):
+                    with open(f'/proc/{p}/task/{tid}/children') as f:
+                        stack.extend(int(c) for c in f.read().split())
+            except OSError:
+                continue
+        return pids
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # comm可能包含空格和括号，ppid在最后一个')'之后的第二个字段
+                    parents[int(entry)] = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    pids, stack = [], [pid]
+    while stack:
+        p = stack.pop()
+        pids.append(p)
+        stack.extend(child for child, parent in parents.items() if parent == p)
+    return pids
+
+
+def tree_rss(pids):
+    """进程树的RSS总和（字节），读取/proc/PID/statm的第二个字段"""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                total += int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+def nvml_backend():
+    """通过NVML查询进程的显存占用；没有安装pynvml或没有GPU时返回None"""
+    try:
+        import pynvml
+        pynvml.nvmlInit()
+        handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(pynvml.nvmlDeviceGetCount())]
+    except Exception as e:
+        print(f"Warning: NVML unavailable ({e}), device memory disabled")
+        return None
+
+    def device_memory(pids):
+        pids = set(pids)
+        total = 0
+        for handle in handles:
+            for proc in pynvml.nvmlDeviceGetComputeRunningProcesses(handle):
+                if proc.pid in pids and proc.usedGpuMemory:
+                    total += proc.usedGpuMemory
+        return total
+    return device_memory
+
+
+def nvidia_smi_backend():
+    """通过nvidia-smi查询显存占用（每次调用需要几十毫秒，适合较大的采样间隔）"""
+    def device_memory(pids):
+        pids = set(pids)
+        try:
+            out = subprocess.run(['nvidia-smi', '--query-compute-apps=pid,used_memory', '--format=csv,noheader,nounits'],
+                                 capture_output=True, text=True, timeout=5).stdout
+        except (OSError, subprocess.TimeoutExpired):
+            return 0
+        total = 0
+        for line in out.splitlines():
+            parts = [p.strip() for p in line.split(',')]
+            if len(parts) == 2 and parts[0].isdigit() and int(parts[0]) in pids and parts[1].isdigit():
+                total += int(parts[1]) << 20
+        return total
+    return device_memory
+
+
+# 显存后端：名称 -> 构造函数，构造函数返回device_memory(pids)或None
+DEVICE_BACKENDS = {
+    'none': lambda: None,
+    'nvml': nvml_backend,
+    'nvidia-smi': nvidia_smi_backend
+}
+
+
+def new_timeline(capacity=TIMELINE_POINTS):
+    return {'points': [], 'stride': 1, 'count': 0, 'capacity': capacity}
+
+
+def timeline_add(timeline, point):
+    """每stride个样本保留一个；点数达到上限时隔点抽稀并加倍stride"""
+    if timeline['count'] % timeline['stride'] == 0:
+        timeline['points'].append(point)
+        if len(timeline['points']) >= timeline['capacity']:
+            timeline['points'] = timeline['points'][::2]
+            timeline['stride'] *= 2
+    timeline['count'] += 1
+
+
+def _sample_loop(pid, interval, device_memory, stats, stop):
+    start = time.perf_counter()
+    cpu = 0.0
+    last_t = None
+    while True:
+        cpu_start = time.thread_time()
+        now = time.perf_counter()
+        pids = process_tree(pid)
+        rss = tree_rss(pids)
+        device = device_memory(pids) if device_memory is not None else 0
+        t = now - start
+        if last_t is not None:
+            # 按时间加权：上一个样本的值持续到这个样本
+            dt = t - last_t
+            stats['rss_area'] += stats['last_rss'] * dt
+            stats['device_area'] += stats['last_device'] * dt
+        last_t = t
+        stats['last_rss'], stats['last_device'] = rss, device
+        stats['peak_rss'] = max(stats['peak_rss'], rss)
+        stats['peak_device'] = max(stats['peak_device'], device)
+        stats['samples'] += 1
+        stats['duration'] = t
+        timeline_add(stats['timeline'], (round(t, 4), rss, device))
+        cpu += time.thread_time() - cpu_start
+        stats['sampler_cpu'] = cpu
+        if stop.wait(interval):
+            break
+
+
+def measure(argv, interval=DEFAULT_INTERVAL, device_memory=None, timeout=DEFAULT_TIMEOUT, cwd=None):
+    """运行命令并采样其进程树的内存，返回测量结果（字节）"""
+    stats = {'peak_rss': 0, 'peak_device': 0, 'rss_area': 0.0, 'device_area': 0.0, 'last_rss': 0,
+             'last_device': 0, 'samples': 0, 'duration': 0.0, 'sampler_cpu': 0.0, 'timeline': new_timeline()}
+    start = time.perf_counter()
+    try:
+        proc = subprocess.Popen(argv, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL)
+    except OSError as e:
+        return {'status': f"error: {e.strerror}"}
+    stop = threading.Event()
+    sampler = threading.Thread(target=_sample_loop, args=(proc.pid, interval, device_memory, stats, stop),
+                               daemon=True)
+    sampler.start()
+    try:
+        returncode = proc.wait(timeout=timeout)
+        status = 'ok' if returncode == 0 else f"exit {returncode}"
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        status = 'timeout'
+    stop.set()
+    sampler.join()
+    wall = time.perf_counter() - start
+    duration = stats['duration'] or 1e-9
+    return {
+        'status': status,
+        'wall': wall,
+        'peak_rss': stats['peak_rss'],
+        'avg_rss': stats['rss_area'] / duration if stats['samples'] > 1 else stats['peak_rss'],
+        'peak_device': stats['peak_device'],
+        'avg_device': stats['device_area'] / duration if stats['samples'] > 1 else stats['peak_device'],
+        'samples': stats['samples'],
+        'sampler_cpu': stats['sampler_cpu'],
+        # 采样线程占用的CPU时间相对负载墙钟时间的比例
+        'overhead': stats['sampler_cpu'] / wall if wall > 0 else 0.0,
+        'timeline': stats['timeline']['points']
+    }
+
+
+def format_result(result):
+    if result['status'] != 'ok' and 'wall' not in result:
+        return result['status']
+    return (f"{result['status']}, wall {result['wall']:.2f}s, peak RSS {result['peak_rss'] / 2**20:.1f} MiB, "
+            f"avg RSS {result['avg_rss'] / 2**20:.1f} MiB, peak device {result['peak_device'] / 2**20:.1f} MiB, "
+            f"{result['samples']} samples, sampler overhead {result['overhead']:.2%}")
+
+
+def measure_manifest(workloads, tools, interval=DEFAULT_INTERVAL, device_memory=None, timeout=DEFAULT_TIMEOUT,
+                     metric='peak_rss'):
+    """对每个负载、每个工具测量一次，返回(mem.csv的行, 全部测量结果)"""
+    rows, results = [], []
+    for workload in workloads:
+        row = [workload['name'], workload['suite']]
+        for tool, prefix in tools.items():
+            result = measure(prefix + workload['argv'], interval, device_memory,
+                             workload['timeout'] or timeout, workload['cwd'])
+            print(f"{workload['name']} [{tool}]: {format_result(result)}")
+            result.update({'suite': workload['suite'], 'benchmark': workload['name'], 'tool': tool})
+            results.append(result)
+            row.append(result[metric] if result['status'] == 'ok' else 'nan')
+        rows.append(row)
+    return rows, results
+
+
+def write_mem_csv(path, rows, tools):
+    """mem.csv格式：名称、测试集、各工具的值；表头让bench_data.load_rows识别suite列"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['benchmark', 'suite'] + list(tools))
+        writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sample peak memory of a process tree')
+    sub = parser.add_subparsers(dest='mode', required=True)
+    run_parser = sub.add_parser('run', help='measure a single command')
+    run_parser.add_argument('command', nargs=argparse.REMAINDER)
+    manifest_parser = sub.add_parser('manifest', help='measure every workload under every tool')
+    manifest_parser.add_argument('manifest')
+    manifest_parser.add_argument('--tool', action='append', default=None, metavar='NAME=PREFIX')
+    manifest_parser.add_argument('--out', default='mem_measured.csv')
+    manifest_parser.add_argument('--metric', default=None,
+                                 choices=['peak_rss', 'avg_rss', 'peak_device', 'avg_device'],
+                                 help='value written to the CSV (default: peak_device with a device backend, '
+                                      'else peak_rss)')
+    manifest_parser.add_argument('--details', default=None, help='write all results with timelines as JSON')
+    for p in (run_parser, manifest_parser):
+        p.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='seconds between samples')
+        p.add_argument('--device', default='none', choices=list(DEVICE_BACKENDS))
+        p.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    args = parser.parse_args()
+
+    device_memory = DEVICE_BACKENDS[args.device]()
+    if args.mode == 'run':
+        command = args.command[1:] if args.command[:1] == ['--'] else args.command
+        if not command:
+            parser.error('no command given')
+        result = measure(command, args.interval, device_memory, args.timeout)
+        print(format_result(result))
+        sys.exit(0 if result['status'] == 'ok' else 1)
+
+    tools = dict(parse_tool(spec) for spec in args.tool) if args.tool else DEFAULT_TOOLS
+    metric = args.metric or ('peak_device' if device_memory is not None else 'peak_rss')
+    rows, results = measure_manifest(load_manifest(args.manifest), tools, args.interval, device_memory,
+                                     args.timeout, metric)
+    write_mem_csv(args.out, rows, tools)
+    print(f"Saved: {args.out} ({metric})")
+    if args.details:
+        with open(args.details, 'w') as f:
+            json.dump(results, f)
+        print(f"Saved: {args.details}")
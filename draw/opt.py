@@ -1,20 +1,25 @@
-import csv
+from pathlib import Path
+
 import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
 
-reader = csv.reader(open('opt.csv', 'r'))
-
-rows = []
-for row in reader:
-    rows.append(row)
-
-y1 = []
-y2 = []
-
-for row in rows[1:]:
-    y1.append(float(row[1]))
-    y2.append(float(row[2]))
+from bench_data import load_rows
+from perf_history import HISTORY_DB, open_history, opt_view
+
+# 有历史数据库时取最新一次同时包含original和opt的运行，否则使用opt.csv
+view = None
+if Path(HISTORY_DB).exists():
+    conn = open_history(HISTORY_DB)
+    view = opt_view(conn)
+    conn.close()
+if view is not None:
+    _, y1, y2 = view
+else:
+    table = load_rows('opt.csv')
+    columns = list(table['columns'])
+    y1 = table['values'][:, columns.index('original')]
+    y2 = table['values'][:, columns.index('opt')]
 
 paired = sorted(zip(y1, y2), key=lambda p: 1 - p[1] / p[0])
 y1, y2 = zip(*paired)
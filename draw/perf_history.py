@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+性能结果的历史数据库（SQLite）与回归检测
+每次基准测试的结果（opt.csv、bench_harness.py的runs.csv等）作为一次运行追加到数据库，记录commit、日期和机器。
+对每个基准和变体（original/opt或工具名），在同一台机器的历史中：
+- 最新一次运行与上一次运行的重复测量做Mann-Whitney U检验，显著且变化超过阈值的列为回归或改进；
+  重复次数太少、检验不可能显著时（例如opt.csv每次运行每个基准只有一次测量），改为与更早的全部历史比较变化幅度；
+- 变点检测：在所有可能的切分位置比较前后两段的测量，取最显著的位置
+opt.py是这个历史上的一个视图（最新一次同时包含original和opt的运行）
+
+用法：
+    python perf_history.py record opt.csv [--commit abc123] [--machine gpu01]
+    python perf_history.py record bench_results/runs.csv
+    python perf_history.py report [--alpha 0.05] [--min-effect 0.02] [--fallback-effect 0.1] [--change-points]
+    python perf_history.py list
+"""
+
+import argparse
+import csv
+import math
+import socket
+import sqlite3
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from bench_data import load_long, load_rows
+
+HISTORY_DB = 'perf_history.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    commit_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    machine TEXT NOT NULL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    benchmark TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    repetition INTEGER NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS measurements_key ON measurements (benchmark, variant, run_id);
+"""
+
+# 由其他列计算得到的列（opt.csv中的per = opt / original），不作为测量记录
+DERIVED_COLUMNS = {'per'}
+
+ALPHA = 0.05
+# 中位数的相对变化小于该值时不报告（即使统计上显著）
+MIN_EFFECT = 0.02
+# 不超过该样本量且没有并列值时用精确分布计算p值，否则用带并列校正的正态近似
+EXACT_LIMIT = 20
+# 检验没有功效时的回退：最新一次的中位数超出更早全部测量的范围，且相对历史中位数的变化不小于该值
+FALLBACK_EFFECT = 0.10
+
+
+def open_history(db_path=HISTORY_DB):
+    conn = sqlite3.connect(str(db_path), timeout=60)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def current_commit(cwd=None):
+    """当前仓库的commit，不在git仓库中时返回unknown"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd, capture_output=True, text=True)
+        return result.stdout.strip() or 'unknown'
+    except OSError:
+        return 'unknown'
+
+
+def read_measurements(path):
+    """读取结果文件，返回(benchmark, variant, repetition, value)列表
+
+    长表（benchmark/tool/value列，bench_harness.py的runs.csv）的工具作为变体；
+    行表（opt.csv）的每个数值列作为变体，重复次数为0
+    """
+    with open(path, 'r', newline='') as f:
+        header = {c.strip().lower() for c in next(csv.reader(f), [])}
+    if {'benchmark', 'tool', 'value'} <= header:
+        table = load_long(path)
+        return list(zip(table['benchmarks'].tolist(), table['tools'].tolist(), table['repetitions'].tolist(),
+                        table['values'].tolist()))
+    table = load_rows(path)
+    measurements = []
+    for j, column in enumerate(table['columns']):
+        if column in DERIVED_COLUMNS:
+            continue
+        for benchmark, value in zip(table['benchmarks'], table['values'][:, j]):
+            measurements.append((str(benchmark), str(column), 0, float(value)))
+    return measurements
+
+
+def record_run(conn, measurements, commit=None, date=None, machine=None, source=None):
+    """追加一次运行，返回运行编号；NaN保存为NULL"""
+    with conn:
+        cur = conn.execute('INSERT INTO runs (commit_id, date, machine, source) VALUES (?, ?, ?, ?)',
+                           (commit or current_commit(), date or datetime.now().isoformat(timespec='seconds'),
+                            machine or socket.gethostname(), source))
+        run_id = cur.lastrowid
+        conn.executemany('INSERT INTO measurements (run_id, benchmark, variant, repetition, value) '
+                         'VALUES (?, ?, ?, ?, ?)',
+                         [(run_id, b, v, r, None if math.isnan(x) else x) for b, v, r, x in measurements])
+    return run_id
+
+
+def list_runs(conn):
+    return conn.execute('SELECT r.id, r.commit_id, r.date, r.machine, r.source, COUNT(m.run_id) FROM runs r '
+                        'LEFT JOIN measurements m ON m.run_id = r.id GROUP BY r.id ORDER BY r.date, r.id').fetchall()
+
+
+def load_series(conn):
+    """每个(机器, 基准, 变体)按时间排序的历史：[(运行编号, commit, 日期, 测量值数组), ...]"""
+    rows = conn.execute('SELECT r.machine, m.benchmark, m.variant, r.id, r.commit_id, r.date, m.value '
+                        'FROM measurements m JOIN runs r ON r.id = m.run_id '
+                        'WHERE m.value IS NOT NULL ORDER BY r.date, r.id, m.repetition')
+    series = {}
+    for machine, benchmark, variant, run_id, commit, date, value in rows:
+        runs = series.setdefault((machine, benchmark, variant), [])
+        if not runs or runs[-1][0] != run_id:
+            runs.append((run_id, commit, date, []))
+        runs[-1][3].append(value)
+    return {key: [(r, c, d, np.array(v)) for r, c, d, v in runs] for key, runs in series.items()}
+
+
+def _rank(values):
+    """平均秩（并列值取平均）"""
+    order = np.argsort(values, kind='mergesort')
+    ranks = np.empty(len(values))
+    sorted_values = values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    ends = np.r_[starts[1:], len(values)]
+    for start, end in zip(starts, ends):
+        ranks[order[start:end]] = (start + end + 1) / 2
+    return ranks, ends - starts
+
+
+def _exact_u_cdf(m, n):
+    """无并列时U统计量的精确分布（动态规划），返回P(U <= u)的数组"""
+    # counts[i][j][u]：i个x、j个y时U=u的排列数
+    counts = [[None] * (n + 1) for _ in range(m + 1)]
+    for i in range(m + 1):
+        for j in range(n + 1):
+            if i == 0 or j == 0:
+                counts[i][j] = np.zeros(i * j + 1)
+                counts[i][j][0] = 1
+                continue
+            c = np.zeros(i * j + 1)
+            # 最大的元素来自x时贡献j
+            c[j:] += counts[i - 1][j]
+            c[:(i * (j - 1)) + 1] += counts[i][j - 1]
+            counts[i][j] = c
+    dist = counts[m][n]
+    return np.cumsum(dist) / dist.sum()
+
+
+def mann_whitney(x, y):
+    """双侧Mann-Whitney U检验，返回(U_x, p值)；样本为空时p为nan"""
+    x, y = np.asarray(x, float), np.asarray(y, float)
+    m, n = len(x), len(y)
+    if m == 0 or n == 0:
+        return float('nan'), float('nan')
+    ranks, ties = _rank(np.concatenate([x, y]))
+    u = ranks[:m].sum() - m * (m + 1) / 2
+    if (ties == 1).all() and m <= EXACT_LIMIT and n <= EXACT_LIMIT:
+        cdf = _exact_u_cdf(m, n)
+        k = int(round(min(u, m * n - u)))
+        return float(u), float(min(1.0, 2 * cdf[k]))
+    total = m + n
+    mean = m * n / 2
+    var = m * n / 12 * ((total + 1) - (ties ** 3 - ties).sum() / (total * (total - 1)))
+    if var <= 0:
+        return float(u), 1.0
+    # 连续性校正
+    z = (abs(u - mean) - 0.5) / math.sqrt(var)
+    return float(u), float(min(1.0, math.erfc(max(z, 0) / math.sqrt(2))))
+
+
+def min_p_value(m, n):
+    """m个和n个测量的双侧检验能达到的最小p值（没有并列时为2 / C(m+n, m)），每边1次测量时为1"""
+    return min(1.0, 2 / math.comb(m + n, m))
+
+
+def has_power(m, n, alpha=ALPHA):
+    """检验是否可能在alpha水平上显著：每边至少需要3到4次重复"""
+    return m > 0 and n > 0 and min_p_value(m, n) <= alpha
+
+
+def _change(before, after, alpha, min_effect):
+    """比较两组测量：返回(相对变化, p值, 分类)，分类为regression、improvement或None（时间越小越好）"""
+    _, p = mann_whitney(before, after)
+    change = np.median(after) / np.median(before) - 1
+    if not p <= alpha or abs(change) < min_effect:
+        return change, p, None
+    return change, p, 'regression' if change > 0 else 'improvement'
+
+
+def _effect_change(history, after, min_effect):
+    """没有检验功效时的比较：返回(相对变化, 分类)，变化不小于min_effect且超出历史范围时才分类"""
+    latest = np.median(after)
+    change = latest / np.median(history) - 1
+    if abs(change) < min_effect or history.min() <= latest <= history.max():
+        return change, None
+    return change, 'regression' if change > 0 else 'improvement'
+
+
+def detect_changes(series, alpha=ALPHA, min_effect=MIN_EFFECT, fallback_effect=FALLBACK_EFFECT):
+    """最新一次运行与同一台机器上的上一次运行比较，返回检测到的变化（按变化幅度降序）
+
+    两次运行的重复次数太少、检验不可能显著时（has_power为False），把最新一次与更早的全部测量比较，
+    用fallback_effect作为变化幅度的阈值；这些变化的method为effect-size，p为nan
+    """
+    changes = []
+    for (machine, benchmark, variant), runs in series.items():
+        if len(runs) < 2:
+            continue
+        (_, prev_commit, _, before), (_, commit, _, after) = runs[-2], runs[-1]
+        if has_power(len(before), len(after), alpha):
+            change, p, kind = _change(before, after, alpha, min_effect)
+            method = 'mann-whitney'
+        else:
+            history = np.concatenate([r[3] for r in runs[:-1]])
+            change, kind = _effect_change(history, after, max(min_effect, fallback_effect))
+            p, method = float('nan'), 'effect-size'
+        if kind:
+            changes.append({'kind': kind, 'machine': machine, 'benchmark': benchmark, 'variant': variant,
+                            'change': change, 'p': p, 'method': method, 'from': prev_commit, 'to': commit})
+    changes.sort(key=lambda c: -abs(c['change']))
+    return changes
+
+
+def change_points(series, alpha=ALPHA, min_effect=MIN_EFFECT):
+    """每个序列中最显著的切分位置：把历史分为前后两段，合并各段的测量做Mann-Whitney检验"""
+    points = []
+    for (machine, benchmark, variant), runs in series.items():
+        best = None
+        for k in range(1, len(runs)):
+            before = np.concatenate([r[3] for r in runs[:k]])
+            after = np.concatenate([r[3] for r in runs[k:]])
+            change, p, kind = _change(before, after, alpha, min_effect)
+            if kind and (best is None or p < best['p']):
+                best = {'kind': kind, 'machine': machine, 'benchmark': benchmark, 'variant': variant,
+                        'change': change, 'p': p, 'from': runs[k - 1][1], 'to': runs[k][1], 'date': runs[k][2]}
+        if best:
+            points.append(best)
+    points.sort(key=lambda c: -abs(c['change']))
+    return points
+
+
+def low_power_series(series, alpha=ALPHA):
+    """最新一次与上一次运行的比较中检验不可能显著的序列数，以及参与比较的序列总数"""
+    compared = [runs for runs in series.values() if len(runs) >= 2]
+    low = sum(1 for runs in compared if not has_power(len(runs[-2][3]), len(runs[-1][3]), alpha))
+    return low, len(compared)
+
+
+def print_changes(changes, title):
+    print(f"\n{title}")
+    for kind in ('regression', 'improvement'):
+        ranked = [c for c in changes if c['kind'] == kind]
+        print(f"  {kind.capitalize()}s: {len(ranked)}")
+        for c in ranked:
+            evidence = 'effect size only' if c.get('method') == 'effect-size' else f"p={c['p']:.3g}"
+            print(f"    {c['change']:+8.1%}  {c['benchmark']} [{c['variant']}] on {c['machine']}  "
+                  f"{c['from']} -> {c['to']}  ({evidence})")
+
+
+def opt_view(conn, machine=None):
+    """opt.py使用的视图：最新一次同时包含original和opt的运行中，各基准的中位数
+
+    返回(基准名列表, original数组, opt数组)；没有这样的运行时返回None
+    """
+    query = ('SELECT r.id FROM runs r WHERE EXISTS (SELECT 1 FROM measurements m WHERE m.run_id = r.id '
+             "AND m.variant = 'original') AND EXISTS (SELECT 1 FROM measurements m WHERE m.run_id = r.id "
+             "AND m.variant = 'opt')")
+    params = ()
+    if machine:
+        query += ' AND r.machine = ?'
+        params = (machine,)
+    row = conn.execute(query + ' ORDER BY r.date DESC, r.id DESC LIMIT 1', params).fetchone()
+    if row is None:
+        return None
+    values = {}
+    for benchmark, variant, value in conn.execute(
+            "SELECT benchmark, variant, value FROM measurements WHERE run_id = ? AND variant IN ('original', 'opt') "
+            'AND value IS NOT NULL ORDER BY rowid', row):
+        values.setdefault(benchmark, {}).setdefault(variant, []).append(value)
+    benchmarks = [b for b, v in values.items() if 'original' in v and 'opt' in v]
+    return (benchmarks, np.array([np.median(values[b]['original']) for b in benchmarks]),
+            np.array([np.median(values[b]['opt']) for b in benchmarks]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Performance history database and regression detection')
+    parser.add_argument('--db', default=HISTORY_DB)
+    sub = parser.add_subparsers(dest='mode', required=True)
+    record_parser = sub.add_parser('record', help='append a results file as a new run')
+    record_parser.add_argument('results')
+    record_parser.add_argument('--commit', default=None)
+    record_parser.add_argument('--date', default=None, help='ISO date (default: now)')
+    record_parser.add_argument('--machine', default=None, help='default: hostname')
+    report_parser = sub.add_parser('report', help='rank regressions and improvements')
+    report_parser.add_argument('--alpha', type=float, default=ALPHA)
+    report_parser.add_argument('--min-effect', type=float, default=MIN_EFFECT)
+    report_parser.add_argument('--fallback-effect', type=float, default=FALLBACK_EFFECT,
+                               help='relative change reported when too few repetitions for the test')
+    report_parser.add_argument('--change-points', action='store_true', help='also search each full history')
+    sub.add_parser('list', help='list recorded runs')
+    args = parser.parse_args()
+
+    conn = open_history(args.db)
+    try:
+        if args.mode == 'record':
+            measurements = read_measurements(args.results)
+            run_id = record_run(conn, measurements, args.commit, args.date, args.machine,
+                                source=str(Path(args.results)))
+            print(f"Recorded run {run_id}: {len(measurements)} measurements from {args.results}")
+        elif args.mode == 'list':
+            for run_id, commit, date, machine, source, count in list_runs(conn):
+                print(f"{run_id:4d}  {date}  {commit:<10s} {machine:<16s} {count:6d}  {source or ''}")
+        else:
+            series = load_series(conn)
+            print_changes(detect_changes(series, args.alpha, args.min_effect, args.fallback_effect),
+                          'Latest run vs previous run:')
+            low, compared = low_power_series(series, args.alpha)
+            if low:
+                print(f"  Note: {low} of {compared} series have too few repetitions for the Mann-Whitney test "
+                      f"to reach p <= {args.alpha:g} (no power); they were compared against the earlier history "
+                      f"by effect size (>= {max(args.min_effect, args.fallback_effect):.0%}, outside its range)")
+            if args.change_points:
+                print_changes(change_points(series, args.alpha, args.min_effect), 'Change points over history:')
+    finally:
+        conn.close()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+分析结果的持久化增量缓存（SQLite）
+每个文件的解析结果以(kind, path)为键保存，并记录文件的大小、修改时间、可选的内容哈希和解析器版本；
+重新运行时只解析新增或变化的文件，已删除文件的条目会被清理
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT,
+    version INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (kind, path)
+)
+"""
+
+
+def open_cache(db_path):
+    """打开（必要时创建）缓存数据库"""
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=60)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(SCHEMA)
+    return conn
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """文件内容的blake2b哈希"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_identity(path, st=None):
+    """文件身份：大小和纳秒级修改时间"""
+    if st is None:
+        st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def cache_key(path):
+    return str(Path(path).resolve())
+
+
+def _entry(row):
+    path, size, mtime_ns, digest, version, payload = row
+    return path, {'size': size, 'mtime_ns': mtime_ns, 'digest': digest, 'version': version, 'payload': payload}
+
+
+def load_entry(conn, kind, path):
+    """读取单个条目，不存在时返回None"""
+    row = conn.execute('SELECT path, size, mtime_ns, digest, version, payload FROM entries '
+                       'WHERE kind = ? AND path = ?', (kind, cache_key(path))).fetchone()
+    return _entry(row)[1] if row else None
+
+
+def load_entries(conn, kind, directory):
+    """读取某个目录下（不含子目录）的一类条目，返回 path -> 条目"""
+    directory = cache_key(directory)
+    prefix = directory.rstrip(os.sep) + os.sep
+    rows = conn.execute('SELECT path, size, mtime_ns, digest, version, payload FROM entries '
+                        'WHERE kind = ? AND substr(path, 1, ?) = ?', (kind, len(prefix), prefix))
+    entries = {}
+    for row in rows:
+        path, entry = _entry(row)
+        if os.path.dirname(path) == directory:
+            entries[path] = entry
+    return entries
+
+
+def entry_payload(entry, path, identity, version, hash_content=False):
+    """判断条目是否仍然有效，有效时返回解析结果，否则返回None
+
+    大小和修改时间都一致即视为有效；启用hash_content时，大小相同但修改时间变化的文件
+    （例如被touch或复制）会比较内容哈希，哈希相同也视为有效。
+    计算过的哈希写入identity['digest']，调用方可据此用新的修改时间更新条目
+    """
+    if entry is None or entry['version'] != version:
+        return None
+    if entry['size'] == identity['size'] and entry['mtime_ns'] == identity['mtime_ns']:
+        identity['digest'] = entry['digest']
+        return json.loads(entry['payload'])
+    if hash_content and entry['digest'] and entry['size'] == identity['size']:
+        identity['digest'] = file_digest(path)
+        if identity['digest'] == entry['digest']:
+            return json.loads(entry['payload'])
+    return None
+
+
+def needs_refresh(entry, identity):
+    """条目有效但修改时间已变化（内容哈希命中），需要写回新的身份"""
+    return entry['mtime_ns'] != identity['mtime_ns']
+
+
+def store_entries(conn, kind, items, version):
+    """批量写入条目，items为(path, identity, payload)"""
+    with conn:
+        conn.executemany(
+            'INSERT OR REPLACE INTO entries (kind, path, size, mtime_ns, digest, version, payload) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(kind, cache_key(path), identity['size'], identity['mtime_ns'], identity.get('digest'), version,
+              json.dumps(payload)) for path, identity, payload in items])
+
+
+def delete_entries(conn, kind, paths):
+    """删除已不存在的文件对应的条目"""
+    with conn:
+        conn.executemany('DELETE FROM entries WHERE kind = ? AND path = ?', [(kind, path) for path in paths])
+
+
+def cached_parse(conn, kind, path, version, parse, hash_content=False, stats=None):
+    """带缓存地解析单个文件（或目录），parse(path)返回可JSON序列化的结果；conn为None时直接解析"""
+    if conn is None:
+        return parse(path)
+
+    identity = file_identity(path)
+    entry = load_entry(conn, kind, path)
+    payload = entry_payload(entry, path, identity, version, hash_content)
+    if payload is not None:
+        if stats is not None:
+            stats['hits'] += 1
+        if needs_refresh(entry, identity):
+            store_entries(conn, kind, [(path, identity, payload)], version)
+        return payload
+
+    payload = parse(path)
+    if stats is not None:
+        stats['misses'] += 1
+    if hash_content and identity.get('digest') is None and Path(path).is_file():
+        identity['digest'] = file_digest(path)
+    store_entries(conn, kind, [(path, identity, payload)], version)
+    return payload
+
+
+def new_cache_stats():
+    """缓存命中统计：命中、重新解析、清理的条目数"""
+    return {'hits': 0, 'misses': 0, 'deleted': 0}
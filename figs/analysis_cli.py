@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+GPU-Fuzz/NNSmith分析的命令行入口（安装后为gpufuzz-analysis命令）
+子命令：
+- summary：NNSmith和GPU-Fuzz的统计摘要（--json输出机器可读的结果）
+- timeline：bug发现时间线（CSV）
+- memory-detail：内存错误子类型、算子和逐条违规的统计
+- throughput：测试用例吞吐量、每个日志的产出、记录间隔分布和停滞区间（throughput.py）
+- shapes：trace.txt中mat_shapes记录的形状统计（mat_shapes.py）
+- plots：对比图和详细图表（只有这个子命令加载matplotlib）
+- batch：多次独立运行的批量分析（batch_runs.py）
+各分析模块在子命令中才导入，只输出文本的子命令不加载matplotlib，启动时间主要是NumPy的导入。
+路径参数的默认值是原来写在各脚本中的campaign路径；--gpufuzz-logs也可以是.gz/.xz/.zst文件的目录
+或.tar/.tar.gz/.tar.xz/.tar.zst归档，不需要先解压（见log_source.py）
+
+用法：
+    gpufuzz-analysis summary --gpufuzz-logs /path/log20251101 --nnsmith-bugs /path/pytorch8 --nnsmith-log fuzz.log
+    gpufuzz-analysis summary --json stats.json --no-fingerprints
+    gpufuzz-analysis timeline --max-points 500 > timeline.csv
+    gpufuzz-analysis memory-detail --violations-per-log 1000
+    gpufuzz-analysis summary --gpufuzz-logs log20251101.tar.zst
+    gpufuzz-analysis summary --prefilter
+    gpufuzz-analysis summary --verify-prefilter
+    gpufuzz-analysis throughput --csv throughput.csv --plot throughput.pdf
+    gpufuzz-analysis shapes --tolerance 0.01
+    gpufuzz-analysis plots --only detailed --out-dir figures
+    gpufuzz-analysis batch --gpufuzz run1 run2 --nnsmith bugs1 fuzz1.log --out-dir batch_out
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+
+import instrument
+from gpufuzz_scan import DEFAULT_CHUNKSIZE
+from mat_shapes import DEFAULT_TOLERANCE
+from throughput import (DEFAULT_BIN_MINUTES, DEFAULT_MARKER, DEFAULT_MIN_BINS, DEFAULT_STALL_FRACTION,
+                        DEFAULT_STALL_SECONDS)
+
+DEFAULT_NNSMITH_BUGS = '/home/lzh/projects/nnsmithout/pytorch8'
+DEFAULT_NNSMITH_LOG = '/home/lzh/projects/nnsmithout/outputs/2025-11-06/21-40-49/fuzz.log'
+DEFAULT_GPUFUZZ_LOGS = '/home/lzh/projects/gpu_fuzz/gpu_logs/log20251101'
+DEFAULT_CACHE = 'analysis_cache.sqlite'
+DEFAULT_EVENTS = 'campaign_events.npz'
+DEFAULT_VIOLATIONS_PER_LOG = 1000
+
+
+def _json_default(value):
+    """统计中的集合、NumPy标量和时间转为JSON类型"""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"not JSON serializable: {type(value).__name__}")
+
+
+def _absolute(args):
+    """输入路径转为绝对路径（plots会切换到输出目录，没有指定的--events在输出目录中）"""
+    for name in ('nnsmith_bugs', 'nnsmith_log', 'gpufuzz_logs', 'cache', 'events'):
+        if getattr(args, name, None):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+
+def _cache(args):
+    return None if args.no_cache else args.cache
+
+
+def analyze_nnsmith(args):
+    from compare_nnsmith_gpufuzz import analyze_nnsmith_results
+    with instrument.stage('nnsmith'):
+        return analyze_nnsmith_results(args.nnsmith_bugs, args.nnsmith_log, cache=_cache(args))
+
+
+def scan_gpufuzz(args):
+    """单遍扫描GPU-Fuzz日志目录，目录不存在时打印警告并返回None"""
+    from gpufuzz_scan import scan_gpufuzz_campaign
+    with instrument.stage('gpufuzz_scan'):
+        scan = scan_gpufuzz_campaign(args.gpufuzz_logs, workers=args.workers, chunksize=args.chunksize,
+                                     cache=_cache(args), prefilter=args.prefilter,
+                                     verify_prefilter=args.verify_prefilter)
+    if scan is None:
+        print(f"Warning: {args.gpufuzz_logs} does not exist", file=sys.stderr)
+    return scan
+
+
+def gpufuzz_summary(args, scan):
+    """analyze_gpufuzz_logs的统计，需要时加上指纹聚类"""
+    from compare_nnsmith_gpufuzz import analyze_gpufuzz_logs
+    from gpufuzz_scan import aggregate_records
+    if scan is None:
+        return aggregate_records([])['stats']
+    stats = analyze_gpufuzz_logs(args.gpufuzz_logs, scan=scan)
+    if not args.no_fingerprints:
+        from bug_fingerprint import cluster_fingerprints, fingerprint_records, fingerprint_summary
+        with instrument.stage('fingerprints'):
+            fingerprints = fingerprint_records(args.gpufuzz_logs, scan['records'], cache=_cache(args))
+            stats['fingerprints'] = fingerprint_summary(fingerprints, cluster_fingerprints(fingerprints))
+    return stats
+
+
+def cmd_summary(args):
+    from compare_nnsmith_gpufuzz import plot_comparison, print_summary
+    nnsmith_stats = analyze_nnsmith(args)
+    gpufuzz_stats = gpufuzz_summary(args, scan_gpufuzz(args))
+    if args.json:
+        data = json.dumps({'nnsmith': nnsmith_stats, 'gpufuzz': gpufuzz_stats}, default=_json_default, indent=2)
+        if args.json == '-':
+            print(data)
+        else:
+            with open(args.json, 'w') as f:
+                f.write(data + '\n')
+    if args.json != '-':
+        print_summary(nnsmith_stats, gpufuzz_stats)
+    if args.plots:
+        print("Generating comparison plots...")
+        with instrument.stage('plots'):
+            plot_comparison(nnsmith_stats, gpufuzz_stats)
+
+
+def cmd_timeline(args):
+    import numpy as np
+    from detailed_analysis import parse_nnsmith_timeline_times
+    from timeline_sampling import downsample_timeline
+    nnsmith_times = parse_nnsmith_timeline_times(args.nnsmith_log)
+    scan = scan_gpufuzz(args)
+    gpufuzz = scan['timeline'] if scan is not None else []
+    gpufuzz_times = np.array([t for t, _ in gpufuzz], dtype='M8[s]')
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['tool', 'hours', 'timestamp', 'bugs'])
+    for tool, times in (('NNSmith', nnsmith_times), ('GPU-Fuzz', gpufuzz_times)):
+        if not len(times):
+            continue
+        hours = (times - times[0]) / np.timedelta64(1, 'h')
+        counts = np.arange(1, len(times) + 1)
+        if args.max_points:
+            hours, counts = downsample_timeline(hours, counts, args.max_points)
+        for h, count in zip(hours.tolist(), counts.tolist()):
+            stamp = times[0] + np.timedelta64(int(round(h * 3600)), 's')
+            writer.writerow([tool, f"{h:.6f}", str(stamp), int(count)])
+
+
+def print_violations(args, scan):
+    """逐条违规的统计（每个日志至多抽样violations_per_log条）"""
+    from sanitizer_violations import (collect_violations, memory_error_logs, print_violation_summary,
+                                      summarize_violations)
+    with instrument.stage('violations'):
+        violations, totals = collect_violations(memory_error_logs(args.gpufuzz_logs, scan['records']),
+                                                limit=args.violations_per_log, reservoir=True, seed=0)
+    print_violation_summary(summarize_violations(violations), totals)
+
+
+def cmd_memory_detail(args):
+    from detailed_analysis import analyze_memory_errors_detail
+    scan = scan_gpufuzz(args)
+    if scan is None:
+        return
+    detail = analyze_memory_errors_detail(args.gpufuzz_logs, scan=scan)
+    if args.json:
+        print(json.dumps(detail, default=_json_default, indent=2))
+        return
+    print("Memory error subtypes:")
+    for subtype, count in detail.items():
+        if subtype != 'operators':
+            print(f"  {subtype}: {count}")
+    operators = sorted(detail['operators'].items(), key=lambda item: -item[1])
+    print(f"Operators ({len(operators)}):")
+    for name, count in operators[:args.top]:
+        print(f"  {count:>6}  {name}")
+    if args.violations_per_log:
+        print_violations(args, scan)
+
+
+def cmd_throughput(args):
+    from throughput import (analyze_throughput, plot_throughput, print_throughput_summary, write_series_csv,
+                            write_yield_csv)
+    with instrument.stage('throughput'):
+        result = analyze_throughput(args.gpufuzz_logs, args.marker.encode(), args.bin, args.stall, args.fraction,
+                                    args.min_bins)
+    if result is None:
+        print(f"Warning: no logs in {args.gpufuzz_logs}", file=sys.stderr)
+        return
+    print_throughput_summary(result)
+    if args.csv:
+        write_series_csv(args.csv, result)
+        print(f"Saved: {args.csv}")
+    if args.yield_csv:
+        write_yield_csv(args.yield_csv, result)
+        print(f"Saved: {args.yield_csv}")
+    if args.plot:
+        plot_throughput(result, args.plot)
+
+
+def cmd_shapes(args):
+    from log_source import find_log
+    from mat_shapes import load_shapes, print_shape_summary
+    # 日志目录中的trace.txt（也可以是压缩的）或归档成员
+    trace_file = find_log(args.gpufuzz_logs, 'trace.txt')
+    if trace_file is None:
+        print(f"Warning: trace.txt not found in {args.gpufuzz_logs}", file=sys.stderr)
+        return
+    with instrument.stage('mat_shapes'):
+        store = load_shapes(trace_file, cache=not args.no_cache)
+    print_shape_summary(store, args.tolerance)
+
+
+def cmd_plots(args):
+    _absolute(args)
+    os.makedirs(args.out_dir, exist_ok=True)
+    os.chdir(args.out_dir)
+    args.events = args.events or DEFAULT_EVENTS
+    nnsmith_stats, scan = None, None
+    if args.only in (None, 'comparison'):
+        from compare_nnsmith_gpufuzz import plot_comparison
+        nnsmith_stats = analyze_nnsmith(args)
+        scan = scan_gpufuzz(args)
+        print("Generating comparison plots...")
+        with instrument.stage('plots'):
+            plot_comparison(nnsmith_stats, gpufuzz_summary(args, scan))
+    if args.only in (None, 'detailed'):
+        from detailed_analysis import parse_nnsmith_timeline_times, plot_campaign
+        from event_store import (add_gpufuzz_run, add_nnsmith_run, finish_event_store, new_event_builder,
+                                 save_event_store)
+        print("Analyzing data...")
+        # 只解析一遍日志，展开为事件表，所有图表都是对事件表的查询
+        builder = new_event_builder()
+        if nnsmith_stats is None:
+            nnsmith_stats = analyze_nnsmith(args)
+        add_nnsmith_run(builder, 'nnsmith', nnsmith_stats, args.nnsmith_bugs,
+                        parse_nnsmith_timeline_times(args.nnsmith_log))
+        if scan is None:
+            scan = scan_gpufuzz(args)
+        with instrument.stage('event_store'):
+            add_gpufuzz_run(builder, 'gpufuzz', scan if scan is not None else
+                            {'stats': {'total_testcases': 0}, 'records': []})
+            store = finish_event_store(builder)
+            save_event_store(store, args.events)
+        print(f"Saved: {args.events} ({len(store['events'])} events)")
+        print("Generating detailed plots...")
+        with instrument.stage('plots'):
+            plot_campaign(store)
+        if args.violations and scan is not None:
+            print("  - Parsing individual sanitizer violations...")
+            print_violations(args, scan)
+
+
+def cmd_batch(args):
+    from batch_runs import run_batch
+    run_batch(args)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='gpufuzz-analysis', description='GPU-Fuzz / NNSmith campaign analysis')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    inputs = argparse.ArgumentParser(add_help=False)
+    inputs.add_argument('--nnsmith-bugs', default=DEFAULT_NNSMITH_BUGS, help='NNSmith bug-* directory')
+    inputs.add_argument('--nnsmith-log', default=DEFAULT_NNSMITH_LOG, help='NNSmith fuzz.log')
+    inputs.add_argument('--gpufuzz-logs', default=DEFAULT_GPUFUZZ_LOGS, help='GPU-Fuzz log directory')
+    inputs.add_argument('--cache', default=DEFAULT_CACHE, help='SQLite analysis cache')
+    inputs.add_argument('--no-cache', action='store_true', help='parse every file again')
+    inputs.add_argument('--workers', type=int, default=None, help='scan processes (default: CPU count)')
+    inputs.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='log files per scan shard')
+    inputs.add_argument('--prefilter', action='store_true',
+                        help='skip clean sanitizer logs by their head and tail (may differ from a full scan)')
+    inputs.add_argument('--verify-prefilter', action='store_true',
+                        help='prefilter, then fully parse every skipped log and report mismatches (no cache)')
+
+    p = sub.add_parser('summary', parents=[inputs], help='print NNSmith and GPU-Fuzz statistics')
+    p.add_argument('--json', default=None, metavar='PATH', help="also write statistics as JSON ('-': only JSON)")
+    p.add_argument('--no-fingerprints', action='store_true', help='skip near-duplicate clustering')
+    p.add_argument('--plots', action='store_true', help='also render bug_types_comparison.pdf')
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser('timeline', parents=[inputs], help='bug discovery timelines as CSV')
+    p.add_argument('--max-points', type=int, default=0, help='downsample each timeline (0: all events)')
+    p.set_defaults(func=cmd_timeline)
+
+    p = sub.add_parser('memory-detail', parents=[inputs], help='memory error subtypes, operators and violations')
+    p.add_argument('--violations-per-log', type=int, default=DEFAULT_VIOLATIONS_PER_LOG,
+                   help='reservoir sample size per log (0: skip violation parsing)')
+    p.add_argument('--top', type=int, default=20, help='operators to list')
+    p.add_argument('--json', action='store_true', help='print subtype and operator counts as JSON')
+    p.set_defaults(func=cmd_memory_detail)
+
+    p = sub.add_parser('throughput', parents=[inputs], help='test-case throughput, per-log yield and stalls')
+    p.add_argument('--marker', default=DEFAULT_MARKER.decode(),
+                   help='regex of the trace.txt line that starts a run; group 1 is the errid')
+    p.add_argument('--bin', type=float, default=DEFAULT_BIN_MINUTES, help='minutes per series bin')
+    p.add_argument('--stall', type=float, default=DEFAULT_STALL_SECONDS,
+                   help='seconds between records that count as a stall')
+    p.add_argument('--fraction', type=float, default=DEFAULT_STALL_FRACTION,
+                   help='rate below this fraction of the median counts as a stall')
+    p.add_argument('--min-bins', type=int, default=DEFAULT_MIN_BINS, help='consecutive low-rate bins that form a stall')
+    p.add_argument('--csv', default='throughput.csv', help='per-bin series')
+    p.add_argument('--yield-csv', default=None, help='per-log yield')
+    p.add_argument('--plot', default=None, help='throughput plot (PDF); loads matplotlib')
+    p.set_defaults(func=cmd_throughput)
+
+    p = sub.add_parser('shapes', parents=[inputs], help='mat_shapes record statistics from trace.txt')
+    p.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                   help='relative distance to 2^31/2^32 that counts as near')
+    p.set_defaults(func=cmd_shapes)
+
+    p = sub.add_parser('plots', parents=[inputs], help='render the comparison and detailed figures')
+    p.add_argument('--only', choices=['comparison', 'detailed'], default=None)
+    p.add_argument('--out-dir', default='.')
+    p.add_argument('--events', default=None,
+                   help=f"event store written for later queries (default: {DEFAULT_EVENTS} in --out-dir)")
+    p.add_argument('--violations', action='store_true', help='also print the violation summary')
+    p.add_argument('--violations-per-log', type=int, default=DEFAULT_VIOLATIONS_PER_LOG)
+    p.add_argument('--no-fingerprints', action='store_true')
+    p.set_defaults(func=cmd_plots)
+
+    from batch_runs import add_batch_arguments
+    p = sub.add_parser('batch', help='aggregate multiple independent runs')
+    add_batch_arguments(p)
+    p.set_defaults(func=cmd_batch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # 设置ANALYSIS_INSTRUMENT=report.json时记录各阶段的耗时、读取量和缓存命中率（见instrument.py）
+    instrument.enable_from_env()
+    args.func(args)
+    instrument.finish()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
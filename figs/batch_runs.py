@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+多次独立运行的批量分析
+并发分析N个GPU-Fuzz和N个NNSmith运行目录，输出每次运行的统计、mean ± std汇总（CSV），
+以及论文对比表（tbl:comparison）的LaTeX表体片段
+
+用法：
+    python batch_runs.py \
+        --gpufuzz /path/log20251101 /path/log20251102 ... \
+        --nnsmith /path/pytorch8 /path/outputs/.../fuzz.log \
+        --nnsmith /path/pytorch9 /path/outputs/.../fuzz.log \
+        --out-dir batch_out
+"""
+
+import argparse
+import csv
+import os
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# 在创建进程池之前导入：fork启动的worker直接继承父进程中预编译的匹配器；
+# spawn/forkserver（macOS，以及Python 3.14起的Linux默认）下每个worker导入时重新构建MATCHER，代价很小
+from compare_nnsmith_gpufuzz import analyze_gpufuzz_logs, analyze_nnsmith_results
+
+# 每次运行的指标（列名, 论文表格中的名称）
+METRICS = [
+    ('testcases', 'Test Cases Generated'),
+    ('total_bugs', 'Total Bugs'),
+    ('memory_errors', 'Memory Errors'),
+    ('config_errors', 'Configuration Errors'),
+    ('inconsistencies', 'Inconsistencies'),
+    ('exceptions', 'Exceptions'),
+    ('runtime_hours', 'Runtime (hours)'),
+]
+
+TOOLS = ['NNSmith', 'GPU-Fuzz']
+
+
+def analyze_run(task):
+    """分析一次运行，返回一行统计；在worker进程中执行"""
+    tool, paths, cache = task
+    row = {'tool': tool, 'run': str(paths[0])}
+    if tool == 'GPU-Fuzz':
+        stats = analyze_gpufuzz_logs(paths[0], cache=cache)
+        if not stats:
+            return None
+        row.update(
+            testcases=stats['total_testcases'],
+            # 与论文一致：GPU-Fuzz的总数不含OOM
+            total_bugs=stats['memory_errors'] + stats['config_errors'],
+            memory_errors=stats['memory_errors'],
+            config_errors=stats['config_errors'],
+            inconsistencies=0,
+            exceptions=0,
+            runtime_hours='',
+            unique_bug_count=stats['unique_bug_count'],
+        )
+    else:
+        stats = analyze_nnsmith_results(paths[0], paths[1], cache=cache)
+        row.update(
+            testcases=stats['total_testcases'],
+            total_bugs=stats['total_bugs'],
+            memory_errors=0,
+            config_errors=0,
+            inconsistencies=stats['bug_types'].get('INCONSISTENCY', 0),
+            exceptions=stats['bug_types'].get('EXCEPTION', 0),
+            runtime_hours=round(stats['runtime_hours'], 3),
+            unique_bug_count='',
+        )
+    return row
+
+
+def analyze_batch(gpufuzz_dirs, nnsmith_runs, workers=None, cache=None):
+    """并发分析所有运行，按输入顺序返回每次运行的统计行"""
+    tasks = [('NNSmith', (bug_dir, log_file), cache) for bug_dir, log_file in nnsmith_runs]
+    tasks += [('GPU-Fuzz', (log_dir,), cache) for log_dir in gpufuzz_dirs]
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = list(pool.map(analyze_run, tasks))
+    for task, row in zip(tasks, rows):
+        if row is None:
+            print(f"Warning: {task[1][0]} does not exist, skipped")
+    return [row for row in rows if row is not None]
+
+
+def summarize(rows):
+    """每个工具每个指标的mean和样本标准差（只有一次运行时std为0）"""
+    summary = {}
+    for tool in TOOLS:
+        tool_rows = [row for row in rows if row['tool'] == tool]
+        if not tool_rows:
+            continue
+        summary[tool] = {'runs': len(tool_rows)}
+        for key, _ in METRICS:
+            values = [float(row[key]) for row in tool_rows if row[key] != '']
+            if not values:
+                continue
+            std = statistics.stdev(values) if len(values) > 1 else 0.0
+            summary[tool][key] = (statistics.mean(values), std)
+    return summary
+
+
+def format_pm(value):
+    """论文中的格式：$19{,}063\\ \\pm\\ 360$，均值和标准差都为0时写0"""
+    if value is None:
+        return '--'
+    mean, std = value
+    if round(mean) == 0 and round(std) == 0:
+        return '0'
+    fmt = lambda x: f"{round(x):,}".replace(',', '{,}')
+    return f"${fmt(mean)}\\ \\pm\\ {fmt(std)}$"
+
+
+def latex_rows(summary):
+    """tbl:comparison的表体（从第一条数据行到Exceptions），可直接\\input到tabular中"""
+    cell = lambda tool, key: format_pm(summary.get(tool, {}).get(key))
+    row = lambda label, key: f"{label} & {cell('NNSmith', key)} & {cell('GPU-Fuzz', key)} \\\\"
+    return '\n'.join([
+        row('\\textbf{Test Cases Generated}', 'testcases'),
+        row('\\textbf{Total Bugs}\\textsuperscript{*}', 'total_bugs'),
+        '\\midrule',
+        '\\multicolumn{3}{@{}l}{\\textbf{Bug Breakdown by Type}} \\\\',
+        row('\\hspace{1em}Memory Errors', 'memory_errors'),
+        row('\\hspace{1em}Configuration Errors', 'config_errors'),
+        row('\\hspace{1em}Inconsistencies', 'inconsistencies'),
+        row('\\hspace{1em}Exceptions', 'exceptions'),
+    ]) + '\n'
+
+
+def write_outputs(rows, summary, out_dir):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    fields = ['tool', 'run'] + [key for key, _ in METRICS] + ['unique_bug_count']
+    with open(out_dir / 'batch_runs.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    with open(out_dir / 'batch_summary.csv', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['tool', 'runs', 'metric', 'mean', 'std'])
+        for tool, metrics in summary.items():
+            for key, _ in METRICS:
+                if key in metrics:
+                    mean, std = metrics[key]
+                    writer.writerow([tool, metrics['runs'], key, f"{mean:.3f}", f"{std:.3f}"])
+
+    with open(out_dir / 'batch_table.tex', 'w') as f:
+        f.write(latex_rows(summary))
+
+    for name in ('batch_runs.csv', 'batch_summary.csv', 'batch_table.tex'):
+        print(f"Saved: {out_dir / name}")
+
+
+def print_batch_summary(summary):
+    print("\n" + "=" * 60)
+    print("BATCH RESULTS (mean ± std)")
+    print("=" * 60)
+    for tool, metrics in summary.items():
+        print(f"\n--- {tool} ({metrics['runs']} runs) ---")
+        for key, label in METRICS:
+            if key in metrics:
+                mean, std = metrics[key]
+                print(f"{label}: {mean:.1f} ± {std:.1f}")
+    print("=" * 60 + "\n")
+
+
+def add_batch_arguments(parser):
+    """批量分析的命令行参数（本脚本和analysis_cli.py batch共用）"""
+    parser.add_argument('--gpufuzz', nargs='+', default=[], metavar='LOG_DIR', help='GPU-Fuzz log directories')
+    parser.add_argument('--nnsmith', nargs=2, action='append', default=[], metavar=('BUG_DIR', 'FUZZ_LOG'),
+                        help='NNSmith bug directory and fuzz.log (repeat once per run)')
+    parser.add_argument('--out-dir', default='.')
+    parser.add_argument('--workers', type=int, default=None, help='concurrent runs (default: CPU count)')
+    parser.add_argument('--cache', default=None, help='SQLite analysis cache shared by all runs')
+
+
+def run_batch(args):
+    rows = analyze_batch(args.gpufuzz, args.nnsmith, args.workers, args.cache)
+    summary = summarize(rows)
+    print_batch_summary(summary)
+    write_outputs(rows, summary, args.out_dir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Aggregate multiple GPU-Fuzz / NNSmith runs')
+    add_batch_arguments(parser)
+    run_batch(parser.parse_args())
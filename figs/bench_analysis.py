@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+分析脚本的基准测试
+在10k/100k/1M个测试用例规模的合成语料（synth_corpus.py）上运行各分析入口，测量耗时、峰值内存和吞吐量。
+每次测量在独立的子进程中进行：耗时只包含入口函数本身（不含import），峰值内存取子进程的ru_maxrss，
+同时记录调用前的RSS以区分import的固定开销。语料按规模生成在--corpus-dir下，参数不变时复用。
+结果写为长表（suite=规模，benchmark=入口@规模，tool=指标），可以直接用draw/perf_history.py record记录
+
+用法：
+    python bench_analysis.py [--scales 10k,100k,1M] [--repetitions 3] [--corpus-dir /tmp/synth] [--out bench_analysis.csv]
+    python bench_analysis.py --entry analyze_gpufuzz_logs --scales 10k
+    python bench_analysis.py --check-prefilter --scales 10k
+"""
+
+import argparse
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from synth_corpus import TRACE_BYTES_PER_TESTCASE, corpus_paths, generate_corpus
+
+SCALES = {'10k': 10000, '100k': 100000, '1M': 1000000}
+# --check-prefilter语料中干净日志的平均大小，大于预过滤读取的开头和结尾
+CHECK_CLEAN_LOG_BYTES = 65536
+# 入口名称 -> (模块, 函数, 使用的语料路径)
+ENTRY_POINTS = {
+    'analyze_gpufuzz_logs': ('compare_nnsmith_gpufuzz', 'analyze_gpufuzz_logs', ['gpufuzz']),
+    'analyze_nnsmith_results': ('compare_nnsmith_gpufuzz', 'analyze_nnsmith_results', ['bugs', 'fuzz_log']),
+    'parse_gpufuzz_timeline': ('detailed_analysis', 'parse_gpufuzz_timeline', ['gpufuzz']),
+    'parse_nnsmith_timeline': ('detailed_analysis', 'parse_nnsmith_timeline', ['fuzz_log']),
+    'analyze_memory_errors_detail': ('detailed_analysis', 'analyze_memory_errors_detail', ['gpufuzz'])
+}
+METRICS = ['seconds', 'peak_rss_mb', 'import_rss_mb', 'testcases_per_s', 'mb_per_s']
+
+
+def _peak_rss_mb():
+    # Linux上ru_maxrss的单位为KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(module, function, paths):
+    """子进程中执行：导入入口所在模块后调用入口，打印JSON结果"""
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    entry = getattr(__import__(module), function)
+    import_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    entry(*paths)
+    seconds = time.perf_counter() - start
+    print(json.dumps({'seconds': seconds, 'import_rss_mb': import_rss, 'peak_rss_mb': _peak_rss_mb()}))
+
+
+def input_bytes(paths):
+    """入口读取的输入总字节数"""
+    total = 0
+    for path in map(Path, paths):
+        if path.is_file():
+            total += path.stat().st_size
+        elif path.is_dir():
+            for root, _, files in os.walk(path):
+                total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def measure_entry(name, paths, timeout=None):
+    """在子进程中运行一次入口，返回测量结果；失败时返回None"""
+    module, function, _ = ENTRY_POINTS[name]
+    argv = [sys.executable, os.path.abspath(__file__), '--child', module, function] + [str(p) for p in paths]
+    # 入口中的print输出到子进程的stdout，结果在最后一行
+    try:
+        proc = subprocess.run(argv, capture_output=True, text=True, timeout=timeout,
+                              env={**os.environ, 'MPLBACKEND': 'Agg'})
+    except subprocess.TimeoutExpired:
+        print(f"Warning: {name} timed out after {timeout}s")
+        return None
+    if proc.returncode != 0:
+        tail = '\n'.join(proc.stderr.strip().splitlines()[-5:])
+        print(f"Warning: {name} failed (exit {proc.returncode}):\n{tail}")
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_benchmarks(scales, entries, repetitions, corpus_dir, seed=0, trace_bytes=TRACE_BYTES_PER_TESTCASE,
+                   timeout=None):
+    """生成（或复用）各规模的语料并运行全部入口，返回测量记录列表"""
+    records = []
+    for scale in scales:
+        testcases = SCALES[scale]
+        out_dir = Path(corpus_dir) / scale
+        print(f"Corpus {scale}: {out_dir}")
+        manifest = generate_corpus(out_dir, testcases, seed, trace_bytes)
+        paths = corpus_paths(out_dir)
+        for name in entries:
+            entry_paths = [paths[key] for key in ENTRY_POINTS[name][2]]
+            size = input_bytes(entry_paths)
+            for repetition in range(repetitions):
+                result = measure_entry(name, entry_paths, timeout)
+                if result is None:
+                    continue
+                seconds = result['seconds']
+                result['testcases_per_s'] = testcases / seconds if seconds > 0 else float('nan')
+                result['mb_per_s'] = size / 2**20 / seconds if seconds > 0 else float('nan')
+                print(f"  {name} #{repetition}: {seconds:.2f}s, {result['testcases_per_s']:.0f} testcases/s, "
+                      f"{result['mb_per_s']:.1f} MB/s, peak RSS {result['peak_rss_mb']:.0f} MB "
+                      f"(import {result['import_rss_mb']:.0f} MB)")
+                for metric in METRICS:
+                    records.append({'suite': scale, 'benchmark': f"{name}@{scale}", 'tool': metric,
+                                    'repetition': repetition, 'value': result[metric]})
+        records.append({'suite': scale, 'benchmark': f"corpus@{scale}", 'tool': 'seconds', 'repetition': 0,
+                        'value': manifest['generated_in']})
+    return records
+
+
+def check_prefilter(scales, corpus_dir, seed=0, workers=1):
+    """在带有较大干净日志的语料上比较预过滤和完整扫描的逐文件记录，返回不一致的日志数"""
+    from gpufuzz_scan import check_prefilter as compare_scans
+    failures = 0
+    for scale in scales:
+        out_dir = Path(corpus_dir) / f"prefilter-{scale}"
+        generate_corpus(out_dir, SCALES[scale], seed, clean_log_bytes=CHECK_CLEAN_LOG_BYTES)
+        mismatches, prefilter = compare_scans(corpus_paths(out_dir)['gpufuzz'], workers)
+        skipped = prefilter['skipped_logs'] if prefilter else 0
+        print(f"Prefilter check {scale}: {skipped} logs skipped, {len(mismatches)} mismatches")
+        for name in mismatches[:10]:
+            print(f"  {name}")
+        failures += len(mismatches)
+    return failures
+
+
+def write_records(path, records):
+    """长表格式，bench_data.load_long和perf_history.py record可以直接读取"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['suite', 'benchmark', 'tool', 'repetition', 'value'])
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def print_table(records):
+    """各入口在各规模下的中位数"""
+    values = {}
+    for record in records:
+        values.setdefault((record['benchmark'], record['tool']), []).append(record['value'])
+    print(f"\n{'Benchmark':<40} {'seconds':>9} {'testcases/s':>12} {'MB/s':>8} {'peak MB':>8}")
+    for benchmark in dict.fromkeys(record['benchmark'] for record in records):
+        if benchmark.startswith('corpus@'):
+            continue
+        cells = []
+        for metric in ['seconds', 'testcases_per_s', 'mb_per_s', 'peak_rss_mb']:
+            samples = sorted(values.get((benchmark, metric), []))
+            cells.append(samples[len(samples) // 2] if samples else float('nan'))
+        print(f"{benchmark:<40} {cells[0]:>9.2f} {cells[1]:>12.0f} {cells[2]:>8.1f} {cells[3]:>8.0f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3], sys.argv[4:])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description='Benchmark the analysis entry points on synthetic corpora')
+    parser.add_argument('--scales', default='10k,100k,1M', help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument('--entry', action='append', choices=list(ENTRY_POINTS), default=None)
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--corpus-dir', default='synth_corpus')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace-bytes', type=int, default=TRACE_BYTES_PER_TESTCASE)
+    parser.add_argument('--timeout', type=float, default=None, help='seconds per run')
+    parser.add_argument('--out', default='bench_analysis.csv')
+    parser.add_argument('--check-prefilter', action='store_true',
+                        help='only compare prefilter and full-scan records (exit status 1 on any mismatch)')
+    args = parser.parse_args()
+
+    scales = [s.strip() for s in args.scales.split(',') if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale: {', '.join(unknown)}")
+    if args.check_prefilter:
+        sys.exit(1 if check_prefilter(scales, args.corpus_dir, args.seed) else 0)
+    records = run_benchmarks(scales, args.entry or list(ENTRY_POINTS), args.repetitions, args.corpus_dir,
+                             args.seed, args.trace_bytes, args.timeout)
+    write_records(args.out, records)
+    print_table(records)
+    print(f"\nSaved: {args.out}")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+预编译多模式匹配器的微基准
+对比原来逐个模式re.findall/re.search的分类循环与sanitizer_patterns中的单次扫描，
+并检查两者对每个日志的分类结果一致
+
+用法：
+    python bench_matcher.py                 # 使用合成的compute-sanitizer日志
+    python bench_matcher.py /path/to/logs   # 使用真实日志目录中的log*.txt（与扫描引擎相同的选择）
+"""
+
+import argparse
+import random
+import re
+import time
+
+from gpufuzz_scan import is_timeline_log, scan_log_text
+from log_source import list_logs, logical_name, open_log_text
+from sanitizer_patterns import ERROR_PATTERNS, MEMORY_SUBTYPE_PATTERNS, TIMELINE_PATTERNS
+
+# legacy_scan产出的键；扫描记录之后增加的键（kernel、offset等）不参与比较
+LEGACY_KEYS = ('error_type', 'signature', 'other_error', 'timeline', 'memory_subtype', 'operator')
+
+
+def legacy_scan(content):
+    """原来三个分析函数对同一日志内容做的全部模式检查"""
+    record = {'error_type': None, 'signature': None, 'other_error': False,
+              'timeline': False, 'memory_subtype': None, 'operator': None}
+
+    # analyze_gpufuzz_logs
+    if len(content) > 100:
+        has_error = False
+        for error_type, patterns in ERROR_PATTERNS.items():
+            for pattern in patterns:
+                matches = re.findall(pattern, content, re.IGNORECASE)
+                if matches:
+                    has_error = True
+                    record['error_type'] = error_type
+                    record['signature'] = f"{error_type}:{pattern}"
+                    break
+            if has_error:
+                break
+        if not has_error:
+            record['other_error'] = 'ERROR SUMMARY' in content or 'error' in content.lower()
+
+    # parse_gpufuzz_timeline
+    for pattern in TIMELINE_PATTERNS:
+        if re.search(pattern, content, re.IGNORECASE):
+            record['timeline'] = True
+            break
+
+    # analyze_memory_errors_detail
+    for subtype, pattern in MEMORY_SUBTYPE_PATTERNS.items():
+        if re.search(pattern, content, re.IGNORECASE):
+            record['memory_subtype'] = subtype
+            op_match = re.search(r'at::native::.*?::(\w+)', content)
+            if op_match:
+                record['operator'] = op_match.group(1)
+            break
+
+    return record
+
+
+def synthetic_violation(rng):
+    """一条compute-sanitizer内存错误报告"""
+    space = rng.choice(['global', 'shared'])
+    access = rng.choice(['read', 'write'])
+    return (
+        f"========= Invalid __{space}__ {access} of size 4 bytes\n"
+        f"=========     at 0x{rng.randrange(1 << 16):x} in void at::native::(anonymous namespace)::col2im_kernel<float>(long, float const*)\n"
+        f"=========     by thread ({rng.randrange(256)},0,0) in block ({rng.randrange(4096)},0,0)\n"
+        f"=========     Address 0x{rng.randrange(1 << 40):x} is out of bounds\n"
+        f"=========     and is {rng.randrange(1 << 33)} bytes after the nearest allocation at 0x7f2a00000000 of size 1024 bytes\n"
+        "=========     Saved host backtrace up to driver entry point at kernel launch time\n"
+        f"=========     Host Frame: [0x{rng.randrange(1 << 30):x}] in libtorch_cuda.so\n"
+        "=========\n"
+    )
+
+
+def synthetic_logs(seed=0):
+    """不同规模的合成日志：干净日志、配置错误、OOM、少量/大量内存错误"""
+    rng = random.Random(seed)
+    header = "========= COMPUTE-SANITIZER\n"
+    traceback = "Traceback (most recent call last):\n  File \"model_gen.py\", line 212, in run\n" * 20
+    return {
+        'clean': header,
+        'clean_with_output': header + traceback + "========= ERROR SUMMARY: 0 errors\n",
+        'config': header + traceback + "========= Program hit cudaErrorInvalidConfiguration (error 9) "
+                  "due to \"invalid configuration argument\" on CUDA API call to cudaLaunchKernel.\n"
+                  "========= ERROR SUMMARY: 1 error\n",
+        'oom': header + traceback + "========= Program hit cudaErrorMemoryAllocation (error 2) "
+               "due to \"out of memory\" on CUDA API call to cudaMalloc.\n========= ERROR SUMMARY: 1 error\n",
+        'memory_10': header + ''.join(synthetic_violation(rng) for _ in range(10)) + "========= ERROR SUMMARY: 10 errors\n",
+        'memory_5000': header + ''.join(synthetic_violation(rng) for _ in range(5000)) + "========= ERROR SUMMARY: 5000 errors\n",
+    }
+
+
+def real_logs(log_dir):
+    """日志目录（或压缩目录、归档）中的log*.txt，不包括trace.txt"""
+    logs = {}
+    for log_file in list_logs(log_dir):
+        name = logical_name(log_file.name)
+        if is_timeline_log(name):
+            with open_log_text(log_file) as f:
+                logs[name] = f.read()
+    return logs
+
+
+def bench(func, contents, repeat):
+    """返回最好一轮的耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in contents:
+            func(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the precompiled matcher against the legacy pattern loop')
+    parser.add_argument('log_dir', nargs='?', default=None, help='real log directory (default: synthetic logs)')
+    parser.add_argument('--repeat', type=int, default=None, help='timing rounds (default: 3 real, 20 synthetic)')
+    args = parser.parse_args()
+
+    if args.log_dir:
+        logs = {'all': list(real_logs(args.log_dir).values())}
+        repeat = args.repeat or 3
+    else:
+        logs = {name: [content] for name, content in synthetic_logs().items()}
+        repeat = args.repeat or 20
+
+    print(f"{'case':<20}{'bytes':>12}{'legacy (ms)':>14}{'matcher (ms)':>14}{'speedup':>10}")
+    for name, contents in logs.items():
+        for content in contents:
+            record = scan_log_text(content)
+            if legacy_scan(content) != {key: record[key] for key in LEGACY_KEYS}:
+                raise SystemExit(f"Mismatch in {name}")
+        size = sum(len(content) for content in contents)
+        legacy = bench(legacy_scan, contents, repeat)
+        matcher = bench(scan_log_text, contents, repeat)
+        print(f"{name:<20}{size:>12}{legacy * 1000:>14.3f}{matcher * 1000:>14.3f}{legacy / matcher:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+compute-sanitizer报告的指纹与近似重复聚类
+"{error_type}:{pattern}"签名会把不同的bug合并到少数几个类别中；这里对每个出错日志的第一份报告做规范化：
+去掉地址、线程/block下标和字节偏移，保留访问类型与大小、kernel名和前几个host frame，
+得到精确指纹（规范化文本的哈希）和64位SimHash。聚类先按精确指纹合并，
+再用SimHash分段的哈希索引（LSH）只比较至少有一段相同的候选对，整体接近线性
+
+用法：
+    python bug_fingerprint.py /path/to/log_dir [--cache analysis_cache.sqlite] [--out clusters.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from analysis_cache import cache_key, delete_entries, entry_payload, load_entries, open_cache, store_entries
+from log_source import archive_order, log_identity, open_log_text
+
+# 指纹格式版本，变化时缓存中的旧条目失效
+FINGERPRINT_VERSION = 2
+
+# 参与指纹的host frame数
+HOST_FRAMES = 5
+# 报告最多读取的行数（很长的backtrace只需要前几帧）
+REPORT_MAX_LINES = 64
+
+# SimHash分为BANDS段，汉明距离不超过MAX_HAMMING的两个签名至少有一段完全相同（鸽巢原理）
+SIMHASH_BITS = 64
+BANDS = 4
+MAX_HAMMING = 3
+
+# 只对真实bug（内存错误和配置错误）做指纹
+FINGERPRINT_ERROR_TYPES = ('memory_errors', 'config_errors')
+
+SANITIZER_PREFIX = re.compile(r'^=+ ?')
+HEX_PATTERN = re.compile(r'0x[0-9a-fA-F]+')
+NUMBER_PATTERN = re.compile(r'\b\d+\b')
+KERNEL_LINE = re.compile(r'^at (?:0x[0-9a-fA-F]+ )?in (?:void )?(.*)$')
+FRAME_LINE = re.compile(r'^(Host|Device) Frame: ?(.*?)(?: in (\S+))?$')
+# frame中每个进程不同的部分（ASLR）：任意位置的[0x...]地址，以及函数内偏移"+ 0x..."（可以在括号内）
+FRAME_ADDRESS = re.compile(r'\s*\[0x[0-9a-fA-F]+\]')
+FRAME_OFFSET = re.compile(r'\s*\+\s*0x[0-9a-fA-F]+')
+DISTANCE_LINE = re.compile(r'^and is \d+ bytes (after|before) the nearest allocation')
+ADDRESS_LINE = re.compile(r'^Address 0x[0-9a-fA-F]+ (.*)$')
+# 每份报告都带有、与bug无关的行
+SKIP_LINES = re.compile(r'^(by thread|Saved host backtrace|COMPUTE-SANITIZER|ERROR SUMMARY)')
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def normalize_report(lines):
+    """规范化一份报告（已去掉=========前缀的行），返回规范化后的文本行"""
+    header = HEX_PATTERN.sub('0x?', lines[0].strip())
+    normalized = [header]
+    frames = 0
+    for line in lines[1:]:
+        line = line.strip()
+        if not line or SKIP_LINES.match(line):
+            continue
+        kernel = KERNEL_LINE.match(line)
+        if kernel:
+            normalized.append('kernel ' + HEX_PATTERN.sub('0x?', kernel.group(1)))
+            continue
+        frame = FRAME_LINE.match(line)
+        if frame:
+            if frames < HOST_FRAMES:
+                # 去掉地址、函数内偏移和库的目录（不同机器上的安装路径不同）
+                func = FRAME_OFFSET.sub('', FRAME_ADDRESS.sub('', frame.group(2))).strip()
+                if func.startswith('/'):
+                    func = os.path.basename(func)
+                parts = ['frame', HEX_PATTERN.sub('0x?', func), os.path.basename(frame.group(3) or '')]
+                normalized.append(' '.join(part for part in parts if part))
+                frames += 1
+            continue
+        distance = DISTANCE_LINE.match(line)
+        if distance:
+            normalized.append(f"allocation {distance.group(1)}")
+            continue
+        address = ADDRESS_LINE.match(line)
+        if address:
+            normalized.append(f"address {address.group(1)}")
+            continue
+        normalized.append(NUMBER_PATTERN.sub('N', HEX_PATTERN.sub('0x?', line)))
+    return normalized
+
+
+def first_report(log_file):
+    """读取日志中的第一份sanitizer报告（标题行及其后缩进的行），只读到报告结束为止"""
+    report = []
+    with open_log_text(log_file) as f:
+        for raw in f:
+            if not raw.startswith('='):
+                if report:
+                    break
+                continue
+            line = SANITIZER_PREFIX.sub('', raw.rstrip('\n'))
+            if report:
+                # 空的=========行或下一个不缩进的标题行表示报告结束
+                if not line.strip() or not line[0].isspace():
+                    break
+                report.append(line)
+                if len(report) >= REPORT_MAX_LINES:
+                    break
+            elif line.strip() and not line[0].isspace() and not SKIP_LINES.match(line):
+                report.append(line)
+    return report
+
+
+def simhash_many(token_lists):
+    """批量计算64位SimHash：每个token用blake2b哈希，所有报告的逐位投票在一次NumPy运算中完成"""
+    counts = np.array([len(tokens) for tokens in token_lists], dtype=np.int64)
+    hashes = np.frombuffer(b''.join(hashlib.blake2b(t.encode(), digest_size=8).digest()
+                                    for tokens in token_lists for t in tokens), dtype=np.uint8)
+    result = np.zeros(len(token_lists), dtype='<u8')
+    nonempty = counts > 0
+    if nonempty.any():
+        bits = np.unpackbits(hashes.reshape(-1, 8), axis=1, bitorder='little').astype(np.int32)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[nonempty]
+        votes = np.add.reduceat(bits, starts, axis=0) * 2 - counts[nonempty, None]
+        result[nonempty] = np.packbits(votes > 0, axis=1, bitorder='little').view('<u8')[:, 0]
+    return [int(h) for h in result]
+
+
+def simhash(tokens):
+    """token集合的64位SimHash"""
+    return simhash_many([tokens])[0]
+
+
+def report_features(normalized):
+    """SimHash的特征：每行的单词，以及整行（frame和kernel行作为整体更有区分度）"""
+    features = set()
+    for line in normalized:
+        features.add(line)
+        features.update(TOKEN_PATTERN.findall(line))
+    return sorted(features)
+
+
+def exact_fingerprint(normalized):
+    """规范化文本的哈希（精确指纹）"""
+    return hashlib.blake2b('\n'.join(normalized).encode(), digest_size=8).hexdigest()
+
+
+def check_normalization():
+    """只有frame地址不同的两份报告必须得到相同的指纹"""
+    def report(address, offset):
+        return ['Invalid __global__ write of size 4 bytes',
+                'at 0x1f0 in void at::native::fill_kernel(int)',
+                f"Host Frame: [{address}] in /usr/lib/x86_64-linux-gnu/libcuda.so.1",
+                f"Host Frame:/usr/lib/libc.so (foo + {offset}) [{address}]",
+                f"Host Frame:cuLaunchKernel [{address}] in /usr/lib/libcuda.so"]
+    first = normalize_report(report('0xb53aea', '0x12'))
+    second = normalize_report(report('0x7f3c21', '0x9a'))
+    assert exact_fingerprint(first) == exact_fingerprint(second), (first, second)
+    assert not any('[0x' in line or '+ 0x' in line for line in first), first
+
+
+def fingerprint_logs(items):
+    """对若干(日志路径, 签名)做指纹；没有sanitizer报告（例如Python端的错误）时以签名作为规范化文本"""
+    normalized = []
+    for log_file, signature in items:
+        report = first_report(log_file)
+        normalized.append(normalize_report(report) if report else [signature])
+    hashes = simhash_many([report_features(lines) for lines in normalized])
+    payloads = []
+    for lines, h in zip(normalized, hashes):
+        payloads.append({
+            'fingerprint': exact_fingerprint(lines),
+            'simhash': f"{h:016x}",
+            'canonical': '\n'.join(lines)
+        })
+    return payloads
+
+
+def fingerprint_records(log_dir, records, cache=None):
+    """对扫描记录中的真实bug日志做指纹，返回 日志名 -> 指纹；cache为SQLite缓存文件路径时只处理变化的日志"""
+    log_path = Path(log_dir)
+    conn = open_cache(cache) if cache else None
+    fingerprints = {}
+    try:
+        entries = load_entries(conn, 'gpufuzz_fingerprint', log_path) if conn is not None else {}
+        pending = []
+        for record in records:
+            if record.get('read_error') or record.get('error_type') not in FINGERPRINT_ERROR_TYPES:
+                continue
+            log_file = log_path / record['name']
+            identity = log_identity(log_file)
+            payload = entry_payload(entries.pop(cache_key(log_file), None), log_file, identity, FINGERPRINT_VERSION)
+            if payload is None:
+                pending.append((log_file, identity, record['signature']))
+            # 未缓存的先占位，保持日志的顺序
+            fingerprints[record['name']] = payload
+        # 压缩的归档只能顺序读取，按成员在归档中的顺序读取日志
+        order = {log_file: i for i, log_file in enumerate(archive_order([item[0] for item in pending]))}
+        pending.sort(key=lambda item: order[item[0]])
+        payloads = fingerprint_logs([(log_file, signature) for log_file, _, signature in pending])
+        fresh = []
+        for (log_file, identity, _), payload in zip(pending, payloads):
+            fingerprints[log_file.name] = payload
+            fresh.append((log_file, identity, payload))
+        if conn is not None:
+            store_entries(conn, 'gpufuzz_fingerprint', fresh, FINGERPRINT_VERSION)
+            delete_entries(conn, 'gpufuzz_fingerprint', entries)
+    finally:
+        if conn is not None:
+            conn.close()
+    return fingerprints
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _popcount(values):
+    """uint64数组每个元素中1的个数"""
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def cluster_fingerprints(fingerprints, max_hamming=MAX_HAMMING):
+    """近似重复聚类，返回按大小降序排列的簇列表
+
+    相同精确指纹的日志先合并；不同指纹之间只比较SimHash至少有一段相同的候选，
+    汉明距离不超过max_hamming的两者合并到同一簇（并查集）。
+    同一个桶内的成员只与桶内已有的簇代表比较（向量化），而不是两两比较，
+    相似的报告大量落入同一个桶时也不会退化为平方级
+    """
+    groups = defaultdict(list)
+    for name, fp in fingerprints.items():
+        groups[fp['fingerprint']].append(name)
+    keys = list(groups)
+    hashes = np.array([int(fingerprints[groups[key][0]]['simhash'], 16) for key in keys], dtype=np.uint64)
+
+    parent = list(range(len(keys)))
+    band_bits = SIMHASH_BITS // BANDS
+    mask = np.uint64((1 << band_bits) - 1)
+    for band in range(BANDS):
+        # 按这一段的值排序，值相同的连续一段即为一个桶
+        band_values = (hashes >> np.uint64(band * band_bits)) & mask
+        order = np.argsort(band_values, kind='stable')
+        for members in np.split(order, np.flatnonzero(np.diff(band_values[order])) + 1):
+            leaders = members[:1]
+            for i in members[1:].tolist():
+                close = leaders[_popcount(hashes[leaders] ^ hashes[i]) <= max_hamming]
+                for j in close.tolist():
+                    parent[_find(parent, j)] = _find(parent, i)
+                if not len(close):
+                    leaders = np.append(leaders, i)
+
+    clusters = defaultdict(list)
+    for i in range(len(keys)):
+        clusters[_find(parent, i)].append(i)
+    result = []
+    for members in clusters.values():
+        members.sort(key=lambda i: -len(groups[keys[i]]))
+        logs = [name for i in members for name in groups[keys[i]]]
+        result.append({
+            'fingerprints': [keys[i] for i in members],
+            'logs': logs,
+            'representative': fingerprints[groups[keys[members[0]]][0]]['canonical']
+        })
+    result.sort(key=lambda c: -len(c['logs']))
+    return result
+
+
+def fingerprint_summary(fingerprints, clusters):
+    """用于统计摘要的数量：精确指纹数和近似重复簇数"""
+    return {
+        'fingerprinted_logs': len(fingerprints),
+        'unique_fingerprints': len({fp['fingerprint'] for fp in fingerprints.values()}),
+        'fingerprint_clusters': len(clusters)
+    }
+
+
+if __name__ == '__main__':
+    from gpufuzz_scan import scan_gpufuzz_campaign
+
+    parser = argparse.ArgumentParser(description='Fingerprint and cluster compute-sanitizer reports')
+    parser.add_argument('log_dir')
+    parser.add_argument('--cache', default=None, help='SQLite analysis cache')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--max-hamming', type=int, default=MAX_HAMMING)
+    parser.add_argument('--out', default=None, help='write clusters as JSON')
+    args = parser.parse_args()
+
+    check_normalization()
+    scan = scan_gpufuzz_campaign(args.log_dir, workers=args.workers, cache=args.cache)
+    if scan is None:
+        print(f"Warning: {args.log_dir} does not exist")
+    else:
+        fingerprints = fingerprint_records(args.log_dir, scan['records'], args.cache)
+        clusters = cluster_fingerprints(fingerprints, args.max_hamming)
+        summary = fingerprint_summary(fingerprints, clusters)
+        print(f"{summary['fingerprinted_logs']} bug logs, {scan['stats']['unique_bug_count']} signatures, "
+              f"{summary['unique_fingerprints']} fingerprints, {summary['fingerprint_clusters']} clusters")
+        for cluster in clusters[:10]:
+            print(f"\n[{len(cluster['logs'])} logs, {len(cluster['fingerprints'])} fingerprints]")
+            print('  ' + cluster['representative'].replace('\n', '\n  '))
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump(clusters, f, indent=2)
+            print(f"\nSaved: {args.out}")
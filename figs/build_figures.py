@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+论文图表的增量构建
+每个图表声明自己的脚本、输入文件（CSV、事件表等）和输出文件；输入内容的哈希没有变化且输出仍然存在时跳过，
+过期的图表在多个工作进程中并行生成。工作进程使用无界面的Agg后端（不需要Qt/显示器），
+并共享一个持久的matplotlib缓存目录（字体缓存和usetex的TeX/dvi缓存），相同的标签文本只需要调用一次LaTeX
+
+用法：
+    python build_figures.py                # 只重新生成过期的图表
+    python build_figures.py draw opt       # 只处理指定的图表
+    python build_figures.py --force        # 全部重新生成
+    python build_figures.py --list
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = ROOT / '.figure_cache'
+STATE_FILE = CACHE_DIR / 'state.json'
+# 工作进程共享的MPLCONFIGDIR：字体缓存和tex.cache跨运行保留
+MPL_CACHE_DIR = CACHE_DIR / 'matplotlib'
+# 图表生成失败时显示的输出行数
+FAILURE_TAIL_LINES = 12
+
+# 图表声明：cwd为运行目录（相对于仓库根目录），script、inputs、outputs都相对于cwd；
+# optional_inputs不存在时不影响构建，存在时计入哈希；
+# 有function时导入script并调用function(*args)，否则以__main__方式运行script
+FIGURES = [
+    {'name': 'draw', 'cwd': 'draw', 'script': 'draw.py',
+     'inputs': ['data.csv', 'bench_data.py'], 'outputs': ['draw.pdf']},
+    {'name': 'opt', 'cwd': 'draw', 'script': 'opt.py',
+     'inputs': ['opt.csv', 'bench_data.py', 'perf_history.py'], 'optional_inputs': ['perf_history.sqlite'],
+     'outputs': ['opt.pdf']},
+    {'name': 'bug_stats', 'cwd': 'figs', 'script': 'generate_bug_stats.py',
+     'inputs': [], 'outputs': ['bug_by_error_type.pdf']},
+    {'name': 'detailed', 'cwd': 'figs', 'script': 'detailed_analysis.py',
+     'function': 'plot_campaign_file', 'args': ['campaign_events.npz'],
+     'inputs': ['campaign_events.npz', 'event_store.py', 'timeline_sampling.py'],
+     'outputs': ['bug_discovery_timeline.pdf', 'bug_severity_comparison.pdf', 'test_case_efficiency.pdf',
+                 'memory_error_details.pdf']},
+]
+
+
+def _hash_file(h, name, path):
+    h.update(name.encode() + b'\0')
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+
+
+def figure_hash(figure):
+    """图表的输入哈希：声明本身、脚本和全部输入文件的内容，以及matplotlib的版本；有输入缺失时返回None"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps(figure, sort_keys=True).encode())
+    h.update(metadata.version('matplotlib').encode())
+    cwd = ROOT / figure['cwd']
+    for name in [figure['script']] + figure['inputs']:
+        path = cwd / name
+        if not path.exists():
+            return None
+        _hash_file(h, name, path)
+    for name in figure.get('optional_inputs', []):
+        path = cwd / name
+        if path.exists():
+            _hash_file(h, name, path)
+    return h.hexdigest()
+
+
+def load_state():
+    if STATE_FILE.exists():
+        try:
+            with open(STATE_FILE) as f:
+                return json.load(f)
+        except ValueError:
+            print(f"Warning: ignoring corrupt {STATE_FILE}")
+    return {}
+
+
+def save_state(state):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, STATE_FILE)
+
+
+def is_stale(figure, digest, state):
+    """输入有变化，或者有输出文件不存在"""
+    if state.get(figure['name']) != digest:
+        return True
+    cwd = ROOT / figure['cwd']
+    return not all((cwd / name).exists() for name in figure['outputs'])
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def render_figure(figure):
+    """在工作进程中生成一个图表，返回(名称, 是否成功, 耗时, 输出)"""
+    import importlib
+    import runpy
+
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    cwd = ROOT / figure['cwd']
+    output = io.StringIO()
+    ok = True
+    old_cwd = os.getcwd()
+    try:
+        os.chdir(cwd)
+        if str(cwd) not in sys.path:
+            sys.path.insert(0, str(cwd))
+        # 同一个进程会依次生成多个图表，每个图表从默认的rcParams开始
+        matplotlib.rcdefaults()
+        with contextlib.redirect_stdout(output):
+            if 'function' in figure:
+                module = importlib.import_module(Path(figure['script']).stem)
+                getattr(module, figure['function'])(*figure.get('args', []))
+            else:
+                # 脚本看到的命令行参数只有自己，不受构建脚本参数的影响
+                sys.argv = [figure['script']]
+                runpy.run_path(figure['script'], run_name='__main__')
+        missing = [name for name in figure['outputs'] if not (cwd / name).exists()]
+        if missing:
+            ok = False
+            output.write(f"missing outputs: {', '.join(missing)}\n")
+    except BaseException:
+        ok = False
+        output.write(traceback.format_exc())
+    finally:
+        plt.close('all')
+        os.chdir(old_cwd)
+    return figure['name'], ok, time.perf_counter() - start, output.getvalue()
+
+
+def build_figures(names=None, force=False, workers=None):
+    """生成过期的图表，返回失败的图表名列表"""
+    figures = [f for f in FIGURES if names is None or f['name'] in names]
+    state = load_state()
+    stale = []
+    digests = {}
+    for figure in figures:
+        digest = figure_hash(figure)
+        if digest is None:
+            print(f"  {figure['name']}: skipped (missing inputs)")
+            continue
+        digests[figure['name']] = digest
+        if force or is_stale(figure, digest, state):
+            stale.append(figure)
+        else:
+            print(f"  {figure['name']}: up to date")
+    if not stale:
+        return []
+
+    # 环境变量在创建进程池之前设置，工作进程继承后再导入matplotlib
+    MPL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    os.environ['MPLCONFIGDIR'] = str(MPL_CACHE_DIR)
+    os.environ['MPLBACKEND'] = 'Agg'
+    workers = min(len(stale), workers or os.cpu_count() or 1)
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for name, ok, seconds, output in pool.map(render_figure, stale):
+            if ok:
+                state[name] = digests[name]
+                print(f"  {name}: built in {seconds:.1f}s")
+            else:
+                failed.append(name)
+                state.pop(name, None)
+                print(f"  {name}: FAILED after {seconds:.1f}s")
+                # 只显示输出的最后几行（通常是异常信息）
+                print('    ' + '\n    '.join(output.rstrip().splitlines()[-FAILURE_TAIL_LINES:]))
+    save_state(state)
+    return failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild stale paper figures in parallel')
+    parser.add_argument('names', nargs='*', help='figures to build (default: all)')
+    parser.add_argument('--force', action='store_true', help='rebuild even if inputs are unchanged')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--list', action='store_true', help='list declared figures and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for figure in FIGURES:
+            print(f"{figure['name']}: {figure['cwd']}/{figure['script']} -> {', '.join(figure['outputs'])}")
+        sys.exit(0)
+    unknown = set(args.names) - {f['name'] for f in FIGURES}
+    if unknown:
+        print(f"Unknown figures: {', '.join(sorted(unknown))}")
+        sys.exit(2)
+    failed = build_figures(args.names or None, args.force, args.workers)
+    sys.exit(1 if failed else 0)
@@ -4,18 +4,28 @@
 用于论文的Evaluation章节
 """
 
-import os
 import re
-import matplotlib.pyplot as plt
-import numpy as np
 from pathlib import Path
 
-# 设置字体
-plt.rcParams['font.family'] = 'serif'
-plt.rcParams['font.serif'] = ['Times New Roman']
-plt.rcParams['axes.unicode_minus'] = False
+import instrument
+from analysis_cache import cached_parse, new_cache_stats, open_cache
+from gpufuzz_scan import DEFAULT_CHUNKSIZE, scan_gpufuzz_campaign
+from nnsmith_bugs import bug_report_summary, ingest_bug_reports, print_bug_report_summary
+from nnsmith_log import log_runtime_hours, scan_log_totals
+from trace_scan import format_throughput
 
-def analyze_gpufuzz_logs(log_dir):
+def _pyplot():
+    """按需导入matplotlib并设置字体：只输出文本统计时不加载matplotlib"""
+    import matplotlib.pyplot as plt
+    plt.rcParams['font.family'] = 'serif'
+    plt.rcParams['font.serif'] = ['Times New Roman']
+    plt.rcParams['axes.unicode_minus'] = False
+    return plt
+
+# NNSmith解析结果的格式版本，变化时缓存中的旧条目失效
+NNSMITH_VERSION = 1
+
+def analyze_gpufuzz_logs(log_dir, scan=None, workers=1, chunksize=DEFAULT_CHUNKSIZE, cache=None):
     """分析GPU-Fuzz的日志文件
     
     注意：根据源码分析（controller.py和model_gen.py）：
@@ -23,101 +33,46 @@ def analyze_gpufuzz_logs(log_dir):
     - 每次model_gen.py执行会生成多个测试用例（通过while循环）
     - 每个测试用例执行时会打印mat_shapes（格式为[[...]]）
     - 因此，应该统计trace.txt中[[...]]的数量作为实际测试用例数
+    
+    统计来自单遍扫描引擎（gpufuzz_scan.py）；已有扫描结果时通过scan传入，避免重复读取日志。
+    workers > 1时用进程池并行扫描，每个分片包含chunksize个日志文件；
+    cache为SQLite缓存文件路径时只解析新增或变化的日志
     """
-    log_path = Path(log_dir)
-    if not log_path.exists():
+    if scan is None:
+        scan = scan_gpufuzz_campaign(log_dir, workers=workers, chunksize=chunksize, cache=cache)
+    if scan is None:
         print(f"Warning: {log_dir} does not exist")
         return {}
+    return scan['stats']
+
+def count_nnsmith_bugs(bug_path):
+    """统计bug目录数量及其Symptom类型"""
+    bug_dirs = list(Path(bug_path).glob('bug-*'))
+    bug_types = {}
+    for bug_dir in bug_dirs:
+        bug_name = bug_dir.name
+        # 提取Symptom类型
+        match = re.search(r'Symptom\.([^-]+)', bug_name)
+        if match:
+            bug_type = match.group(1)
+            bug_types[bug_type] = bug_types.get(bug_type, 0) + 1
+    return {'total_bugs': len(bug_dirs), 'bug_types': bug_types}
+
+def parse_nnsmith_log(log_path):
+    """从fuzz.log提取统计信息，日志中没有出现的字段为None
     
-    stats = {
-        'total_logs': 0,  # 日志文件数（log*.txt）
-        'total_testcases': 0,  # 实际测试用例数（trace.txt中[[...]]的数量）
-        'logs_with_errors': 0,
-        'memory_errors': 0,  # Invalid write/read
-        'config_errors': 0,  # cudaErrorInvalidConfiguration
-        'oom_errors': 0,  # cudaErrorMemoryAllocation
-        'other_errors': 0,
-        'unique_bugs': set()  # 用于去重
-    }
-    
-    # 统计实际测试用例数（从trace.txt中统计[[...]]的数量）
-    trace_file = log_path / "trace.txt"
-    if trace_file.exists():
-        try:
-            with open(trace_file, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                # 统计[[...]]的数量，这是每个测试用例执行时打印的mat_shapes
-                testcase_pattern = r'^\[\[.*?\]\]'
-                matches = re.findall(testcase_pattern, content, re.MULTILINE)
-                stats['total_testcases'] = len(matches)
-        except Exception as e:
-            print(f"Error reading trace.txt: {e}")
-    
-    # 统计错误类型
-    error_patterns = {
-        'memory_errors': [
-            r'Invalid __global__ write',
-            r'Invalid __global__ read',
-            r'Invalid __shared__ write',
-            r'Invalid __shared__ read',
-            r'out of bounds',
-            r'misaligned'
-        ],
-        'config_errors': [
-            r'cudaErrorInvalidConfiguration',
-            r'invalid configuration argument'
-        ],
-        'oom_errors': [
-            r'cudaErrorMemoryAllocation',
-            r'out of memory'
-        ]
-    }
-    
-    for log_file in sorted(log_path.glob('*.txt')):
-        stats['total_logs'] += 1
-        try:
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                
-            # 检查是否有错误（排除只有COMPUTE-SANITIZER头部的情况）
-            if len(content) > 100:  # 大于100字节说明有实际内容
-                has_error = False
-                bug_signature = []
-                
-                # 检查各种错误类型
-                for error_type, patterns in error_patterns.items():
-                    for pattern in patterns:
-                        matches = re.findall(pattern, content, re.IGNORECASE)
-                        if matches:
-                            has_error = True
-                            bug_signature.append(f"{error_type}:{pattern}")
-                            if error_type == 'memory_errors':
-                                stats['memory_errors'] += 1
-                            elif error_type == 'config_errors':
-                                stats['config_errors'] += 1
-                            elif error_type == 'oom_errors':
-                                stats['oom_errors'] += 1
-                            break
-                    if has_error:
-                        break
-                
-                # 检查其他错误
-                if has_error:
-                    stats['logs_with_errors'] += 1
-                    # 创建bug签名用于去重
-                    signature = '|'.join(sorted(bug_signature))
-                    stats['unique_bugs'].add(signature)
-                elif 'ERROR SUMMARY' in content or 'error' in content.lower():
-                    stats['other_errors'] += 1
-                    stats['logs_with_errors'] += 1
-        except Exception as e:
-            print(f"Error reading {log_file}: {e}")
-    
-    stats['unique_bug_count'] = len(stats['unique_bugs'])
-    return stats
+    测试用例数、bug数和失败数按块在字节上查找（不解码整个日志）；
+    运行时间由第一个和最后一个时间戳推断，只读取日志开头和结尾的几个块
+    """
+    fields = scan_log_totals(log_path)
+    fields['runtime_hours'] = log_runtime_hours(log_path)
+    return fields
 
-def analyze_nnsmith_results(bug_dir, log_file):
-    """分析NNSmith的结果"""
+def analyze_nnsmith_results(bug_dir, log_file, cache=None, hash_content=False):
+    """分析NNSmith的结果
+    
+    cache为SQLite缓存文件路径时，bug目录列表和fuzz.log的解析结果按文件身份缓存，未变化时不再重新解析
+    """
     stats = {
         'total_bugs': 0,
         'total_testcases': 0,
@@ -125,59 +80,41 @@ def analyze_nnsmith_results(bug_dir, log_file):
         'bug_types': {},
         'runtime_hours': 0
     }
-    
-    # 统计bug目录
-    bug_path = Path(bug_dir)
-    if bug_path.exists():
-        bug_dirs = list(bug_path.glob('bug-*'))
-        stats['total_bugs'] = len(bug_dirs)
+    conn = open_cache(cache) if cache else None
+    cache_stats = new_cache_stats()
+    
+    try:
+        # 统计bug目录（目录的修改时间随bug目录的增删而变化）
+        bug_path = Path(bug_dir)
+        if bug_path.exists():
+            with instrument.stage('bug_dirs'):
+                stats.update(cached_parse(conn, 'nnsmith_bugs', bug_path, NNSMITH_VERSION, count_nnsmith_bugs,
+                                          stats=cache_stats))
+            # 每个bug目录的报告（后端、不一致比例、差值、异常类型），线程池并行解析
+            with instrument.stage('bug_reports'):
+                stats['bug_reports'] = bug_report_summary(ingest_bug_reports(bug_path, cache=cache))
         
-        # 统计bug类型
-        for bug_dir in bug_dirs:
-            bug_name = bug_dir.name
-            # 提取Symptom类型
-            match = re.search(r'Symptom\.([^-]+)', bug_name)
-            if match:
-                bug_type = match.group(1)
-                stats['bug_types'][bug_type] = stats['bug_types'].get(bug_type, 0) + 1
-    
-    # 从日志文件提取统计信息
-    log_path = Path(log_file)
-    if log_path.exists():
-        try:
-            with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                
-            # 提取测试用例数量
-            match = re.search(r'Total (\d+) testcases generated', content)
-            if match:
-                stats['total_testcases'] = int(match.group(1))
-            
-            # 提取bug数量
-            match = re.search(r'Total (\d+) bugs found', content)
-            if match:
-                stats['total_bugs'] = int(match.group(1))
-            
-            # 提取失败数量
-            match = re.search(r'Total (\d+) failed to make testcases', content)
-            if match:
-                stats['failed_testcases'] = int(match.group(1))
-            
-            # 提取运行时间（从日志时间戳推断）
-            time_matches = re.findall(r'\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', content)
-            if len(time_matches) >= 2:
-                from datetime import datetime
-                start_time = datetime.strptime(time_matches[0], '%Y-%m-%d %H:%M:%S')
-                end_time = datetime.strptime(time_matches[-1], '%Y-%m-%d %H:%M:%S')
-                delta = end_time - start_time
-                stats['runtime_hours'] = delta.total_seconds() / 3600.0
-        except Exception as e:
-            print(f"Error reading log file: {e}")
+        # 从日志文件提取统计信息
+        log_path = Path(log_file)
+        if log_path.exists():
+            try:
+                with instrument.stage('log_totals'):
+                    fields = cached_parse(conn, 'nnsmith_log', log_path, NNSMITH_VERSION, parse_nnsmith_log,
+                                          hash_content=hash_content, stats=cache_stats)
+                stats.update({k: v for k, v in fields.items() if v is not None})
+            except Exception as e:
+                print(f"Error reading log file: {e}")
+    finally:
+        if conn is not None:
+            conn.close()
+            stats['cache'] = cache_stats
+            instrument.count_cache('nnsmith', cache_stats)
     
     return stats
 
 def plot_comparison(nnsmith_stats, gpufuzz_stats):
     """生成对比图表（仅饼图）"""
+    plt = _pyplot()
     
     # Bug类型分布对比（饼图）
     fig, axes = plt.subplots(1, 2, figsize=(14, 5))
@@ -244,15 +181,32 @@ def print_summary(nnsmith_stats, gpufuzz_stats):
     print(f"Bug Types: {nnsmith_stats['bug_types']}")
     if nnsmith_stats['total_testcases'] > 0:
         print(f"Bug Discovery Rate: {nnsmith_stats['total_bugs']/nnsmith_stats['total_testcases']*1000:.2f} bugs per 1000 testcases")
+    if 'bug_reports' in nnsmith_stats:
+        print_bug_report_summary(nnsmith_stats['bug_reports'])
     
     print("\n--- GPU-Fuzz Results ---")
     print(f"Total Log Files: {gpufuzz_stats['total_logs']}")
     print(f"Total Test Cases: {gpufuzz_stats['total_testcases']} (from trace.txt)")
+    if 'trace_scan' in gpufuzz_stats:
+        print(f"Trace Scan: {format_throughput(gpufuzz_stats['trace_scan'])}")
     print(f"Logs with Errors: {gpufuzz_stats['logs_with_errors']}")
     print(f"Memory Errors (Critical): {gpufuzz_stats['memory_errors']}")
     print(f"Configuration Errors: {gpufuzz_stats['config_errors']}")
     print(f"OOM Errors (excluded): {gpufuzz_stats['oom_errors']}")
     print(f"Unique Bug Signatures: {gpufuzz_stats['unique_bug_count']}")
+    if 'fingerprints' in gpufuzz_stats:
+        fp = gpufuzz_stats['fingerprints']
+        print(f"Unique Fingerprints: {fp['unique_fingerprints']} ({fp['fingerprint_clusters']} near-duplicate clusters)")
+    if 'prefilter' in gpufuzz_stats:
+        prefilter = gpufuzz_stats['prefilter']
+        verified = (f" ({prefilter['verified']} verified, {prefilter['mismatches']} mismatches)"
+                    if prefilter['verified'] else '')
+        print(f"Prefilter: {prefilter['skipped_logs']} clean logs skipped, "
+              f"{prefilter['bytes_avoided'] / 1e6:.1f} MB not read{verified}")
+    if 'cache' in gpufuzz_stats:
+        cache_stats = gpufuzz_stats['cache']
+        print(f"Analysis Cache: {cache_stats['hits']} cached, {cache_stats['misses']} parsed, "
+              f"{cache_stats['deleted']} removed")
     
     gpufuzz_real_bugs = gpufuzz_stats['memory_errors'] + gpufuzz_stats['config_errors']
     if gpufuzz_stats['total_testcases'] > 0:
@@ -268,21 +222,7 @@ def print_summary(nnsmith_stats, gpufuzz_stats):
     print("="*60 + "\n")
 
 if __name__ == '__main__':
-    # 路径配置
-    nnsmith_bug_dir = '/home/lzh/projects/nnsmithout/pytorch8'
-    nnsmith_log_file = '/home/lzh/projects/nnsmithout/outputs/2025-11-06/21-40-49/fuzz.log'
-    gpufuzz_log_dir = '/home/lzh/projects/gpu_fuzz/gpu_logs/log20251101'
-    
-    print("Analyzing NNSmith results...")
-    nnsmith_stats = analyze_nnsmith_results(nnsmith_bug_dir, nnsmith_log_file)
-    
-    print("Analyzing GPU-Fuzz results...")
-    gpufuzz_stats = analyze_gpufuzz_logs(gpufuzz_log_dir)
-    
-    print_summary(nnsmith_stats, gpufuzz_stats)
-    
-    print("Generating comparison plots...")
-    plot_comparison(nnsmith_stats, gpufuzz_stats)
-    
-    print("\nAnalysis complete!")
-
+    # 原来的路径配置和流程在analysis_cli.py中（默认路径、并行扫描、增量缓存、指纹聚类）
+    import sys
+    from analysis_cli import main
+    sys.exit(main(['summary', '--plots'] + sys.argv[1:]))
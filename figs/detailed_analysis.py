@@ -4,111 +4,63 @@
 生成更多有用的图表用于论文
 """
 
-import os
-import re
-import matplotlib.pyplot as plt
 import numpy as np
 from pathlib import Path
-from datetime import datetime, timedelta
 
-# 设置字体和样式
-plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
-plt.rcParams['axes.unicode_minus'] = False
-plt.rcParams['figure.dpi'] = 300
+import instrument
+from event_store import bug_timeline, gpufuzz_stats, load_event_store, memory_detail, nnsmith_stats, timeline_hours
+from gpufuzz_scan import scan_gpufuzz_campaign
+from nnsmith_log import timeline_timestamps
+from timeline_sampling import downsample_timeline
 
-def parse_nnsmith_timeline(log_file):
-    """解析NNSmith日志，提取bug发现时间线"""
-    timeline = []
-    bug_count = 0
-    
+def _pyplot():
+    """按需导入matplotlib并设置字体和样式：只输出文本统计时不加载matplotlib"""
+    import matplotlib.pyplot as plt
+    plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
+    plt.rcParams['axes.unicode_minus'] = False
+    plt.rcParams['figure.dpi'] = 300
+    return plt
+
+def parse_nnsmith_timeline_times(log_file):
+    """解析NNSmith日志，返回bug/error日志行的时间戳数组（分块向量化解析）"""
     log_path = Path(log_file)
     if not log_path.exists():
-        return timeline
+        return np.array([], dtype='M8[s]')
     
     try:
-        with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                # 查找bug相关的日志
-                if 'bug' in line.lower() or 'error' in line.lower():
-                    # 提取时间戳
-                    time_match = re.search(r'\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', line)
-                    if time_match:
-                        try:
-                            timestamp = datetime.strptime(time_match.group(1), '%Y-%m-%d %H:%M:%S')
-                            bug_count += 1
-                            timeline.append((timestamp, bug_count))
-                        except:
-                            pass
+        instrument.count_file(log_path)
+        with instrument.stage('nnsmith_timeline'):
+            return timeline_timestamps(log_path)
     except Exception as e:
         print(f"Error parsing NNSmith timeline: {e}")
-    
-    return timeline
+        return np.array([], dtype='M8[s]')
 
-def parse_gpufuzz_timeline(log_dir):
-    """解析GPU-Fuzz日志，提取bug发现时间线"""
-    timeline = []
-    bug_count = 0
-    
-    log_path = Path(log_dir)
-    if not log_path.exists():
-        return timeline
-    
-    # 按文件名排序（假设文件名包含序号）
-    log_files = sorted(log_path.glob('log*.txt'), key=lambda x: int(re.search(r'(\d+)', x.name).group(1)) if re.search(r'(\d+)', x.name) else 0)
-    
-    error_patterns = [
-        r'Invalid __global__ write',
-        r'Invalid __global__ read',
-        r'Invalid __shared__ write',
-        r'Invalid __shared__ read',
-        r'cudaErrorInvalidConfiguration'
-    ]
-    
-    for log_file in log_files:
-        try:
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                
-            # 检查是否有真实错误（排除OOM）
-            has_real_error = False
-            for pattern in error_patterns:
-                if re.search(pattern, content, re.IGNORECASE):
-                    has_real_error = True
-                    break
-            
-            if has_real_error:
-                bug_count += 1
-                # 使用文件修改时间作为时间戳（近似）
-                timestamp = datetime.fromtimestamp(log_file.stat().st_mtime)
-                timeline.append((timestamp, bug_count))
-        except Exception as e:
-            pass
-    
-    return timeline
+def parse_nnsmith_timeline(log_file):
+    """解析NNSmith日志，提取bug发现时间线"""
+    times = parse_nnsmith_timeline_times(log_file)
+    return list(zip(times.tolist(), range(1, len(times) + 1)))
+
+def parse_gpufuzz_timeline(log_dir, scan=None):
+    """解析GPU-Fuzz日志，提取bug发现时间线（单遍扫描结果的视图）"""
+    if scan is None:
+        scan = scan_gpufuzz_campaign(log_dir)
+    if scan is None:
+        return []
+    return scan['timeline']
 
 def plot_bug_discovery_timeline(nnsmith_timeline, gpufuzz_timeline):
-    """绘制bug发现时间线"""
+    """绘制bug发现时间线，时间线为事件表查询bug_timeline的结果(时间戳数组, 累计bug数数组)"""
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(10, 6))
     
-    # 归一化时间到0-4小时
-    if nnsmith_timeline:
-        start_time = nnsmith_timeline[0][0]
-        nnsmith_x = [(t - start_time).total_seconds() / 3600.0 for t, _ in nnsmith_timeline]
-        nnsmith_y = [count for _, count in nnsmith_timeline]
-    else:
-        nnsmith_x, nnsmith_y = [], []
-    
-    if gpufuzz_timeline:
-        start_time = gpufuzz_timeline[0][0]
-        gpufuzz_x = [(t - start_time).total_seconds() / 3600.0 for t, _ in gpufuzz_timeline]
-        gpufuzz_y = [count for _, count in gpufuzz_timeline]
-    else:
-        gpufuzz_x, gpufuzz_y = [], []
+    # 归一化时间到0-4小时；事件很多时降采样，图的大小与事件数无关
+    nnsmith_x, nnsmith_y = downsample_timeline(*timeline_hours(nnsmith_timeline))
+    gpufuzz_x, gpufuzz_y = downsample_timeline(*timeline_hours(gpufuzz_timeline))
     
     # 绘制曲线
-    if nnsmith_x:
+    if len(nnsmith_x):
         ax.plot(nnsmith_x, nnsmith_y, label='NNSmith', linewidth=2, color='#808080', marker='o', markersize=3)
-    if gpufuzz_x:
+    if len(gpufuzz_x):
         ax.plot(gpufuzz_x, gpufuzz_y, label='GPU-Fuzz', linewidth=2, color='#404040', marker='s', markersize=3)
     
     ax.set_xlabel('Time (hours)', fontsize=12)
@@ -125,6 +77,7 @@ def plot_bug_discovery_timeline(nnsmith_timeline, gpufuzz_timeline):
 
 def plot_bug_severity_comparison(nnsmith_stats, gpufuzz_stats):
     """绘制bug严重程度对比"""
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(10, 6))
     
     # 分类bug严重程度
@@ -176,6 +129,7 @@ def plot_bug_severity_comparison(nnsmith_stats, gpufuzz_stats):
 
 def plot_test_case_efficiency(nnsmith_stats, gpufuzz_stats):
     """绘制测试用例效率对比"""
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(8, 6))
     
     tools = ['NNSmith', 'GPU-Fuzz']
@@ -206,51 +160,17 @@ def plot_test_case_efficiency(nnsmith_stats, gpufuzz_stats):
     print("Saved: test_case_efficiency.pdf")
     plt.close()
 
-def analyze_memory_errors_detail(log_dir):
-    """详细分析内存错误"""
-    log_path = Path(log_dir)
-    if not log_path.exists():
+def analyze_memory_errors_detail(log_dir, scan=None):
+    """详细分析内存错误（单遍扫描结果的视图）"""
+    if scan is None:
+        scan = scan_gpufuzz_campaign(log_dir)
+    if scan is None:
         return {}
-    
-    stats = {
-        'invalid_global_write': 0,
-        'invalid_global_read': 0,
-        'invalid_shared_write': 0,
-        'invalid_shared_read': 0,
-        'operators': {}
-    }
-    
-    patterns = {
-        'invalid_global_write': r'Invalid __global__ write',
-        'invalid_global_read': r'Invalid __global__ read',
-        'invalid_shared_write': r'Invalid __shared__ write',
-        'invalid_shared_read': r'Invalid __shared__ read'
-    }
-    
-    operator_pattern = r'at::native::.*?::(\w+)'
-    
-    for log_file in log_path.glob('*.txt'):
-        try:
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            for error_type, pattern in patterns.items():
-                if re.search(pattern, content, re.IGNORECASE):
-                    stats[error_type] += 1
-                    
-                    # 提取算子名称
-                    op_match = re.search(operator_pattern, content)
-                    if op_match:
-                        op_name = op_match.group(1)
-                        stats['operators'][op_name] = stats['operators'].get(op_name, 0) + 1
-                    break
-        except:
-            pass
-    
-    return stats
+    return scan['memory_detail']
 
 def plot_memory_error_details(memory_stats):
     """绘制内存错误详细分析"""
+    plt = _pyplot()
     if not memory_stats or sum([memory_stats.get(k, 0) for k in ['invalid_global_write', 'invalid_global_read', 'invalid_shared_write', 'invalid_shared_read']]) == 0:
         print("No memory errors to plot")
         return
@@ -310,38 +230,37 @@ def plot_memory_error_details(memory_stats):
     print("Saved: memory_error_details.pdf")
     plt.close()
 
-if __name__ == '__main__':
-    from compare_nnsmith_gpufuzz import analyze_nnsmith_results, analyze_gpufuzz_logs
-    
-    # 路径配置
-    nnsmith_bug_dir = '/home/lzh/projects/nnsmithout/pytorch8'
-    nnsmith_log_file = '/home/lzh/projects/nnsmithout/outputs/2025-11-06/21-40-49/fuzz.log'
-    gpufuzz_log_dir = '/home/lzh/projects/gpu_fuzz/gpu_logs/log20251101'
-    
-    print("Analyzing data...")
-    nnsmith_stats = analyze_nnsmith_results(nnsmith_bug_dir, nnsmith_log_file)
-    gpufuzz_stats = analyze_gpufuzz_logs(gpufuzz_log_dir)
-    
-    print("Generating detailed plots...")
-    
-    # 解析时间线
-    print("  - Parsing timelines...")
-    nnsmith_timeline = parse_nnsmith_timeline(nnsmith_log_file)
-    gpufuzz_timeline = parse_gpufuzz_timeline(gpufuzz_log_dir)
+def plot_campaign(store):
+    """由事件表生成全部详细图表"""
+    # 时间线
+    print("  - Querying timelines...")
+    with instrument.stage('timeline_query'):
+        nnsmith_timeline = bug_timeline(store, 'nnsmith')
+        gpufuzz_timeline = bug_timeline(store, 'gpufuzz')
     
     # 生成图表
     print("  - Plotting bug discovery timeline...")
-    plot_bug_discovery_timeline(nnsmith_timeline, gpufuzz_timeline)
+    with instrument.stage('bug_discovery_timeline'):
+        plot_bug_discovery_timeline(nnsmith_timeline, gpufuzz_timeline)
     
     print("  - Plotting bug severity comparison...")
-    plot_bug_severity_comparison(nnsmith_stats, gpufuzz_stats)
+    with instrument.stage('bug_severity_comparison'):
+        plot_bug_severity_comparison(nnsmith_stats(store, 'nnsmith'), gpufuzz_stats(store, 'gpufuzz'))
     
     print("  - Plotting test case efficiency...")
-    plot_test_case_efficiency(nnsmith_stats, gpufuzz_stats)
+    with instrument.stage('test_case_efficiency'):
+        plot_test_case_efficiency(nnsmith_stats(store, 'nnsmith'), gpufuzz_stats(store, 'gpufuzz'))
     
     print("  - Analyzing memory error details...")
-    memory_stats = analyze_memory_errors_detail(gpufuzz_log_dir)
-    plot_memory_error_details(memory_stats)
-    
-    print("\nAll detailed plots generated!")
+    with instrument.stage('memory_error_details'):
+        plot_memory_error_details(memory_detail(store, 'gpufuzz'))
+
+def plot_campaign_file(events_file):
+    """由保存的事件表生成全部详细图表（图表构建脚本build_figures.py使用）"""
+    plot_campaign(load_event_store(events_file))
 
+if __name__ == '__main__':
+    # 原来的路径配置和流程在analysis_cli.py中（事件表、详细图表、逐条违规统计）
+    import sys
+    from analysis_cli import main
+    sys.exit(main(['plots', '--only', 'detailed', '--violations'] + sys.argv[1:]))
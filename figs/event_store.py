@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+列式事件表
+把各次运行的解析结果展开为一张NumPy结构化数组（每行一个事件），字符串列保存为字典编码；
+以.npz格式保存，加载只需几毫秒。统计、时间线和内存错误细节都是对事件表的向量化查询，
+不需要重新遍历日志
+
+事件类型：
+- gpufuzz_log：一个GPU-Fuzz日志文件的扫描记录（没有错误的日志也有一行）
+- nnsmith_bug：一个NNSmith的bug-*目录
+- nnsmith_timeline：fuzz.log中一条带时间戳的bug/error日志行
+
+用法：
+    python event_store.py campaign_events.npz
+"""
+
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from gpufuzz_scan import is_timeline_log, log_sort_key
+from sanitizer_patterns import MEMORY_SUBTYPE_PATTERNS
+
+EVENT_KINDS = {'gpufuzz_log': 0, 'nnsmith_bug': 1, 'nnsmith_timeline': 2}
+
+# 字符串列保存为strings中的下标，0表示空
+EVENT_DTYPE = np.dtype([
+    ('run', 'i2'),
+    ('kind', 'i1'),
+    ('file', 'i4'),  # 日志文件名 / bug目录名
+    ('seq', 'i8'),  # 文件名中的第一个数字（log{errid}.txt中的errid）
+    ('timestamp', 'M8[us]'),  # 日志的修改时间 / bug目录的修改时间 / 日志行的时间戳
+    ('error_class', 'i4'),  # memory_errors / config_errors / oom_errors / other_errors / read_error / NNSmith的Symptom
+    ('signature', 'i4'),  # 去重签名
+    ('subtype', 'i4'),  # 内存访问子类型
+    ('operator', 'i4'),
+    ('kernel', 'i4'),
+    # 第一个错误模式在解码并转换换行后的日志文本中的字符位置（不是字节偏移，不能用于seek），没有时为-1
+    ('char_offset', 'i8'),
+    ('timeline', '?')  # 是否计入bug发现时间线
+])
+
+RUN_DTYPE = np.dtype([
+    ('name', 'i4'),
+    ('tool', 'i4'),
+    ('testcases', 'i8'),
+    ('failed_testcases', 'i8'),
+    ('total_bugs', 'i8'),  # NNSmith：analyze_nnsmith_results的总数（fuzz.log中有时以日志为准）
+    ('runtime_hours', 'f8')
+])
+
+GPUFUZZ_CLASSES = ['memory_errors', 'config_errors', 'oom_errors', 'other_errors']
+
+
+def new_event_builder():
+    """逐次运行追加事件的构造器，events为每次追加的结构化数组"""
+    return {'strings': {'': 0}, 'events': [], 'runs': []}
+
+
+def intern(builder, value):
+    """字符串的字典编码，None和空字符串为0"""
+    if not value:
+        return 0
+    return builder['strings'].setdefault(value, len(builder['strings']))
+
+
+def _timestamp(value):
+    if value is None:
+        return np.datetime64('NaT', 'us')
+    return np.datetime64(value, 'us')
+
+
+def _add_run(builder, name, tool, testcases=0, failed_testcases=0, total_bugs=0, runtime_hours=0.0):
+    builder['runs'].append((intern(builder, name), intern(builder, tool), testcases, failed_testcases,
+                            total_bugs, runtime_hours))
+    return len(builder['runs']) - 1
+
+
+def add_gpufuzz_run(builder, name, scan):
+    """把scan_gpufuzz_campaign的结果加入事件表"""
+    run = _add_run(builder, name, 'GPU-Fuzz', testcases=scan['stats']['total_testcases'])
+    events = []
+    for record in scan['records']:
+        if record.get('read_error'):
+            error_class = 'read_error'
+        else:
+            error_class = record['error_type'] or ('other_errors' if record['other_error'] else None)
+        mtime = record.get('mtime')
+        offset = record.get('offset')
+        events.append((
+            run, EVENT_KINDS['gpufuzz_log'], intern(builder, record['name']), log_sort_key(record['name'])[0],
+            _timestamp(datetime.fromtimestamp(mtime) if mtime is not None else None),
+            intern(builder, error_class), intern(builder, record.get('signature')),
+            intern(builder, record.get('memory_subtype')), intern(builder, record.get('operator')),
+            intern(builder, record.get('kernel')), -1 if offset is None else offset,
+            bool(record.get('timeline')) and is_timeline_log(record['name'])
+        ))
+    builder['events'].append(np.array(events, dtype=EVENT_DTYPE))
+    return run
+
+
+def add_nnsmith_run(builder, name, stats, bug_dir=None, timeline_times=None):
+    """把NNSmith的结果加入事件表
+
+    stats为analyze_nnsmith_results的结果，bug_dir下的每个bug-*目录为一个事件，
+    timeline_times为fuzz.log中bug/error日志行的时间戳数组（nnsmith_log.timeline_timestamps）
+    """
+    run = _add_run(builder, name, 'NNSmith', testcases=stats['total_testcases'],
+                   failed_testcases=stats['failed_testcases'], total_bugs=stats['total_bugs'],
+                   runtime_hours=stats['runtime_hours'])
+    events = []
+    bug_files = sorted(Path(bug_dir).glob('bug-*')) if bug_dir is not None and Path(bug_dir).exists() else []
+    for bug in bug_files:
+        match = re.search(r'Symptom\.([^-]+)', bug.name)
+        events.append((run, EVENT_KINDS['nnsmith_bug'], intern(builder, bug.name), log_sort_key(bug.name)[0],
+                       _timestamp(datetime.fromtimestamp(bug.stat().st_mtime)),
+                       intern(builder, match.group(1) if match else None), 0, 0, 0, 0, -1, False))
+    builder['events'].append(np.array(events, dtype=EVENT_DTYPE))
+    if timeline_times is not None:
+        timeline = np.zeros(len(timeline_times), dtype=EVENT_DTYPE)
+        timeline['run'] = run
+        timeline['kind'] = EVENT_KINDS['nnsmith_timeline']
+        timeline['timestamp'] = timeline_times
+        timeline['char_offset'] = -1
+        timeline['timeline'] = True
+        builder['events'].append(timeline)
+    return run
+
+
+def finish_event_store(builder):
+    """构造完成的事件表：events、runs两个结构化数组和字符串字典"""
+    strings = sorted(builder['strings'], key=builder['strings'].get)
+    return {
+        'events': np.concatenate([np.array([], dtype=EVENT_DTYPE)] + builder['events']),
+        'runs': np.array(builder['runs'], dtype=RUN_DTYPE),
+        'strings': np.array(strings, dtype=str)
+    }
+
+
+def save_event_store(store, path):
+    """保存为未压缩的.npz，加载时不需要解压"""
+    with open(path, 'wb') as f:
+        np.savez(f, events=store['events'], runs=store['runs'], strings=store['strings'])
+
+
+def load_event_store(path):
+    with np.load(path, allow_pickle=False) as data:
+        return {'events': data['events'], 'runs': data['runs'], 'strings': data['strings']}
+
+
+def string_code(store, value):
+    """字符串的编码，不存在时返回-1（不会匹配任何事件）"""
+    matches = np.flatnonzero(store['strings'] == value)
+    return int(matches[0]) if len(matches) else -1
+
+
+def run_index(store, name):
+    code = string_code(store, name)
+    matches = np.flatnonzero(store['runs']['name'] == code)
+    if not len(matches):
+        raise KeyError(f"run {name} not in event store")
+    return int(matches[0])
+
+
+def run_events(store, name, kind):
+    events = store['events']
+    return events[(events['run'] == run_index(store, name)) & (events['kind'] == EVENT_KINDS[kind])]
+
+
+def _ordered_counts(store, codes):
+    """按首次出现的顺序统计非空编码的次数，返回 字符串 -> 次数"""
+    codes = codes[codes > 0]
+    uniq, first, counts = np.unique(codes, return_index=True, return_counts=True)
+    order = np.argsort(first)
+    return {str(store['strings'][code]): int(count) for code, count in zip(uniq[order], counts[order])}
+
+
+def gpufuzz_stats(store, name):
+    """与analyze_gpufuzz_logs的统计相同"""
+    events = run_events(store, name, 'gpufuzz_log')
+    stats = {'total_logs': len(events),
+             'total_testcases': int(store['runs'][run_index(store, name)]['testcases'])}
+    for error_class in GPUFUZZ_CLASSES:
+        stats[error_class] = int(np.count_nonzero(events['error_class'] == string_code(store, error_class)))
+    stats['logs_with_errors'] = sum(stats[error_class] for error_class in GPUFUZZ_CLASSES)
+    signatures = np.unique(events['signature'])
+    stats['unique_bugs'] = {str(store['strings'][code]) for code in signatures[signatures > 0]}
+    stats['unique_bug_count'] = len(stats['unique_bugs'])
+    return stats
+
+
+def nnsmith_stats(store, name):
+    """与analyze_nnsmith_results的统计相同"""
+    run = store['runs'][run_index(store, name)]
+    events = run_events(store, name, 'nnsmith_bug')
+    return {
+        'total_bugs': int(run['total_bugs']),
+        'total_testcases': int(run['testcases']),
+        'failed_testcases': int(run['failed_testcases']),
+        'bug_types': _ordered_counts(store, events['error_class']),
+        'runtime_hours': float(run['runtime_hours'])
+    }
+
+
+def memory_detail(store, name):
+    """与analyze_memory_errors_detail的结果相同（算子按首次出现的顺序）"""
+    events = run_events(store, name, 'gpufuzz_log')
+    detail = {subtype: int(np.count_nonzero(events['subtype'] == string_code(store, subtype)))
+              for subtype in MEMORY_SUBTYPE_PATTERNS}
+    detail['operators'] = _ordered_counts(store, events['operator'][events['subtype'] > 0])
+    return detail
+
+
+def bug_timeline(store, name):
+    """bug发现时间线，返回(时间戳数组, 累计bug数数组)
+
+    GPU-Fuzz按日志编号排序（与parse_gpufuzz_timeline一致），NNSmith按日志行的顺序
+    """
+    events = store['events']
+    events = events[(events['run'] == run_index(store, name)) & events['timeline']]
+    order = np.argsort(events['seq'], kind='stable')
+    return events['timestamp'][order], np.arange(1, len(events) + 1)
+
+
+def timeline_hours(timeline):
+    """时间线归一化为从第一个事件开始的小时数"""
+    times, counts = timeline
+    if not len(times):
+        return np.array([]), counts
+    return (times - times[0]) / np.timedelta64(1, 'h'), counts
+
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        store = load_event_store(path)
+        print(f"{path}: {len(store['events'])} events, {len(store['runs'])} runs")
+        for run in store['runs']:
+            name, tool = store['strings'][run['name']], store['strings'][run['tool']]
+            stats = nnsmith_stats(store, name) if tool == 'NNSmith' else gpufuzz_stats(store, name)
+            stats.pop('unique_bugs', None)
+            print(f"  {name} ({tool}): {stats}")
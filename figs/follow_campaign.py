@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+实时跟踪正在运行的GPU-Fuzz campaign
+监视日志目录和不断增长的trace.txt（有inotify_simple时使用inotify，否则轮询），
+只读取新增的文件和追加的字节，维护测试用例数、错误分类和去重签名的累计值，
+并定期把快照写入JSON文件供dashboard轮询
+
+用法：
+    python follow_campaign.py /path/to/log_dir --snapshot status.json --interval 10
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from gpufuzz_scan import is_timeline_log, log_state_record, new_log_state, scan_log_stream
+from sanitizer_patterns import MEMORY_SUBTYPE_PATTERNS
+from trace_scan import new_trace_state, scan_trace_stream, trace_record_count
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+# 轮询时每隔这么多次做一次完整的目录扫描，发现编号不连续的新日志、旧日志的变化和删除
+FULL_POLL_INTERVAL = 60
+LOG_NAME = re.compile(r'^log(\d+)\.txt$')
+
+COUNTERS = ['total_logs', 'logs_with_errors', 'memory_errors', 'config_errors', 'oom_errors', 'other_errors']
+
+
+def new_follow_state(log_dir):
+    """跟踪状态：每个文件的流式扫描状态和记录，以及各项累计值"""
+    return {
+        'log_dir': Path(log_dir),
+        'files': {},  # name -> {'identity', 'stream', 'record'}（trace.txt只有identity）
+        'trace': new_trace_state(),
+        'totals': {name: 0 for name in COUNTERS},
+        'signatures': Counter(),
+        'memory_detail': Counter(),
+        'operators': Counter(),
+        'timeline_minutes': Counter(),  # 真实错误日志按修改时间所在的分钟计数
+        'started_at': time.time(),
+        'last_progress': time.time(),
+        'updates': 0,
+        'last_errid': -1,  # 已知的最大log{errid}.txt编号，轮询只检查它和之后的编号
+        'polls': 0
+    }
+
+
+def apply_record(state, name, record, sign):
+    """把一条扫描记录加入（sign=1）或移出（sign=-1）累计值，与aggregate_records的统计口径一致"""
+    totals = state['totals']
+    totals['total_logs'] += sign
+    if record.get('read_error'):
+        return
+    if record['error_type']:
+        totals[record['error_type']] += sign
+        totals['logs_with_errors'] += sign
+        state['signatures'][record['signature']] += sign
+    elif record['other_error']:
+        totals['other_errors'] += sign
+        totals['logs_with_errors'] += sign
+    if record['timeline'] and is_timeline_log(name):
+        state['timeline_minutes'][int(record['mtime'] // 60)] += sign
+    if record['memory_subtype']:
+        state['memory_detail'][record['memory_subtype']] += sign
+        if record['operator']:
+            state['operators'][record['operator']] += sign
+
+
+def update_file(state, path):
+    """文件新增或变化时只读取追加的字节；文件变小（被重写）时从头扫描。返回读取的字节数"""
+    name = path.name
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        remove_file(state, name)
+        return 0
+    identity = (st.st_size, st.st_mtime_ns)
+    entry = state['files'].get(name)
+    if entry is not None and entry['identity'] == identity:
+        return 0
+
+    read = 0
+    if name == 'trace.txt':
+        trace = state['trace']
+        if st.st_size < trace['offset']:
+            trace = new_trace_state()
+        with open(path, 'rb') as f:
+            f.seek(trace['offset'])
+            new_trace = scan_trace_stream(f, trace)
+        if trace_record_count(new_trace) > trace_record_count(state['trace']):
+            state['last_progress'] = time.time()
+        read += new_trace['offset'] - trace['offset']
+        state['trace'] = new_trace
+        # trace.txt不是日志，不计入日志的统计
+        state['files'][name] = {'identity': identity, 'stream': None, 'record': None}
+        return read
+
+    stream = entry['stream'] if entry is not None and st.st_size >= entry['stream']['offset'] else new_log_state()
+    start = stream['offset']
+    try:
+        stream = scan_log_stream(path, stream)
+        record = log_state_record(stream)
+    except OSError as e:
+        record = {'read_error': str(e)}
+    read += stream['offset'] - start
+    record['name'] = name
+    record['mtime'] = st.st_mtime
+
+    if entry is not None:
+        apply_record(state, name, entry['record'], -1)
+    apply_record(state, name, record, 1)
+    state['files'][name] = {'identity': identity, 'stream': stream, 'record': record}
+    return read
+
+
+def remove_file(state, name):
+    entry = state['files'].pop(name, None)
+    if entry is not None and entry['record'] is not None:
+        apply_record(state, name, entry['record'], -1)
+
+
+def _note_errid(state, name):
+    match = LOG_NAME.match(name)
+    if match:
+        state['last_errid'] = max(state['last_errid'], int(match.group(1)))
+
+
+def scan_directory(state):
+    """完整扫描：比较目录中所有*.txt的大小和修改时间，返回变化和删除的文件名"""
+    seen = set()
+    changed = set()
+    with os.scandir(state['log_dir']) as it:
+        for dirent in it:
+            if not dirent.name.endswith('.txt') or not dirent.is_file():
+                continue
+            seen.add(dirent.name)
+            _note_errid(state, dirent.name)
+            st = dirent.stat()
+            entry = state['files'].get(dirent.name)
+            if entry is None or entry['identity'] != (st.st_size, st.st_mtime_ns):
+                changed.add(dirent.name)
+    return changed | (set(state['files']) - seen)
+
+
+def _file_changed(state, name):
+    try:
+        st = (state['log_dir'] / name).stat()
+    except FileNotFoundError:
+        return name in state['files']
+    entry = state['files'].get(name)
+    return entry is None or entry['identity'] != (st.st_size, st.st_mtime_ns)
+
+
+def poll_changes(state):
+    """轮询：日志按errid顺序写出，只stat trace.txt、最新的日志和之后编号的新日志，代价与campaign规模无关；
+    每FULL_POLL_INTERVAL次做一次scan_directory。返回可能变化的文件名"""
+    state['polls'] += 1
+    if state['polls'] % FULL_POLL_INTERVAL == 0:
+        return scan_directory(state)
+    names = ['trace.txt'] + ([f"log{state['last_errid']}.txt"] if state['last_errid'] >= 0 else [])
+    changed = {name for name in names if _file_changed(state, name)}
+    while (state['log_dir'] / f"log{state['last_errid'] + 1}.txt").exists():
+        state['last_errid'] += 1
+        changed.add(f"log{state['last_errid']}.txt")
+    return changed
+
+
+def open_watcher(log_dir):
+    """有inotify_simple时返回inotify监视器，否则返回None（使用轮询）"""
+    if INotify is None:
+        return None
+    watcher = INotify()
+    watcher.add_watch(str(log_dir), flags.CREATE | flags.MODIFY | flags.CLOSE_WRITE |
+                      flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE)
+    return watcher
+
+
+def wait_for_changes(state, watcher, timeout):
+    """等待timeout秒并合并期间的事件，返回可能变化的文件名"""
+    if watcher is None:
+        time.sleep(timeout)
+        return poll_changes(state)
+    names = set()
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return names
+        for event in watcher.read(timeout=max(1, int(remaining * 1000))):
+            if event.mask & flags.Q_OVERFLOW:
+                # 事件队列溢出，本轮退化为完整的目录扫描
+                return names | scan_directory(state)
+            if event.name.endswith('.txt'):
+                names.add(event.name)
+
+
+def snapshot(state, stall_seconds):
+    """当前累计值的快照，时间线为每分钟的累计真实错误数"""
+    now = time.time()
+    totals = state['totals']
+    timeline = []
+    cumulative = 0
+    for minute in sorted(k for k, v in state['timeline_minutes'].items() if v):
+        cumulative += state['timeline_minutes'][minute]
+        timeline.append([datetime.fromtimestamp(minute * 60).isoformat(), cumulative])
+    memory_detail = {subtype: state['memory_detail'][subtype] for subtype in MEMORY_SUBTYPE_PATTERNS}
+    memory_detail['operators'] = {op: n for op, n in state['operators'].items() if n}
+    unique_bugs = sorted(sig for sig, n in state['signatures'].items() if n)
+    return dict(
+        totals,
+        log_dir=str(state['log_dir']),
+        updated_at=datetime.fromtimestamp(now).isoformat(),
+        started_at=datetime.fromtimestamp(state['started_at']).isoformat(),
+        updates=state['updates'],
+        total_testcases=trace_record_count(state['trace']),
+        unique_bugs=unique_bugs,
+        unique_bug_count=len(unique_bugs),
+        memory_detail=memory_detail,
+        timeline=timeline,
+        seconds_since_progress=now - state['last_progress'],
+        stalled=now - state['last_progress'] > stall_seconds
+    )
+
+
+def write_snapshot(path, data):
+    """先写临时文件再原子替换，dashboard不会读到写了一半的JSON"""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def follow_campaign(log_dir, snapshot_path, interval=10.0, stall_seconds=600.0, once=False):
+    """跟踪日志目录，每interval秒写一次快照；once=True时只做一次全量更新"""
+    state = new_follow_state(log_dir)
+    watcher = open_watcher(state['log_dir'])
+    changed = scan_directory(state)
+    while True:
+        read = 0
+        for name in sorted(changed):
+            read += update_file(state, state['log_dir'] / name)
+        state['updates'] += 1
+        data = snapshot(state, stall_seconds)
+        data['last_update_bytes'] = read
+        write_snapshot(snapshot_path, data)
+        if once:
+            return data
+        changed = wait_for_changes(state, watcher, interval)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Follow a running GPU-Fuzz campaign')
+    parser.add_argument('log_dir')
+    parser.add_argument('--snapshot', default='campaign_status.json', help='JSON file for dashboards')
+    parser.add_argument('--interval', type=float, default=10.0, help='seconds between snapshots')
+    parser.add_argument('--stall', type=float, default=600.0, help='seconds without new test cases before flagging a stall')
+    parser.add_argument('--once', action='store_true', help='take one snapshot and exit')
+    args = parser.parse_args()
+
+    print(f"Following {args.log_dir} ({'inotify' if INotify else 'polling'}), snapshot: {args.snapshot}")
+    try:
+        follow_campaign(args.log_dir, args.snapshot, args.interval, args.stall, args.once)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,632 @@
+#!/usr/bin/env python3
+"""
+GPU-Fuzz日志的单遍扫描引擎
+每个日志文件只打开、读取一次，同时产出：
+- 错误分类计数与去重签名（analyze_gpufuzz_logs）
+- bug发现时间线（parse_gpufuzz_timeline）
+- 内存错误子类型与算子名称（analyze_memory_errors_detail）
+原来的三个分析函数只是对扫描结果的视图
+日志目录也可以是压缩文件的目录或整个运行的归档（见log_source.py），结果与解压后的目录相同。
+大多数日志是干净的compute-sanitizer运行：可选的预过滤只读取较大日志的开头和结尾，能识别为干净运行时不再读取其余部分
+"""
+
+import io
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+import instrument
+from analysis_cache import (cache_key, delete_entries, entry_payload, file_digest, load_entries, load_entry,
+                            needs_refresh, open_cache, store_entries)
+from log_source import (compression, find_log, is_archive, iter_archive, list_logs, log_stat, logical_name,
+                        open_compressed)
+from sanitizer_patterns import (ERROR_WORD_PATTERN, KERNEL_PATTERN, MEMORY_SUBTYPE_PATTERNS, OPERATOR_PATTERN,
+                                classify_error, find_patterns, first_pattern_offset, has_other_error,
+                                is_timeline_error, memory_subtype)
+from trace_scan import count_trace_records, new_trace_state, scan_trace_stream, trace_record_count, trace_result
+
+# 并行模式下每个分片包含的日志文件数
+DEFAULT_CHUNKSIZE = 256
+
+# 超过该大小的日志按块流式扫描，内存占用与文件大小无关
+STREAM_THRESHOLD = 64 * 1024 * 1024
+STREAM_CHUNK_CHARS = 4 * 1024 * 1024
+
+# 预过滤读取的开头和结尾字节数；不大于两者之和的日志直接完整读取
+PREFILTER_HEAD_BYTES = 4096
+PREFILTER_TAIL_BYTES = 16384
+# 干净运行：第一行是compute-sanitizer的标题，最后一个非空行是0个错误的汇总
+SANITIZER_HEADER = re.compile(r'=+ COMPUTE-SANITIZER')
+CLEAN_SUMMARY = re.compile(r'=+ ERROR SUMMARY: 0 errors')
+# 扫描记录中只属于本次扫描的键，不写入缓存
+SCAN_ONLY_KEYS = ('name', 'mtime', 'bytes_avoided', 'prefilter_mismatch')
+
+# 扫描记录与trace.txt扫描状态的格式版本，变化时缓存中的旧条目失效
+SCAN_VERSION = 2
+TRACE_VERSION = 1
+
+
+def log_sort_key(path):
+    """按文件名中的第一个数字排序（log{errid}.txt）"""
+    name = Path(path).name
+    match = re.search(r'(\d+)', name)
+    return (int(match.group(1)) if match else 0, name)
+
+
+def is_timeline_log(name):
+    """时间线只统计log*.txt"""
+    return name.startswith('log') and name.endswith('.txt')
+
+
+def build_record(hits, length, other_error, operator, kernel, offset):
+    """由命中的模式集合和内容长度构造扫描记录
+
+    other_error、operator和kernel是惰性求值的函数，只在需要时调用；
+    offset为第一个模式出现的字符位置（没有命中时为None）
+    """
+    record = {
+        'error_type': None,  # memory_errors / config_errors / oom_errors
+        'signature': None,  # 用于去重的bug签名
+        'other_error': False,
+        'timeline': is_timeline_error(hits),  # 是否为真实错误（排除OOM）
+        'memory_subtype': memory_subtype(hits),
+        'operator': None,
+        'kernel': None,
+        'offset': offset
+    }
+
+    # 错误分类（排除只有COMPUTE-SANITIZER头部的情况）；时间线与内存错误细节不做长度过滤
+    if length > 100:
+        error_type, pattern = classify_error(hits)
+        if error_type:
+            record['error_type'] = error_type
+            record['signature'] = f"{error_type}:{pattern}"
+        else:
+            record['other_error'] = other_error()
+
+    if record['memory_subtype']:
+        record['operator'] = operator()
+        record['kernel'] = kernel()
+
+    return record
+
+
+def scan_log_text(content):
+    """对单个日志的内容做一次分类，返回该文件的扫描记录
+
+    所有模式由预编译的匹配器一次扫描得到，再按原来的优先级解释
+    """
+    def first_group(pattern):
+        match = pattern.search(content)
+        return match.group(1) if match else None
+
+    hits = find_patterns(content)
+    return build_record(hits, len(content), lambda: has_other_error(content),
+                        lambda: first_group(OPERATOR_PATTERN), lambda: first_group(KERNEL_PATTERN),
+                        first_pattern_offset(content) if hits else None)
+
+
+def new_log_state():
+    """流式扫描状态：已读取的字节数、字符数、命中的模式、未完成的最后一行等"""
+    return {'offset': 0, 'length': 0, 'hits': set(), 'summary': False, 'error_word': False,
+            'operator': None, 'kernel': None, 'first_hit': None, 'carry': ''}
+
+
+def _scan_lines(state, text, start):
+    """扫描从字符位置start开始的若干完整的行；所有模式都不跨行，逐行累积的结果与整体扫描一致"""
+    hits = find_patterns(text)
+    if hits and state['first_hit'] is None:
+        state['first_hit'] = start + first_pattern_offset(text)
+    state['hits'] |= hits
+    if not state['summary']:
+        state['summary'] = 'ERROR SUMMARY' in text
+    if not state['error_word']:
+        state['error_word'] = ERROR_WORD_PATTERN.search(text) is not None
+    if state['operator'] is None:
+        op_match = OPERATOR_PATTERN.search(text)
+        if op_match:
+            state['operator'] = op_match.group(1)
+    if state['kernel'] is None:
+        kernel_match = KERNEL_PATTERN.search(text)
+        if kernel_match:
+            state['kernel'] = kernel_match.group(1)
+
+
+def update_log_state(state, text):
+    """追加一段文本；只扫描以换行结束的部分，最后不完整的一行留到下次"""
+    start = state['length'] - len(state['carry'])
+    state['length'] += len(text)
+    buf = state['carry'] + text
+    cut = buf.rfind('\n')
+    if cut < 0:
+        state['carry'] = buf
+        return state
+    _scan_lines(state, buf[:cut + 1], start)
+    state['carry'] = buf[cut + 1:]
+    return state
+
+
+def log_state_record(state):
+    """由流式扫描状态得到扫描记录，与对完整内容调用scan_log_text的结果相同
+
+    不修改state，文件之后追加的内容仍可继续扫描
+    """
+    final = dict(state, hits=set(state['hits']))
+    _scan_lines(final, final['carry'], final['length'] - len(final['carry']))
+    return build_record(final['hits'], final['length'], lambda: final['summary'] or final['error_word'],
+                        lambda: final['operator'], lambda: final['kernel'], final['first_hit'])
+
+
+def scan_log_binary(raw, state=None, chunk_chars=STREAM_CHUNK_CHARS):
+    """从二进制流的当前位置流式扫描到结尾（与文本模式一样解码并转换换行），返回更新后的状态"""
+    state = state or new_log_state()
+    with io.TextIOWrapper(raw, encoding='utf-8', errors='ignore') as f:
+        for text in iter(lambda: f.read(chunk_chars), ''):
+            update_log_state(state, text)
+        state['offset'] = raw.tell()
+    return state
+
+
+def scan_log_stream(log_file, state=None, chunk_chars=STREAM_CHUNK_CHARS):
+    """从state['offset']开始流式扫描日志，返回更新后的状态"""
+    state = state or new_log_state()
+    raw = open(log_file, 'rb')
+    raw.seek(state['offset'])
+    return scan_log_binary(raw, state, chunk_chars)
+
+
+def _decode(data):
+    """与文本模式一致的解码和换行转换"""
+    return data.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def prefilter_log(log_file, size):
+    """只读取日志的开头和结尾，识别为干净的compute-sanitizer运行时返回其扫描记录，不能确定时返回None
+
+    干净的运行：第一行是COMPUTE-SANITIZER标题，最后一个非空行是"ERROR SUMMARY: 0 errors"，
+    开头和结尾中没有任何错误模式，除汇总行外也没有error一词（Python异常的回溯在退出前打印，落在结尾中）。
+    sanitizer报告的违规、配置错误和OOM都计入汇总的错误数，汇总为0时中间也不会有这些报告；
+    只有程序自己在中间打印的错误文本无法排除，所以结果不保证与完整扫描相同，预过滤默认关闭；
+    verify模式对识别出的日志再做完整扫描并比较，check_prefilter在整个目录上比较两种扫描
+    """
+    with open(log_file, 'rb') as f:
+        head = _decode(f.read(PREFILTER_HEAD_BYTES))
+        f.seek(size - PREFILTER_TAIL_BYTES)
+        tail = _decode(f.read(PREFILTER_TAIL_BYTES))
+    body, _, last = tail.rstrip().rpartition('\n')
+    if not SANITIZER_HEADER.match(head) or not CLEAN_SUMMARY.fullmatch(last.strip()):
+        return None
+    if find_patterns(head) or find_patterns(tail) or ERROR_WORD_PATTERN.search(head) or \
+            ERROR_WORD_PATTERN.search(body):
+        return None
+    # 完整内容中一定有ERROR SUMMARY，长度只需要确定超过100
+    length = len(head) + len(tail)
+    if length <= 100:
+        return None
+    return build_record(set(), length, lambda: True, lambda: None, lambda: None, None)
+
+
+def _scan_full(log_file, st, suffix):
+    if suffix or st.st_size > STREAM_THRESHOLD:
+        # 压缩文件解压后的大小未知，总是流式扫描
+        return log_state_record(scan_log_binary(open_compressed(log_file, suffix)))
+    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
+        return scan_log_text(f.read())
+
+
+def scan_log_file(log_file, prefilter=False, verify=False):
+    """读取并扫描单个日志文件，大文件按块流式扫描；.gz/.xz/.zst文件在读取时解压
+
+    prefilter为True时未压缩的较大日志先经过prefilter_log，识别为干净运行的记录中带有bytes_avoided（没有读取的字节数）；
+    verify为True时对这些日志再做完整扫描，记录中的prefilter_mismatch为比较结果；不一致时打印警告，
+    使用完整扫描的记录（不带bytes_avoided）
+    """
+    log_file = Path(log_file)
+    suffix = compression(log_file.name)
+    try:
+        st = log_file.stat()
+        record = None
+        if prefilter and not suffix and st.st_size > PREFILTER_HEAD_BYTES + PREFILTER_TAIL_BYTES:
+            record = prefilter_log(log_file, st.st_size)
+        avoided = st.st_size - PREFILTER_HEAD_BYTES - PREFILTER_TAIL_BYTES
+        if record is None:
+            record = _scan_full(log_file, st, suffix)
+        elif not verify:
+            record['bytes_avoided'] = avoided
+        else:
+            full = _scan_full(log_file, st, suffix)
+            if full == record:
+                record.update(prefilter_mismatch=False, bytes_avoided=avoided)
+            else:
+                # 不一致时使用完整扫描的记录，这个日志不计入跳过的日志
+                print(f"Warning: prefilter mismatch on {log_file}")
+                record = dict(full, prefilter_mismatch=True)
+    except Exception as e:
+        print(f"Error reading {log_file}: {e}")
+        return {'name': logical_name(log_file.name), 'mtime': None, 'read_error': str(e)}
+
+    record['name'] = logical_name(log_file.name)
+    record['mtime'] = st.st_mtime
+    return record
+
+
+def scan_log_blob(name, mtime, suffix, data):
+    """扫描读入内存的归档成员，suffix为成员自身的压缩后缀"""
+    try:
+        raw = io.BytesIO(data)
+        if suffix or len(data) > STREAM_THRESHOLD:
+            record = log_state_record(scan_log_binary(open_compressed(raw, suffix)))
+        else:
+            with io.TextIOWrapper(raw, encoding='utf-8', errors='ignore') as f:
+                record = scan_log_text(f.read())
+    except Exception as e:
+        print(f"Error reading {name}: {e}")
+        return {'name': name, 'mtime': None, 'read_error': str(e)}
+
+    record['name'] = name
+    record['mtime'] = mtime
+    return record
+
+
+def count_trace_testcases(trace_file, state=None):
+    """流式统计trace.txt中[[...]]的数量，这是每个测试用例执行时打印的mat_shapes
+
+    返回count_trace_records的结果（包含扫描字节数和速度），文件不存在或读取失败时返回None；
+    传入上次的扫描状态时只读取之后追加的内容
+    """
+    if trace_file is None or not Path(trace_file).exists():
+        return None
+    try:
+        return count_trace_records(trace_file, state)
+    except Exception as e:
+        print(f"Error reading trace.txt: {e}")
+        return None
+
+
+def cached_trace_state(conn, trace_file, identity, resumable=True):
+    """缓存中trace.txt的扫描状态，返回(state, unchanged)
+
+    trace.txt在fuzzing过程中只会追加：文件未变化时直接复用计数；
+    变大时从上次的位置继续扫描（resumable为False时重新扫描，例如压缩文件和归档成员）；
+    变小（被重写）时重新扫描
+    """
+    entry = load_entry(conn, 'gpufuzz_trace', trace_file)
+    if entry is None or entry['version'] != TRACE_VERSION:
+        return None, False
+    state = json.loads(entry['payload'])
+    state['tail'] = bytes.fromhex(state['tail'])
+    if identity['size'] == entry['size'] and identity['mtime_ns'] == entry['mtime_ns']:
+        return state, True
+    if resumable and identity['size'] >= state['offset']:
+        return state, False
+    return None, False
+
+
+def store_trace_state(conn, trace_file, trace, mtime_ns, size=None):
+    """保存扫描状态；大小默认记为已扫描的字节数，扫描期间追加的内容下次会继续扫描"""
+    state = dict(trace['state'], tail=trace['state']['tail'].hex())
+    identity = {'size': state['offset'] if size is None else size, 'mtime_ns': mtime_ns}
+    store_entries(conn, 'gpufuzz_trace', [(trace_file, identity, state)], TRACE_VERSION)
+
+
+def new_stats():
+    """analyze_gpufuzz_logs返回的统计字典"""
+    return {
+        'total_logs': 0,  # 日志文件数（log*.txt）
+        'total_testcases': 0,  # 实际测试用例数（trace.txt中[[...]]的数量）
+        'logs_with_errors': 0,
+        'memory_errors': 0,  # Invalid write/read
+        'config_errors': 0,  # cudaErrorInvalidConfiguration
+        'oom_errors': 0,  # cudaErrorMemoryAllocation
+        'other_errors': 0,
+        'unique_bugs': set()  # 用于去重
+    }
+
+
+def new_memory_detail():
+    """analyze_memory_errors_detail返回的统计字典"""
+    detail = {subtype: 0 for subtype in MEMORY_SUBTYPE_PATTERNS}
+    detail['operators'] = {}
+    return detail
+
+
+def aggregate_records(records, trace=None):
+    """把逐文件的扫描记录汇总为统计、时间线和内存错误细节"""
+    stats = new_stats()
+    if trace:
+        stats['total_testcases'] = trace['records']
+        stats['trace_scan'] = {k: trace[k] for k in ('bytes', 'seconds', 'bytes_per_sec')}
+    memory_detail = new_memory_detail()
+    timeline_records = []
+
+    for record in records:
+        stats['total_logs'] += 1
+        if record.get('read_error'):
+            continue
+
+        if record['error_type']:
+            stats[record['error_type']] += 1
+            stats['logs_with_errors'] += 1
+            stats['unique_bugs'].add(record['signature'])
+        elif record['other_error']:
+            stats['other_errors'] += 1
+            stats['logs_with_errors'] += 1
+
+        if record['timeline'] and is_timeline_log(record['name']):
+            timeline_records.append(record)
+
+        if record['memory_subtype']:
+            memory_detail[record['memory_subtype']] += 1
+            op_name = record['operator']
+            if op_name:
+                memory_detail['operators'][op_name] = memory_detail['operators'].get(op_name, 0) + 1
+
+    stats['unique_bug_count'] = len(stats['unique_bugs'])
+    # 跳过的日志带有bytes_avoided；verify时比较过的日志带有prefilter_mismatch，不一致的日志使用了完整扫描
+    skipped = [record for record in records if 'bytes_avoided' in record]
+    verified = [record for record in records if 'prefilter_mismatch' in record]
+    if skipped or verified:
+        stats['prefilter'] = {
+            'skipped_logs': len(skipped),
+            'bytes_avoided': sum(record['bytes_avoided'] for record in skipped),
+            'verified': len(verified),
+            'mismatches': sum(1 for record in verified if record['prefilter_mismatch'])
+        }
+
+    # 使用文件修改时间作为时间戳（近似）
+    timeline = []
+    for bug_count, record in enumerate(sorted(timeline_records, key=lambda r: log_sort_key(r['name'])), 1):
+        timeline.append((datetime.fromtimestamp(record['mtime']), bug_count))
+
+    return {
+        'stats': stats,
+        'timeline': timeline,
+        'memory_detail': memory_detail
+    }
+
+
+def count_record_matches(records, scanned, trace=None):
+    """插桩计数：本次扫描的日志中各模式（错误签名、内存错误子类型、其他错误）的匹配次数，以及trace.txt的读取量"""
+    for i in scanned:
+        record = records[i]
+        if record.get('read_error'):
+            instrument.count('read_errors')
+            continue
+        if 'bytes_avoided' in record:
+            instrument.count('prefilter_skipped')
+            instrument.count('prefilter_bytes_avoided', record['bytes_avoided'])
+        if record['signature']:
+            instrument.count(f"matches:{record['signature']}")
+        elif record['other_error']:
+            instrument.count('matches:other_error')
+        if record['memory_subtype']:
+            instrument.count(f"matches:memory_subtype:{record['memory_subtype']}")
+    if trace:
+        instrument.count('trace_bytes_read', trace['bytes'])
+        instrument.count('trace_records', trace['records'])
+
+
+def scan_shard(paths, prefilter=False, verify=False):
+    """扫描一个分片（连续的一段日志文件），返回逐文件的扫描记录"""
+    return [scan_log_file(path, prefilter, verify) for path in paths]
+
+
+def scan_archive_shard(items):
+    """扫描一片读入内存的归档成员(name, mtime, suffix, data)"""
+    return [scan_log_blob(*item) for item in items]
+
+
+def scan_trace_member(f):
+    """统计归档中trace.txt成员的记录数，返回count_trace_records格式的结果"""
+    start = time.perf_counter()
+    trace_state = scan_trace_stream(f, new_trace_state())
+    return trace_result(trace_state, trace_state['offset'], time.perf_counter() - start)
+
+
+def scan_archive(archive, pending, count_trace, workers=1, chunksize=DEFAULT_CHUNKSIZE):
+    """一遍顺序读取归档，扫描pending中的日志成员，count_trace为True时同时统计trace.txt
+
+    返回(与pending对应的扫描记录, trace计数)。归档本身只能顺序解压；不超过STREAM_THRESHOLD的成员
+    读入内存后按chunksize个一片交给进程池，成员自身的解压（例如归档中的log12.txt.gz）和扫描并行进行，
+    更大的成员和trace.txt在当前进程中流式扫描
+    """
+    names = {Path(path).name for path in pending}
+    wanted = names | {'trace.txt'} if count_trace else names
+    scanned = {}
+    trace = None
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(pending) > chunksize else None
+    futures, shard = [], []
+
+    def flush():
+        if pool is None:
+            scanned.update((record['name'], record) for record in scan_archive_shard(shard))
+        else:
+            futures.append(pool.submit(scan_archive_shard, list(shard)))
+            # 限制进行中的分片数，内存占用与归档大小无关
+            while len(futures) > 2 * workers:
+                scanned.update((record['name'], record) for record in futures.pop(0).result())
+        shard.clear()
+
+    try:
+        for name, info, suffix, raw in iter_archive(archive, wanted):
+            if name not in names:
+                with open_compressed(raw, suffix) as f:
+                    trace = scan_trace_member(f)
+                continue
+            if info.size > STREAM_THRESHOLD:
+                with open_compressed(raw, suffix) as f:
+                    scanned[name] = dict(log_state_record(scan_log_binary(f)), name=name, mtime=info.mtime)
+                continue
+            shard.append((name, info.mtime, suffix, raw.read()))
+            if len(shard) >= chunksize:
+                flush()
+        if shard:
+            flush()
+        for future in futures:
+            scanned.update((record['name'], record) for record in future.result())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return [scanned.get(Path(path).name) or {'name': Path(path).name, 'mtime': None, 'read_error': 'missing member'}
+            for path in pending], trace
+
+
+def load_cached_records(conn, log_path, log_files, hash_content=False):
+    """从缓存中取出仍然有效的扫描记录，返回(records, identities, deleted)
+
+    records中需要重新扫描的位置为None；已不存在的日志对应的条目会被删除
+    """
+    entries = load_entries(conn, 'gpufuzz_log', log_path)
+    records = [None] * len(log_files)
+    identities = []
+    refreshed = []
+    for i, log_file in enumerate(log_files):
+        identity, mtime = log_stat(log_file)
+        identities.append(identity)
+        entry = entries.pop(cache_key(log_file), None)
+        record = entry_payload(entry, log_file, identity, SCAN_VERSION, hash_content)
+        if record is not None:
+            record['name'] = logical_name(log_file.name)
+            record['mtime'] = mtime
+            records[i] = record
+            if needs_refresh(entry, identity):
+                refreshed.append((log_file, identity, record))
+    store_entries(conn, 'gpufuzz_log', refreshed, SCAN_VERSION)
+    delete_entries(conn, 'gpufuzz_log', entries)
+    return records, identities, len(entries)
+
+
+def store_scanned_records(conn, log_files, identities, records, indices, hash_content=False):
+    """把新扫描的记录写入缓存（读取失败的文件和预过滤跳过的文件不缓存，后者可能与完整扫描的结果不同）"""
+    items = []
+    for i in indices:
+        record = records[i]
+        if record.get('read_error') or 'bytes_avoided' in record:
+            continue
+        if hash_content and identities[i].get('digest') is None:
+            identities[i]['digest'] = file_digest(log_files[i])
+        payload = {k: v for k, v in record.items() if k not in SCAN_ONLY_KEYS}
+        items.append((log_files[i], identities[i], payload))
+    store_entries(conn, 'gpufuzz_log', items, SCAN_VERSION)
+
+
+def scan_gpufuzz_campaign(log_dir, workers=1, chunksize=DEFAULT_CHUNKSIZE, cache=None, hash_content=False,
+                          prefilter=False, verify_prefilter=False):
+    """单遍扫描GPU-Fuzz日志目录，目录不存在时返回None
+
+    workers > 1（None表示CPU核数）时，把排好序的文件列表切成每片chunksize个文件的连续分片，
+    交给进程池扫描，trace.txt的计数同时在池中进行；分片结果按原顺序拼接，
+    汇总结果与串行模式完全相同。
+
+    cache为SQLite缓存文件路径时，只扫描新增或变化的日志（hash_content=True时修改时间变化
+    但内容相同的文件也视为未变化），trace.txt只扫描追加的部分，已删除日志的条目会被清理
+
+    log_dir中的日志可以是.gz/.xz/.zst压缩的，log_dir也可以是.tar/.tar.zst等归档（见log_source.py）：
+    目录中的压缩文件在进程池中并行解压，归档顺序解压一遍，成员的扫描并行进行
+
+    prefilter为True时跳过目录中可以只凭开头和结尾识别的干净日志（见prefilter_log，结果可能与完整扫描不同），
+    统计中的prefilter记录跳过的日志数和没有读取的字节数；verify_prefilter为True时（隐含prefilter）不使用缓存，
+    对跳过的日志都再做完整扫描并比较
+    """
+    log_path = Path(log_dir)
+    if not log_path.exists():
+        return None
+
+    archive = is_archive(log_path)
+    workers = workers or os.cpu_count() or 1
+    prefilter = prefilter or verify_prefilter
+    conn = open_cache(cache) if cache and not verify_prefilter else None
+
+    try:
+        # trace.txt不是日志：它的记录数单独统计，不再当作日志完整读取第二遍
+        log_files = [path for path in list_logs(log_path, conn=conn) if logical_name(path.name) != 'trace.txt']
+        trace_file = find_log(log_path, 'trace.txt')
+        # 压缩的trace.txt和归档成员不能从上次的位置继续扫描
+        trace_resumable = not archive and trace_file is not None and not compression(trace_file.name)
+        # 归档成员没有单独的文件可以计算哈希，归档本身也不会被touch
+        hash_content = hash_content and not archive
+        records = [None] * len(log_files)
+        trace_state, trace_unchanged = None, False
+        if conn is not None:
+            with instrument.stage('cache_load'):
+                records, identities, deleted = load_cached_records(conn, log_path, log_files, hash_content)
+                if trace_file is not None:
+                    trace_identity = log_stat(trace_file)[0]
+                    trace_state, trace_unchanged = cached_trace_state(conn, trace_file, trace_identity,
+                                                                      trace_resumable)
+
+        missing = [i for i, record in enumerate(records) if record is None]
+        pending = [log_files[i] for i in missing]
+        if instrument.enabled():
+            for log_file in pending:
+                instrument.count_file(log_file, log_stat(log_file)[0]['size'])
+
+        trace = None
+        if trace_unchanged:
+            trace = {'records': trace_record_count(trace_state), 'bytes': 0, 'seconds': 0.0,
+                     'bytes_per_sec': 0.0, 'state': trace_state}
+        if archive:
+            with instrument.stage('archive'):
+                scanned, archive_trace = scan_archive(log_path, pending, trace_file is not None and not trace_unchanged,
+                                                      workers, chunksize)
+            if not trace_unchanged:
+                trace = archive_trace
+        elif workers <= 1 or len(pending) <= chunksize:
+            if not trace_unchanged:
+                with instrument.stage('trace'):
+                    trace = count_trace_testcases(trace_file, trace_state)
+            with instrument.stage('logs'):
+                scanned = scan_shard(pending, prefilter, verify_prefilter)
+        else:
+            shards = [pending[i:i + chunksize] for i in range(0, len(pending), chunksize)]
+            # 并行时trace.txt和日志在进程池中同时扫描，不再分开计时
+            with instrument.stage('parallel'), ProcessPoolExecutor(max_workers=workers) as pool:
+                if not trace_unchanged:
+                    trace_future = pool.submit(count_trace_testcases, trace_file, trace_state)
+                scanned = []
+                for part in pool.map(partial(scan_shard, prefilter=prefilter, verify=verify_prefilter), shards):
+                    scanned.extend(part)
+                if not trace_unchanged:
+                    trace = trace_future.result()
+        for i, record in zip(missing, scanned):
+            records[i] = record
+
+        if conn is not None:
+            with instrument.stage('cache_store'):
+                store_scanned_records(conn, log_files, identities, records, missing, hash_content)
+                if trace and not trace_unchanged:
+                    store_trace_state(conn, trace_file, trace, trace_identity['mtime_ns'],
+                                      None if trace_resumable else trace_identity['size'])
+    finally:
+        if conn is not None:
+            conn.close()
+
+    with instrument.stage('aggregate'):
+        result = aggregate_records(records, trace)
+    if conn is not None:
+        result['stats']['cache'] = {'hits': len(log_files) - len(missing), 'misses': len(missing),
+                                    'deleted': deleted}
+        instrument.count_cache('gpufuzz_log', result['stats']['cache'])
+    if instrument.enabled():
+        count_record_matches(records, missing, trace if not trace_unchanged else None)
+    result['log_dir'] = str(log_path)
+    result['records'] = records
+    return result
+
+
+def check_prefilter(log_dir, workers=1):
+    """在log_dir上分别做完整扫描和预过滤扫描并逐文件比较记录，返回(不一致的日志名列表, 预过滤统计)"""
+    full = scan_gpufuzz_campaign(log_dir, workers)
+    filtered = scan_gpufuzz_campaign(log_dir, workers, prefilter=True)
+    if full is None:
+        return [], None
+    mismatches = []
+    for expected, record in zip(full['records'], filtered['records']):
+        if {k: v for k, v in record.items() if k != 'bytes_avoided'} != expected:
+            mismatches.append(expected['name'])
+    return mismatches, filtered['stats'].get('prefilter')
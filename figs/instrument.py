@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+分析流程的可选插桩
+默认关闭：stage()返回一个共享的空上下文，count()等函数第一行就返回，关闭时的开销只是一次全局变量判断。
+打开后记录：
+- 每个阶段的调用次数、墙钟时间、CPU时间（本进程和已结束的子进程，进程池扫描的CPU时间计入后者），
+  嵌套的阶段以"外层/内层"命名
+- 计数器：读取的文件数和字节数、每种模式的匹配次数等
+- 各缓存的命中、重新解析和清理的条目数（命中率）
+- 可选的性能分析：指定的阶段用cProfile（保存为.prof，并记录累计时间最长的函数）
+  或基于SIGPROF的采样分析器（保存为flamegraph.pl可用的折叠栈.folded）包裹
+结果可以导出为JSON，也可以打印为可读的摘要
+
+通过环境变量打开（compare_nnsmith_gpufuzz.py和detailed_analysis.py在启动时调用enable_from_env）：
+    ANALYSIS_INSTRUMENT=report.json         打开插桩，结束时写入JSON并打印摘要
+    ANALYSIS_PROFILE=gpufuzz_scan,plots     需要性能分析的阶段（*表示所有顶层阶段）
+    ANALYSIS_PROFILER=cprofile|sample       性能分析器（默认cprofile）
+    ANALYSIS_PROFILE_DIR=profiles           .prof/.folded的保存目录
+
+用法：
+    python instrument.py report.json        打印已保存的JSON报告
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import resource
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 采样分析器的采样间隔（秒，按进程CPU时间）
+SAMPLE_INTERVAL = 0.005
+# 报告中保留的cProfile函数数
+PROFILE_TOP = 15
+
+_NULL = contextlib.nullcontext()
+# 当前的插桩会话，None表示关闭
+_session = None
+
+
+def enabled():
+    return _session is not None
+
+
+def enable(profile_stages=(), profiler='cprofile', profile_dir='profiles', output=None):
+    """打开插桩，开始新的会话"""
+    global _session
+    if profiler not in ('cprofile', 'sample'):
+        raise ValueError(f"unknown profiler: {profiler}")
+    _session = {
+        'start': time.perf_counter(),
+        'stages': {},
+        'stack': [],
+        'counters': {},
+        'caches': {},
+        'profiles': {},
+        'profile_stages': set(profile_stages),
+        'profiler': profiler,
+        'profile_dir': Path(profile_dir),
+        'profiling': False,
+        'output': output
+    }
+
+
+def enable_from_env():
+    """ANALYSIS_INSTRUMENT设置时打开插桩，返回是否打开"""
+    output = os.environ.get('ANALYSIS_INSTRUMENT')
+    if not output:
+        return False
+    stages = [s.strip() for s in os.environ.get('ANALYSIS_PROFILE', '').split(',') if s.strip()]
+    enable(stages, os.environ.get('ANALYSIS_PROFILER', 'cprofile'),
+           os.environ.get('ANALYSIS_PROFILE_DIR', 'profiles'), output)
+    return True
+
+
+def disable():
+    global _session
+    _session = None
+
+
+def _child_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def stage(name):
+    """阶段计时的上下文管理器：with instrument.stage('gpufuzz_scan'): ..."""
+    if _session is None:
+        return _NULL
+    return _stage(name)
+
+
+@contextlib.contextmanager
+def _stage(name):
+    session = _session
+    session['stack'].append(name)
+    full_name = '/'.join(session['stack'])
+    profile = (not session['profiling'] and
+               (full_name in session['profile_stages'] or
+                ('*' in session['profile_stages'] and len(session['stack']) == 1)))
+    # 进入时登记，报告中外层阶段排在内层之前
+    entry = session['stages'].setdefault(full_name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'child_cpu': 0.0})
+    stop_profile = _start_profile(session, full_name) if profile else None
+    wall, cpu, child_cpu = time.perf_counter(), time.process_time(), _child_cpu()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        child_cpu = _child_cpu() - child_cpu
+        if stop_profile is not None:
+            stop_profile()
+        entry['calls'] += 1
+        entry['wall'] += wall
+        entry['cpu'] += cpu
+        entry['child_cpu'] += child_cpu
+        session['stack'].pop()
+
+
+def timed(name):
+    """把整个函数作为一个阶段的装饰器"""
+    def decorate(function):
+        def wrapper(*args, **kwargs):
+            if _session is None:
+                return function(*args, **kwargs)
+            with _stage(name):
+                return function(*args, **kwargs)
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        wrapper.__wrapped__ = function
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """计数器加n"""
+    if _session is None:
+        return
+    counters = _session['counters']
+    counters[name] = counters.get(name, 0) + n
+
+
+def count_file(path, size=None):
+    """记录读取了一个文件（大小未知时stat）"""
+    if _session is None:
+        return
+    if size is None:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+    count('files_read')
+    count('bytes_read', size)
+
+
+def count_cache(kind, stats):
+    """累加一个缓存的命中统计（analysis_cache.new_cache_stats的格式）"""
+    if _session is None or not stats:
+        return
+    entry = _session['caches'].setdefault(kind, {'hits': 0, 'misses': 0, 'deleted': 0})
+    for key in entry:
+        entry[key] += stats.get(key, 0)
+
+
+def _safe_name(name):
+    return name.replace('/', '.')
+
+
+def _start_profile(session, name):
+    """开始对阶段做性能分析，返回停止函数"""
+    session['profile_dir'].mkdir(parents=True, exist_ok=True)
+    session['profiling'] = True
+    if session['profiler'] == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def stop():
+            profiler.disable()
+            session['profiling'] = False
+            path = session['profile_dir'] / f"{_safe_name(name)}.prof"
+            profiler.dump_stats(path)
+            top = []
+            for (filename, line, function), (_, calls, tottime, cumtime, _) in pstats.Stats(profiler).stats.items():
+                top.append({'function': f"{Path(filename).name}:{line}({function})", 'calls': calls,
+                            'tottime': round(tottime, 6), 'cumtime': round(cumtime, 6)})
+            top.sort(key=lambda f: f['cumtime'], reverse=True)
+            session['profiles'][name] = {'file': str(path), 'top': top[:PROFILE_TOP]}
+        return stop
+
+    # 采样分析器：SIGPROF只能在主线程中处理，其他线程中退化为不分析
+    if not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        session['profiling'] = False
+        return None
+    stacks = {}
+
+    def handler(signum, frame):
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{Path(code.co_filename).name}:{code.co_name}")
+            frame = frame.f_back
+        key = ';'.join(reversed(parts))
+        stacks[key] = stacks.get(key, 0) + 1
+
+    previous = signal.signal(signal.SIGPROF, handler)
+    signal.setitimer(signal.ITIMER_PROF, SAMPLE_INTERVAL, SAMPLE_INTERVAL)
+
+    def stop():
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, previous)
+        session['profiling'] = False
+        path = session['profile_dir'] / f"{_safe_name(name)}.folded"
+        with open(path, 'w') as f:
+            for key, samples in sorted(stacks.items(), key=lambda item: -item[1]):
+                f.write(f"{key} {samples}\n")
+        leaves = {}
+        for key, samples in stacks.items():
+            leaf = key.rsplit(';', 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + samples
+        total = sum(leaves.values())
+        top = [{'function': leaf, 'samples': samples, 'share': round(samples / total, 4)}
+               for leaf, samples in sorted(leaves.items(), key=lambda item: -item[1])[:PROFILE_TOP]]
+        session['profiles'][name] = {'file': str(path), 'samples': total, 'top': top}
+    return stop
+
+
+def report():
+    """当前会话的报告（可以直接json.dump），关闭时返回None"""
+    if _session is None:
+        return None
+    caches = {}
+    for kind, stats in _session['caches'].items():
+        looked_up = stats['hits'] + stats['misses']
+        caches[kind] = dict(stats, hit_rate=round(stats['hits'] / looked_up, 4) if looked_up else None)
+    return {
+        'wall': round(time.perf_counter() - _session['start'], 6),
+        'stages': {name: {k: round(v, 6) if isinstance(v, float) else v for k, v in entry.items()}
+                   for name, entry in _session['stages'].items()},
+        'counters': dict(_session['counters']),
+        'caches': caches,
+        'profiles': _session['profiles']
+    }
+
+
+def print_report(data):
+    """打印可读的摘要"""
+    print("\n" + "=" * 60)
+    print(f"Instrumentation (total {data['wall']:.2f}s)")
+    print("=" * 60)
+    print(f"{'Stage':<40} {'calls':>6} {'wall':>9} {'cpu':>9} {'child':>9}")
+    for name, entry in data['stages'].items():
+        indent = '  ' * name.count('/')
+        print(f"{indent + name.rsplit('/', 1)[-1]:<40} {entry['calls']:>6} {entry['wall']:>8.3f}s "
+              f"{entry['cpu']:>8.3f}s {entry['child_cpu']:>8.3f}s")
+    if data['counters']:
+        print("\nCounters:")
+        for name, value in sorted(data['counters'].items()):
+            print(f"  {name}: {value}")
+    if data['caches']:
+        print("\nCaches:")
+        for kind, stats in data['caches'].items():
+            rate = f"{stats['hit_rate']:.1%}" if stats['hit_rate'] is not None else '-'
+            print(f"  {kind}: {stats['hits']} hits, {stats['misses']} misses, {stats['deleted']} deleted "
+                  f"(hit rate {rate})")
+    for name, profile in data['profiles'].items():
+        print(f"\nProfile of {name}: {profile['file']}")
+        for function in profile['top'][:5]:
+            if 'cumtime' in function:
+                print(f"  {function['cumtime']:>9.3f}s  {function['function']}")
+            else:
+                print(f"  {function['share']:>8.1%}  {function['function']}")
+    print("=" * 60)
+
+
+def finish():
+    """结束会话：写入JSON（enable_from_env指定了输出时）并打印摘要"""
+    data = report()
+    if data is None:
+        return None
+    if _session['output']:
+        with open(_session['output'], 'w') as f:
+            json.dump(data, f, indent=2)
+        print(f"Saved: {_session['output']}")
+    print_report(data)
+    return data
+
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        with open(path) as f:
+            print_report(json.load(f))
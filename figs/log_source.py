@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+压缩和归档的日志目录的透明读取
+归档的campaign日志不需要先解压到磁盘：
+- 目录中的单个文件可以是.gz/.xz/.zst压缩的，log12.txt.gz按log12.txt处理（同名的未压缩文件优先）
+- 整个运行可以是一个.tar/.tar.gz/.tar.xz/.tar.zst归档，成员也可以是压缩的，成员所在的子目录被忽略
+归档中的日志以"逻辑路径"引用：归档路径/log12.txt，磁盘上没有这个文件，
+open_log、log_stat等函数负责找到对应的压缩文件或归档成员。
+压缩的归档只能顺序读取：需要读取多个成员时按archive_order排序，或者用iter_archive一遍读完。
+.zst需要可选的zstandard包，其他格式只用标准库
+
+用法：
+    python log_source.py /path/to/run.tar.zst [/path/to/log_dir ...]
+"""
+
+import contextlib
+import gzip
+import io
+import lzma
+import os
+import sys
+import tarfile
+from pathlib import Path, PurePosixPath
+
+from analysis_cache import entry_payload, file_identity, load_entry, store_entries
+
+COMPRESSED_SUFFIXES = ('.gz', '.xz', '.zst')
+ARCHIVE_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.xz', '.txz', '.tar.zst', '.tzst')
+# 归档成员索引的缓存格式版本
+ARCHIVE_INDEX_VERSION = 1
+
+# 进程内的归档成员索引：(路径, 大小, 修改时间) -> 索引
+_indexes = {}
+# 归档的读取位置：未压缩的.tar随机读取，压缩的归档只能向前读取
+_cursors = {}
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("reading .zst files requires the zstandard package (pip install zstandard)") from None
+    return zstandard
+
+
+def compression(name):
+    """文件名的压缩后缀，未压缩时返回None"""
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            return suffix
+    return None
+
+
+def logical_name(name):
+    """去掉压缩后缀后的文件名：log12.txt.gz -> log12.txt"""
+    suffix = compression(name)
+    return name[:-len(suffix)] if suffix else name
+
+
+def is_archive(path):
+    path = Path(path)
+    return path.name.endswith(ARCHIVE_SUFFIXES) and path.is_file()
+
+
+def open_compressed(source, suffix):
+    """以二进制方式打开路径或包装二进制流，按suffix解压（None表示不解压）"""
+    if suffix == '.gz':
+        return gzip.open(source, 'rb')
+    if suffix == '.xz':
+        return lzma.open(source, 'rb')
+    is_path = isinstance(source, (str, os.PathLike))
+    if suffix == '.zst':
+        zstandard = _zstandard()
+        return zstandard.ZstdDecompressor().stream_reader(open(source, 'rb') if is_path else source, closefd=True)
+    return open(source, 'rb') if is_path else source
+
+
+class _MemberReader(io.RawIOBase):
+    """顺序读取模式下的归档成员：tarfile返回的流不支持seekable()和tell()，TextIOWrapper需要它们"""
+
+    def __init__(self, f):
+        self._f = f
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._f.read(len(b))
+        b[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+
+def _stream_member(tar, info):
+    return io.BufferedReader(_MemberReader(tar.extractfile(info)))
+
+
+def _member_compression(member):
+    return compression(PurePosixPath(member).name)
+
+
+@contextlib.contextmanager
+def _tar_stream(archive):
+    """顺序读取归档（不回退，压缩的归档只解压一遍）"""
+    if Path(archive).name.endswith(('.tar.zst', '.tzst')):
+        with open_compressed(archive, '.zst') as raw, tarfile.open(fileobj=raw, mode='r|') as tar:
+            yield tar
+    else:
+        with tarfile.open(archive, mode='r|*') as tar:
+            yield tar
+
+
+def _log_members(tar):
+    """归档中的日志成员（普通文件，按逻辑名去重，先出现的优先）"""
+    seen = set()
+    for info in tar:
+        if not info.isfile():
+            continue
+        name = logical_name(PurePosixPath(info.name).name)
+        if name in seen:
+            print(f"Warning: duplicate member {info.name} ignored")
+            continue
+        seen.add(name)
+        yield name, info
+
+
+def _build_index(archive):
+    members = {}
+    with _tar_stream(archive) as tar:
+        for position, (name, info) in enumerate(_log_members(tar)):
+            members[name] = {'member': info.name, 'size': info.size, 'mtime': info.mtime,
+                             'offset': info.offset_data, 'position': position}
+    return {'members': members}
+
+
+def archive_index(archive, conn=None):
+    """归档中的日志成员：{'members': 逻辑名 -> {member, size, mtime, offset, position}}
+
+    压缩的归档需要解压一遍才能列出成员，结果按归档的大小和修改时间缓存在进程内，
+    conn为analysis_cache的连接时也保存在SQLite缓存中
+    """
+    archive = Path(archive)
+    identity = file_identity(archive)
+    key = (str(archive.resolve()), identity['size'], identity['mtime_ns'])
+    index = _indexes.get(key)
+    if index is not None:
+        return index
+    if conn is not None:
+        index = entry_payload(load_entry(conn, 'log_archive', archive), archive, identity, ARCHIVE_INDEX_VERSION)
+    if index is None:
+        index = _build_index(archive)
+        if conn is not None:
+            store_entries(conn, 'log_archive', [(archive, identity, index)], ARCHIVE_INDEX_VERSION)
+    _indexes[key] = index
+    return index
+
+
+def list_logs(log_dir, suffix='.txt', conn=None):
+    """日志来源中逻辑名以suffix结尾的文件，按逻辑名排序
+
+    目录返回实际的文件路径（可能是压缩文件），归档返回成员的逻辑路径
+    """
+    log_dir = Path(log_dir)
+    if is_archive(log_dir):
+        names = [name for name in archive_index(log_dir, conn)['members'] if name.endswith(suffix)]
+        return [log_dir / name for name in sorted(names)]
+    files = {}
+    with os.scandir(log_dir) as it:
+        for dirent in it:
+            name = logical_name(dirent.name)
+            if not name.endswith(suffix) or not dirent.is_file():
+                continue
+            # 同名的未压缩文件优先（例如解压后没有删除压缩包）
+            if name not in files or name == dirent.name:
+                files[name] = Path(dirent.path)
+    return [files[name] for name in sorted(files)]
+
+
+def _archive_member(path, conn=None):
+    """逻辑路径对应的(归档, 成员信息)，不是归档成员时返回None"""
+    path = Path(path)
+    if not is_archive(path.parent):
+        return None
+    member = archive_index(path.parent, conn)['members'].get(path.name)
+    return (path.parent, member) if member is not None else None
+
+
+def find_log(log_dir, name):
+    """日志来源中名为name的文件：实际路径（目录中的文件或压缩文件）或归档成员的逻辑路径，不存在时返回None"""
+    log_dir = Path(log_dir)
+    if is_archive(log_dir):
+        return log_dir / name if name in archive_index(log_dir)['members'] else None
+    for candidate in [name] + [name + suffix for suffix in COMPRESSED_SUFFIXES]:
+        path = log_dir / candidate
+        if path.is_file():
+            return path
+    return None
+
+
+def _resolve(path):
+    """逻辑路径 -> ('file', 实际路径) / ('member', (归档, 成员信息))"""
+    path = Path(path)
+    if path.is_file():
+        return 'file', path
+    member = _archive_member(path)
+    if member is not None:
+        return 'member', member
+    found = find_log(path.parent, path.name) if path.parent.is_dir() else None
+    if found is not None:
+        return 'file', found
+    raise FileNotFoundError(f"No such log: {path}")
+
+
+def log_stat(path):
+    """日志的(身份, 修改时间)：身份为analysis_cache的{size, mtime_ns}，归档成员取成员头中的值"""
+    kind, target = _resolve(path)
+    if kind == 'file':
+        st = target.stat()
+        return file_identity(target, st), st.st_mtime
+    member = target[1]
+    return {'size': member['size'], 'mtime_ns': int(member['mtime'] * 1e9)}, member['mtime']
+
+
+def log_identity(path):
+    return log_stat(path)[0]
+
+
+def archive_order(paths):
+    """按读取代价排序：归档成员按在归档中的位置，其他文件保持原顺序"""
+    def key(item):
+        i, path = item
+        member = _archive_member(path) if not Path(path).is_file() else None
+        return (str(member[0]), member[1]['position']) if member is not None else ('', i)
+    return [path for _, path in sorted(enumerate(paths), key=key)]
+
+
+def _open_member(archive, member):
+    """归档成员的原始二进制流（成员自身的压缩未解开），在下一次读取同一归档之前有效"""
+    cursor = _cursors.get(archive)
+    if archive.name.endswith('.tar'):
+        # 未压缩的归档可以随机读取：按索引中的数据偏移直接定位
+        if cursor is None:
+            cursor = _cursors[archive] = {'tar': tarfile.open(archive, mode='r:')}
+        info = tarfile.TarInfo(member['member'])
+        info.size = member['size']
+        info.offset_data = member['offset']
+        return cursor['tar'].extractfile(info)
+    # 压缩的归档只能向前读取，目标在当前位置之前时重新打开
+    if cursor is None or cursor['position'] >= member['position']:
+        close_archive(archive)
+        stack = contextlib.ExitStack()
+        tar = stack.enter_context(_tar_stream(archive))
+        cursor = _cursors[archive] = {'stack': stack, 'tar': tar, 'members': _log_members(tar), 'position': -1}
+    for _, info in cursor['members']:
+        cursor['position'] += 1
+        if cursor['position'] == member['position']:
+            return _stream_member(cursor['tar'], info)
+    raise FileNotFoundError(f"{member['member']} not found in {archive}")
+
+
+def close_archive(archive):
+    """关闭为随机读取打开的归档"""
+    cursor = _cursors.pop(archive, None)
+    if cursor is not None:
+        cursor['stack'].close() if 'stack' in cursor else cursor['tar'].close()
+
+
+def open_log(path):
+    """以二进制方式打开日志并解压：实际文件、目录中同名的压缩文件或归档成员都可以"""
+    kind, target = _resolve(path)
+    if kind == 'file':
+        return open_compressed(target, compression(target.name))
+    archive, member = target
+    return open_compressed(_open_member(archive, member), _member_compression(member['member']))
+
+
+def open_log_text(path):
+    """以文本方式打开日志（与open(path, 'r', encoding='utf-8', errors='ignore')一致）"""
+    return io.TextIOWrapper(open_log(path), encoding='utf-8', errors='ignore')
+
+
+def iter_archive(archive, names=None):
+    """一遍顺序读取归档，按归档中的顺序生成(逻辑名, TarInfo, 成员的压缩后缀, 原始二进制流)
+
+    names不为None时只生成其中的日志；流只在生成它的这一步内有效
+    """
+    with _tar_stream(archive) as tar:
+        for name, info in _log_members(tar):
+            if names is None or name in names:
+                yield name, info, _member_compression(info.name), _stream_member(tar, info)
+
+
+if __name__ == '__main__':
+    for source in sys.argv[1:]:
+        logs = list_logs(source)
+        kind = 'archive' if is_archive(source) else 'directory'
+        compressed = sum(1 for path in logs if compression(path.name) or
+                         (kind == 'archive' and _member_compression(_archive_member(path)[1]['member'])))
+        print(f"{source} ({kind}): {len(logs)} logs, {compressed} compressed")
+        for path in logs[:5]:
+            identity, _ = log_stat(path)
+            print(f"  {logical_name(path.name)}: {identity['size']} bytes")
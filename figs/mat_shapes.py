@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+trace.txt中mat_shapes记录的解析与列式存储
+每个测试用例打印一行[[d0, d1, ...], [d0, ...], ...]（之后可能跟着算子名），原来只统计行数。
+这里按块流式读取，用一个正则找出记录行（与trace_scan的定义一致：以[[开头且同一行内有]]），
+再把一块中全部记录的数字在NumPy字节数组上一次向量化地解析出来（不对每行调用ast.literal_eval），得到不规则数组：
+- values：全部维度值（int64）
+- shape_offsets：每个形状在values中的起止位置
+- record_offsets：每条记录在形状中的起止位置
+- operator：每条记录的算子编号（operators中的下标，没有算子名时为-1）
+结果保存为trace.txt旁边的.npz；trace.txt只会追加，再次加载时只解析追加的部分。
+压缩的trace.txt和归档中的trace.txt（见log_source.py）在读取时解压，不保存.npz。
+在此之上的向量化统计：元素个数分布、接近或超过2^31/2^32的比例（ConvTranspose2d的整数溢出），各维度的取值覆盖
+
+用法：
+    python mat_shapes.py /path/to/trace.txt [--tolerance 0.01] [--no-cache]
+    python mat_shapes.py /path/to/run.tar.zst/trace.txt
+"""
+
+import argparse
+import contextlib
+import os
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+from log_source import compression, open_log
+
+# 缓存格式版本，变化时旧的.npz失效
+SHAPES_VERSION = 1
+CHUNK_SIZE = 16 * 1024 * 1024
+
+# 记录行：\n[[形状...]]算子名；第一组为最外层括号之间的内容，第二组为]]之后的内容
+RECORD_LINE = re.compile(rb'\n\[\[([^\n]*?)\]\]([^\n]*)')
+# 接近边界的相对容差：|元素个数 - 2^k| <= 2^k * tolerance
+DEFAULT_TOLERANCE = 1 / 64
+BOUNDARIES = (31, 32)
+POW10 = 10 ** np.arange(19, dtype=np.int64)
+# 超过18位的数字无法用int64表示，记为该值
+OVERFLOW_VALUE = np.iinfo(np.int64).max
+
+
+def new_store():
+    return {
+        'values': np.zeros(0, dtype=np.int64),
+        'shape_offsets': np.zeros(1, dtype=np.int64),
+        'record_offsets': np.zeros(1, dtype=np.int64),
+        'operator': np.zeros(0, dtype=np.int32),
+        'operators': [],
+        'offset': 0
+    }
+
+
+def parse_numbers(buf):
+    """解析缓冲区中全部（可带负号的）十进制整数，返回(起始位置, 数值)"""
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    digit = (arr >= 48) & (arr <= 57)
+    edges = np.diff(np.concatenate([[False], digit, [False]]).view(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if not len(starts):
+        return starts, np.zeros(0, dtype=np.int64)
+    lengths = ends - starts
+    digits = (arr[digit] - 48).astype(np.int64)
+    # 每个数字位到所在数字末尾的距离，即10的幂次
+    exponents = np.repeat(ends, lengths) - 1 - np.flatnonzero(digit)
+    values = np.add.reduceat(digits * POW10[np.minimum(exponents, 18)], np.cumsum(lengths) - lengths)
+    values[lengths > 18] = OVERFLOW_VALUE
+    negative = (starts > 0) & (arr[np.maximum(starts - 1, 0)] == ord('-'))
+    values[negative] *= -1
+    return starts, values
+
+
+def parse_block(bodies):
+    """把一批记录的括号内容解析为不规则数组，返回(values, 每个形状的维数, 每条记录的形状数)
+
+    各条记录以\\n[连接：缓冲区中的每个[都是一个形状的开始，每个\\n是一条记录的开始
+    """
+    buf = b'[' + b'\n['.join(bodies)
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    shape_starts = np.flatnonzero(arr == ord('['))
+    record_of_shape = np.cumsum(arr == ord('\n'))[shape_starts]
+    starts, values = parse_numbers(buf)
+    shape_of_value = np.searchsorted(shape_starts, starts, side='right') - 1
+    dims = np.bincount(shape_of_value, minlength=len(shape_starts))
+    shapes = np.bincount(record_of_shape, minlength=len(bodies))
+    return values, dims, shapes
+
+
+def scan_shapes(trace_file, store=None, chunk_size=CHUNK_SIZE, final=False):
+    """从store['offset']开始流式解析trace.txt，返回新的存储（不修改传入的store）
+
+    trace_file也可以是二进制流，从当前位置读取到结尾（只用于从头解析）
+
+    最后一行没有换行时可能还在写入：默认不解析，offset停在它的开头，下次从那里继续；
+    final为True时（文件不再写入）也解析这一行，与trace_scan的trace_record_count一致，offset为文件结尾
+    """
+    store = store or new_store()
+    operator_ids = {name: i for i, name in enumerate(store['operators'])}
+    operators = list(store['operators'])
+    parts = {'values': [store['values']], 'dims': [], 'shapes': [], 'operator': [store['operator']]}
+    offset = store['offset']
+    position = offset
+    carry = b''
+    is_path = isinstance(trace_file, (str, os.PathLike))
+    with open(trace_file, 'rb') if is_path else contextlib.nullcontext(trace_file) as f:
+        if is_path:
+            f.seek(offset)
+        while True:
+            chunk = f.read(chunk_size)
+            position += len(chunk)
+            # 前面补一个换行，第一行也能匹配；单独的\r也是行结束符，先转换再找最后一个换行
+            buf = b'\n' + carry + chunk
+            if b'\r' in buf:
+                buf = buf.replace(b'\r', b'\n')
+            if chunk:
+                # 只处理完整的行，剩余部分留到下一块
+                cut = buf.rfind(b'\n')
+                if cut <= 0:
+                    carry = buf[1:]
+                    continue
+            elif final and len(buf) > 1:
+                cut = len(buf)
+            else:
+                break
+            buf, carry = buf[:cut], buf[cut + 1:]
+            offset = position - len(carry)
+            matches = RECORD_LINE.findall(buf)
+            if not matches:
+                continue
+            bodies, tails = zip(*matches)
+            # 不同的算子名很少：只对每种原始写法解析一次（按首次出现的顺序编号），逐条记录的映射在C层完成
+            tail_ids = {}
+            for tail in dict.fromkeys(tails):
+                name = tail.strip().decode(errors='replace')
+                if name and name not in operator_ids:
+                    operator_ids[name] = len(operators)
+                    operators.append(name)
+                tail_ids[tail] = operator_ids[name] if name else -1
+            ids = list(map(tail_ids.__getitem__, tails))
+            values, dims, shapes = parse_block(bodies)
+            parts['values'].append(values)
+            parts['dims'].append(dims)
+            parts['shapes'].append(shapes)
+            parts['operator'].append(np.array(ids, dtype=np.int32))
+    dims = np.concatenate(parts['dims']) if parts['dims'] else np.zeros(0, dtype=np.int64)
+    shapes = np.concatenate(parts['shapes']) if parts['shapes'] else np.zeros(0, dtype=np.int64)
+    shape_offsets = np.concatenate([store['shape_offsets'], store['shape_offsets'][-1] + np.cumsum(dims)])
+    record_offsets = np.concatenate([store['record_offsets'], store['record_offsets'][-1] + np.cumsum(shapes)])
+    return {
+        'values': np.concatenate(parts['values']).astype(np.int64, copy=False),
+        'shape_offsets': shape_offsets.astype(np.int64, copy=False),
+        'record_offsets': record_offsets.astype(np.int64, copy=False),
+        'operator': np.concatenate(parts['operator']).astype(np.int32, copy=False),
+        'operators': operators,
+        'offset': offset
+    }
+
+
+def store_path(trace_file):
+    trace_file = Path(trace_file)
+    return trace_file.with_name(trace_file.name + '.shapes.npz')
+
+
+def save_store(store, path, identity):
+    tmp = Path(str(path) + '.tmp')
+    with open(tmp, 'wb') as f:
+        np.savez(f, values=store['values'], shape_offsets=store['shape_offsets'],
+                 record_offsets=store['record_offsets'], operator=store['operator'],
+                 operators=np.array(store['operators'], dtype=str),
+                 _stamp=np.array([SHAPES_VERSION, store['offset'], identity[0], identity[1]], dtype=np.int64))
+    os.replace(tmp, path)
+
+
+def load_shapes(trace_file, cache=True):
+    """加载trace.txt的形状存储；cache为True时使用旁边的.npz，文件未变化时直接加载，变大时只解析追加的部分
+
+    trace_file也可以是压缩文件或归档成员的逻辑路径（log_source.find_log的结果），这时每次完整解析
+    """
+    trace_file = Path(trace_file)
+    if compression(trace_file.name) or not trace_file.is_file():
+        with open_log(trace_file) as f:
+            return scan_shapes(f, final=True)
+    st = trace_file.stat()
+    identity = (st.st_size, st.st_mtime_ns)
+    path = store_path(trace_file)
+    store = None
+    unchanged = False
+    if cache and path.exists():
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                version, offset, size, mtime_ns = data['_stamp'].tolist()
+                if version == SHAPES_VERSION and st.st_size >= offset:
+                    store = {key: data[key] for key in ('values', 'shape_offsets', 'record_offsets', 'operator')}
+                    store['operators'] = data['operators'].tolist()
+                    store['offset'] = offset
+                    unchanged = (size, mtime_ns) == identity
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: ignoring shape store {path}: {e}")
+            store = None
+    if not unchanged:
+        store = scan_shapes(trace_file, store)
+        if cache:
+            try:
+                save_store(store, path, identity)
+            except OSError as e:
+                print(f"Warning: cannot write shape store {path}: {e}")
+    # 保存的存储只包含完整的行；没有换行的最后一行只在返回的结果中解析，追加后仍从它的开头继续
+    if store['offset'] < st.st_size:
+        store = scan_shapes(trace_file, store, final=True)
+    return store
+
+
+def record_count(store):
+    return len(store['record_offsets']) - 1
+
+
+def shape_dims(store):
+    """每个形状的维数"""
+    return np.diff(store['shape_offsets'])
+
+
+def shape_numel(store):
+    """每个形状的元素个数（float64：2^53以内精确，足够判断2^31/2^32附近）；0维形状为1"""
+    offsets = store['shape_offsets']
+    values = store['values'].astype(np.float64)
+    dims = np.diff(offsets)
+    numel = np.ones(len(dims))
+    nonempty = dims > 0
+    if len(values):
+        numel[nonempty] = np.multiply.reduceat(values, offsets[:-1][nonempty])
+    return numel
+
+
+def record_max(store, per_shape):
+    """每条记录中各形状的最大值（没有形状的记录为0）"""
+    offsets = store['record_offsets']
+    counts = np.diff(offsets)
+    result = np.zeros(len(counts))
+    nonempty = counts > 0
+    if len(per_shape):
+        result[nonempty] = np.maximum.reduceat(per_shape, offsets[:-1][nonempty])
+    return result
+
+
+def log2_histogram(values):
+    """log2分箱：[(k, 次数)]，k为floor(log2(x))，x <= 0记为-1"""
+    values = np.asarray(values, dtype=np.float64)
+    buckets = np.full(len(values), -1, dtype=np.int64)
+    positive = values > 0
+    buckets[positive] = np.floor(np.log2(values[positive])).astype(np.int64)
+    keys, counts = np.unique(buckets, return_counts=True)
+    return list(zip(keys.tolist(), counts.tolist()))
+
+
+def boundary_stats(store, tolerance=DEFAULT_TOLERANCE, boundaries=BOUNDARIES):
+    """各边界2^k附近（相对容差tolerance）和达到或超过2^k的记录数，分别按元素个数和单个维度统计，并按算子分解"""
+    numel = record_max(store, shape_numel(store))
+    # 单个维度：每个形状中最大的维度
+    offsets = store['shape_offsets']
+    dims = np.diff(offsets)
+    largest_dim = np.zeros(len(dims))
+    if len(store['values']):
+        largest_dim[dims > 0] = np.maximum.reduceat(store['values'].astype(np.float64), offsets[:-1][dims > 0])
+    dim = record_max(store, largest_dim)
+    stats = {}
+    for k in boundaries:
+        bound = float(2 ** k)
+        for name, values in (('numel', numel), ('dim', dim)):
+            near = np.abs(values - bound) <= bound * tolerance
+            over = values >= bound
+            stats[f"{name}_near_2^{k}"] = int(np.count_nonzero(near))
+            stats[f"{name}_over_2^{k}"] = int(np.count_nonzero(over))
+            stats[f"{name}_near_2^{k}_by_operator"] = operator_counts(store, near)
+            stats[f"{name}_over_2^{k}_by_operator"] = operator_counts(store, over)
+    return stats
+
+
+def operator_counts(store, mask):
+    """mask选中的记录按算子计数（没有算子名的记为'-'）"""
+    ids = store['operator'][mask]
+    counts = np.bincount(ids + 1, minlength=len(store['operators']) + 1)
+    names = ['-'] + list(store['operators'])
+    return {names[i]: int(c) for i, c in enumerate(counts) if c}
+
+
+def dimension_coverage(store, max_rank=8):
+    """各维度位置（第0维、第1维...）取值的log2覆盖直方图，返回(位置 x log2分箱的计数矩阵, 分箱的下界指数)
+
+    分箱-1为0或负数，其余为floor(log2(d))，最大到63
+    """
+    offsets = store['shape_offsets']
+    values = store['values']
+    dims = np.diff(offsets)
+    position = np.arange(len(values)) - np.repeat(offsets[:-1], dims)
+    buckets = np.full(len(values), -1, dtype=np.int64)
+    positive = values > 0
+    buckets[positive] = np.floor(np.log2(values[positive].astype(np.float64))).astype(np.int64)
+    keep = position < max_rank
+    matrix = np.zeros((max_rank, 65), dtype=np.int64)
+    np.add.at(matrix, (position[keep], buckets[keep] + 1), 1)
+    return matrix, np.arange(-1, 64)
+
+
+def print_shape_summary(store, tolerance=DEFAULT_TOLERANCE):
+    n = record_count(store)
+    dims = shape_dims(store)
+    print(f"\n--- mat_shapes ({n} records, {len(dims)} shapes, {len(store['values'])} dims, "
+          f"{len(store['operators'])} operators) ---")
+    if not n:
+        return
+    shapes_per_record = np.diff(store['record_offsets'])
+    print(f"Shapes per record: mean {shapes_per_record.mean():.2f}, max {shapes_per_record.max()}")
+    print(f"Rank: {dict(zip(*[a.tolist() for a in np.unique(dims, return_counts=True)]))}")
+    print("Max elements per record (log2 buckets):")
+    for k, count in log2_histogram(record_max(store, shape_numel(store))):
+        label = '0' if k < 0 else f"[2^{k}, 2^{k + 1})"
+        print(f"  {label}: {count}")
+    print(f"Near/over 2^31, 2^32 (tolerance {tolerance:g}):")
+    stats = boundary_stats(store, tolerance)
+    for key, value in stats.items():
+        if not key.endswith('_by_operator'):
+            by_operator = stats[key + '_by_operator']
+            top = ', '.join(f"{name} {count}" for name, count in
+                            sorted(by_operator.items(), key=lambda item: -item[1])[:3])
+            print(f"  {key}: {value}" + (f" ({top})" if top else ''))
+    matrix, buckets = dimension_coverage(store)
+    print("Dimension coverage (distinct log2 buckets per position):")
+    for position, row in enumerate(matrix):
+        if row.sum():
+            hit = buckets[row > 0]
+            print(f"  dim {position}: {int(row.sum())} values, buckets {hit.min()}..{hit.max()} "
+                  f"({len(hit)} covered)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parse mat_shapes records in trace.txt')
+    parser.add_argument('trace')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='relative distance to 2^31/2^32 that counts as near')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write the .shapes.npz store')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = load_shapes(args.trace, cache=not args.no_cache)
+    print(f"Loaded {record_count(store)} records in {time.perf_counter() - start:.2f} s")
+    print_shape_summary(store, args.tolerance)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+NNSmith bug目录的并行解析
+每个bug-*目录中的err.log（以及report.json，如果有）解析为带类型的字段：
+Symptom/Stage、不一致的两个后端、不一致元素的比例、最大绝对/相对差值和异常类型。
+读取是I/O密集的，用线程池并行；结果按bug目录保存在与GPU-Fuzz相同的SQLite缓存中，
+重新运行时只解析新增或变化的bug目录
+
+用法：
+    python nnsmith_bugs.py /path/to/bug_dir [--cache analysis_cache.sqlite] [--threads 32] [--out bugs.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from analysis_cache import (cache_key, delete_entries, entry_payload, file_identity, load_entries,
+                            open_cache, store_entries)
+
+# bug报告解析结果的格式版本，变化时缓存中的旧条目失效
+BUG_REPORT_VERSION = 2
+
+DEFAULT_THREADS = 32
+
+# NNSmith的BugReport.dump写出的文件
+ERR_LOG_NAME = 'err.log'
+REPORT_NAME = 'report.json'
+
+NAME_PATTERN = re.compile(r'Symptom\.([^-]+)(?:-Stage\.([^-]+))?')
+# "pt2 (cuda opt: True) != torch[cpu] eager at output 0"，去掉末尾的输出位置；
+# 只匹配行首（可以带异常类型前缀），traceback中有缩进的源码行（例如if out.shape != ref.shape:）不匹配
+BACKEND_PAIR = re.compile(r'^(?:[A-Za-z_][\w.]*: )?([^\s:].*?) != (\S.*?)(?: at \S.*)?\s*$', re.MULTILINE)
+MISMATCH_PATTERN = re.compile(r'Mismatched elements: (\d+) / (\d+)')
+# numpy.testing（Max ... difference）和torch.testing（Greatest ... difference）两种格式
+ABS_DIFF_PATTERN = re.compile(r'(?:Max|Greatest) absolute difference(?: among violations)?: ([-+\w.]+)')
+REL_DIFF_PATTERN = re.compile(r'(?:Max|Greatest) relative difference(?: among violations)?: ([-+\w.]+)')
+EXCEPTION_PATTERN = re.compile(r'^([A-Za-z_][\w.]*(?:Error|Exception|Failed|Interrupt))(?::|$)', re.MULTILINE)
+
+
+def _number(text):
+    """差值字段转为float，无法解析时返回None"""
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_err_log(text):
+    """从err.log的内容提取后端、不一致比例、差值和异常类型，没有出现的字段为None"""
+    fields = {'backends': None, 'mismatched': None, 'elements': None, 'mismatch_ratio': None,
+              'max_abs_diff': None, 'max_rel_diff': None, 'exception_type': None}
+    pair = BACKEND_PAIR.search(text)
+    if pair:
+        fields['backends'] = [pair.group(1), pair.group(2)]
+    mismatch = MISMATCH_PATTERN.search(text)
+    if mismatch:
+        fields['mismatched'], fields['elements'] = int(mismatch.group(1)), int(mismatch.group(2))
+        if fields['elements']:
+            fields['mismatch_ratio'] = fields['mismatched'] / fields['elements']
+    abs_diff = ABS_DIFF_PATTERN.search(text)
+    if abs_diff:
+        fields['max_abs_diff'] = _number(abs_diff.group(1).rstrip('.'))
+    rel_diff = REL_DIFF_PATTERN.search(text)
+    if rel_diff:
+        fields['max_rel_diff'] = _number(rel_diff.group(1).rstrip('.'))
+    # traceback中最后一个异常是根因（例如BackendCompilerFailed之后的KeyError）
+    exceptions = EXCEPTION_PATTERN.findall(text)
+    if exceptions:
+        fields['exception_type'] = exceptions[-1].rsplit('.', 1)[-1]
+    return fields
+
+
+def parse_bug_report(bug):
+    """解析单个bug目录"""
+    bug = Path(bug)
+    match = NAME_PATTERN.search(bug.name)
+    report = {'name': bug.name,
+              'symptom': match.group(1) if match else None,
+              'stage': match.group(2) if match else None,
+              'system': None}
+    report_file = bug / REPORT_NAME
+    if report_file.exists():
+        try:
+            with open(report_file) as f:
+                meta = json.load(f)
+            for key in ('symptom', 'stage'):
+                if meta.get(key):
+                    report[key] = str(meta[key]).rsplit('.', 1)[-1]
+            report['system'] = meta.get('system')
+        except (OSError, ValueError) as e:
+            print(f"Error reading {report_file}: {e}")
+    text = ''
+    err_log = bug / ERR_LOG_NAME
+    if err_log.exists():
+        try:
+            with open(err_log, 'r', encoding='utf-8', errors='ignore') as f:
+                text = f.read()
+        except OSError as e:
+            print(f"Error reading {err_log}: {e}")
+    report.update(parse_err_log(text))
+    return report
+
+
+def _bug_identity(bug):
+    """bug目录的身份：err.log和report.json的大小之和，目录、err.log和report.json中最新的修改时间
+
+    原地重写report.json不改变目录的修改时间，所以它的大小和修改时间也要计入
+    """
+    identity = dict(file_identity(bug), size=0)
+    for name in (ERR_LOG_NAME, REPORT_NAME):
+        path = bug / name
+        if path.exists():
+            file_id = file_identity(path)
+            identity['size'] += file_id['size']
+            identity['mtime_ns'] = max(identity['mtime_ns'], file_id['mtime_ns'])
+    return identity
+
+
+def ingest_bug_reports(bug_dir, cache=None, threads=DEFAULT_THREADS):
+    """用线程池解析bug_dir下的全部bug-*目录，返回按目录名排序的报告列表；
+    cache为SQLite缓存文件路径时只解析新增或变化的目录"""
+    bug_path = Path(bug_dir)
+    if not bug_path.exists():
+        print(f"Warning: {bug_dir} does not exist")
+        return []
+    bugs = sorted(p for p in bug_path.glob('bug-*') if p.is_dir())
+    conn = open_cache(cache) if cache else None
+    reports = {}
+    try:
+        entries = load_entries(conn, 'nnsmith_bug_report', bug_path) if conn is not None else {}
+        pending = []
+        for bug in bugs:
+            identity = _bug_identity(bug)
+            payload = entry_payload(entries.pop(cache_key(bug), None), bug, identity, BUG_REPORT_VERSION)
+            if payload is None:
+                pending.append((bug, identity))
+            reports[bug.name] = payload
+        with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+            parsed = list(pool.map(parse_bug_report, [bug for bug, _ in pending]))
+        for (bug, _), payload in zip(pending, parsed):
+            reports[bug.name] = payload
+        if conn is not None:
+            store_entries(conn, 'nnsmith_bug_report',
+                          [(bug, identity, payload) for (bug, identity), payload in zip(pending, parsed)],
+                          BUG_REPORT_VERSION)
+            delete_entries(conn, 'nnsmith_bug_report', entries)
+    finally:
+        if conn is not None:
+            conn.close()
+    return list(reports.values())
+
+
+def bug_report_summary(reports):
+    """bug报告的统计：Symptom、后端对和异常类型的计数，不一致比例和差值的中位数/最大值"""
+    def spread(values):
+        values = [v for v in values if v is not None]
+        if not values:
+            return None
+        return {'median': statistics.median(values), 'max': max(values)}
+
+    return {
+        'bugs': len(reports),
+        'symptoms': dict(Counter(r['symptom'] for r in reports if r['symptom']).most_common()),
+        'backend_pairs': dict(Counter(' != '.join(r['backends']) for r in reports if r['backends']).most_common()),
+        'exception_types': dict(Counter(r['exception_type'] for r in reports if r['exception_type']).most_common()),
+        'mismatch_ratio': spread(r['mismatch_ratio'] for r in reports),
+        'max_abs_diff': spread(r['max_abs_diff'] for r in reports),
+        'max_rel_diff': spread(r['max_rel_diff'] for r in reports)
+    }
+
+
+def print_bug_report_summary(summary):
+    print(f"NNSmith bug reports: {summary['bugs']}")
+    print(f"Symptoms: {summary['symptoms']}")
+    for pair, count in list(summary['backend_pairs'].items())[:5]:
+        print(f"  {count:5d}  {pair}")
+    print(f"Exception types: {summary['exception_types']}")
+    for key, label in (('mismatch_ratio', 'Mismatch ratio'), ('max_abs_diff', 'Max abs diff'),
+                       ('max_rel_diff', 'Max rel diff')):
+        if summary[key] is not None:
+            print(f"{label}: median {summary[key]['median']:.4g}, max {summary[key]['max']:.4g}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parse NNSmith bug directories in parallel')
+    parser.add_argument('bug_dir')
+    parser.add_argument('--cache', default=None, help='SQLite analysis cache')
+    parser.add_argument('--threads', type=int, default=min(DEFAULT_THREADS, (os.cpu_count() or 1) * 8))
+    parser.add_argument('--out', default=None, help='write per-bug reports as JSON')
+    args = parser.parse_args()
+
+    reports = ingest_bug_reports(args.bug_dir, args.cache, args.threads)
+    print_bug_report_summary(bug_report_summary(reports))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nSaved: {args.out}")
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+NNSmith fuzz.log的分块解析
+- 按固定大小的二进制块读取，在NumPy字节数组上向量化地找出包含bug/error的日志行，
+  并直接从行首的固定位置取出时间戳，整体转换为numpy.datetime64数组，
+  不逐行调用lower()、re.search和strptime
+- 运行时间只读取文件开头和结尾的几个块
+- 稀疏时间索引：每隔INDEX_STRIDE字节记录一个(行首字节偏移, 时间戳)，通过seek构建，不需要读完整个日志；
+  时间窗口查询只读取窗口对应的字节范围
+
+用法：
+    python nnsmith_log.py /path/to/fuzz.log [--from 0] [--to 1]
+"""
+
+import argparse
+import bisect
+import re
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from analysis_cache import cached_parse, open_cache
+
+LOG_CHUNK_SIZE = 16 * 1024 * 1024
+EDGE_BLOCK_SIZE = 64 * 1024
+
+# 稀疏索引的采样间隔和格式版本
+INDEX_STRIDE = 1024 * 1024
+TIME_INDEX_VERSION = 1
+
+TIMESTAMP_PATTERN = re.compile(rb'\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
+LINE_TIMESTAMP_PATTERN = re.compile(rb'(?m)^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
+TOTALS_PATTERN = re.compile(rb'Total (\d+) (testcases generated|bugs found|failed to make testcases)')
+TOTALS_FIELDS = {
+    b'testcases generated': 'total_testcases',
+    b'bugs found': 'total_bugs',
+    b'failed to make testcases': 'failed_testcases'
+}
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 行首时间戳的模板："[YYYY-MM-DD HH:MM:SS"，d表示数字
+STAMP_TEMPLATE = b'[dddd-dd-dd dd:dd:dd'
+STAMP_LEN = len(STAMP_TEMPLATE)
+_STAMP_DIGITS = np.frombuffer(STAMP_TEMPLATE, np.uint8) == ord('d')
+_STAMP_LITERALS = np.frombuffer(STAMP_TEMPLATE, np.uint8)
+KEYWORD_PADDING = b'\0' * 8
+
+
+def _keyword_positions(arr, keyword):
+    """关键字在字节数组中每次出现的起始位置（arr末尾需要至少len(keyword)个填充字节）
+
+    先找出首字节的位置，再逐个字节筛选候选位置，只有第一步需要扫描整个数组
+    """
+    candidates = np.flatnonzero(arr[:len(arr) - len(keyword)] == keyword[0])
+    for i, byte in enumerate(keyword[1:], 1):
+        candidates = candidates[arr[candidates + i] == byte]
+    return candidates
+
+
+def _to_datetime64(stamps):
+    """把(N, 19)的"YYYY-MM-DD HH:MM:SS"字节数组转换为datetime64[s]
+
+    直接由各字段的数字计算，不经过字符串解析；非法的日期时间（例如13月、2月30日）被跳过，
+    与原来strptime失败时跳过一致
+    """
+    digits = stamps.astype(np.int64) - 48
+
+    def field(start, width):
+        value = np.zeros(len(stamps), dtype=np.int64)
+        for i in range(start, start + width):
+            value = value * 10 + digits[:, i]
+        return value
+
+    year, month, day = field(0, 4), field(5, 2), field(8, 2)
+    hour, minute, second = field(11, 2), field(14, 2), field(17, 2)
+    valid = (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (hour < 24) & (minute < 60) & (second < 60)
+    months = (year - 1970) * 12 + np.where(valid, month, 1) - 1
+    month_start = months.astype('M8[M]').astype('M8[D]')
+    month_days = ((months + 1).astype('M8[M]').astype('M8[D]') - month_start).astype(np.int64)
+    valid &= day <= month_days
+    seconds = ((hour * 60 + minute) * 60 + second)[valid]
+    return (month_start[valid] + (day[valid] - 1)).astype('M8[s]') + seconds.astype('m8[s]')
+
+
+def _chunk_timestamps(buf):
+    """一段完整的行中所有bug/error日志行的时间戳（与原来逐行 'bug' in line.lower() or
+    'error' in line.lower() 再取行内第一个[YYYY-MM-DD HH:MM:SS的结果一致）"""
+    arr = np.frombuffer(buf, np.uint8)
+    lower = np.frombuffer(buf.lower() + KEYWORD_PADDING, np.uint8)
+    ends = np.flatnonzero(arr == 10)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+
+    has_keyword = np.zeros(len(ends), dtype=bool)
+    for keyword in (b'bug', b'error'):
+        has_keyword[np.searchsorted(ends, _keyword_positions(lower, keyword))] = True
+    lines = np.flatnonzero(has_keyword)
+    if not len(lines):
+        return np.array([], dtype='M8[s]')
+    line_starts, line_ends = starts[lines], ends[lines]
+
+    # 快速路径：时间戳位于行首的固定位置（NNSmith日志的格式）
+    fast = line_ends - line_starts >= STAMP_LEN
+    index = line_starts[fast, None] + np.arange(STAMP_LEN)
+    window = arr[index]
+    digits = (window >= 48) & (window <= 57)
+    ok = np.all(np.where(_STAMP_DIGITS, digits, window == _STAMP_LITERALS), axis=1)
+    fast[fast] = ok
+
+    stamps = np.zeros((len(lines), STAMP_LEN - 1), dtype=np.uint8)
+    found = fast.copy()
+    stamps[fast] = window[ok, 1:]
+    # 其余的行（时间戳不在行首，或者像Traceback中的行一样没有时间戳）逐行查找
+    for i in np.flatnonzero(~fast).tolist():
+        start, end = line_starts[i], line_ends[i]
+        if buf.find(b'[', start, end) < 0:
+            continue
+        match = TIMESTAMP_PATTERN.search(buf, start, end)
+        if match:
+            stamps[i] = np.frombuffer(match.group(1), np.uint8)
+            found[i] = True
+    return _to_datetime64(stamps[found])
+
+
+def timeline_timestamps(log_file, chunk_size=LOG_CHUNK_SIZE, start=0, end=None):
+    """按日志顺序返回所有bug/error日志行的时间戳（datetime64[s]数组）
+
+    start/end为字节范围（start需要位于行首），默认读取整个文件
+    """
+    parts = [np.array([], dtype='M8[s]')]
+    carry = b''
+    with open(log_file, 'rb') as f:
+        f.seek(start)
+        remaining = end - start if end is not None else None
+        while True:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = f.read(size) if size > 0 else b''
+            if remaining is not None:
+                remaining -= len(chunk)
+            # 与文本模式的通用换行一致：单独的\r也是行结束符
+            if b'\r' in chunk:
+                chunk = chunk.replace(b'\r', b'\n')
+            buf = carry + chunk
+            if chunk:
+                # 只处理到最后一个完整的行，剩余部分留到下一块
+                cut = buf.rfind(b'\n') + 1
+                buf, carry = buf[:cut], buf[cut:]
+            elif buf:
+                buf += b'\n'
+            if buf:
+                parts.append(_chunk_timestamps(buf))
+            if not chunk:
+                break
+    return np.concatenate(parts)
+
+
+def first_timestamp(f, size):
+    """文件中第一个时间戳，返回(字节偏移, 时间戳字符串)；从开头逐块读取，通常只需要一块"""
+    buf = b''
+    while len(buf) < size:
+        f.seek(len(buf))
+        buf += f.read(EDGE_BLOCK_SIZE)
+        match = TIMESTAMP_PATTERN.search(buf)
+        if match:
+            return match.start(), match.group(1).decode()
+    return None
+
+
+def last_timestamp(f, size):
+    """文件中最后一个时间戳，返回(字节偏移, 时间戳字符串)；从结尾向前逐块读取"""
+    end = size
+    overlap = b''
+    while end > 0:
+        begin = max(0, end - EDGE_BLOCK_SIZE)
+        f.seek(begin)
+        # 与后一块重叠一个时间戳的长度，跨块的时间戳不会被漏掉
+        buf = f.read(end - begin) + overlap
+        last = None
+        for last in TIMESTAMP_PATTERN.finditer(buf):
+            pass
+        if last:
+            return begin + last.start(), last.group(1).decode()
+        overlap = buf[:STAMP_LEN]
+        end = begin
+    return None
+
+
+def log_runtime_hours(log_file):
+    """第一个和最后一个时间戳之间的小时数，时间戳少于两个时返回None
+
+    与对整个日志re.findall再取首尾的结果一致，但只读取开头和结尾的几个块
+    """
+    with open(log_file, 'rb') as f:
+        size = f.seek(0, 2)
+        first = first_timestamp(f, size)
+        last = last_timestamp(f, size)
+    if first is None or last is None or first[0] == last[0]:
+        return None
+    delta = datetime.strptime(last[1], TIME_FORMAT) - datetime.strptime(first[1], TIME_FORMAT)
+    return delta.total_seconds() / 3600.0
+
+
+def scan_log_totals(log_file, chunk_size=LOG_CHUNK_SIZE):
+    """分块查找"Total N testcases generated"等统计行，返回每个字段第一次出现的值（没有时为None）"""
+    totals = {field: None for field in TOTALS_FIELDS.values()}
+    carry = b''
+    with open(log_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            buf = carry + chunk
+            cut = buf.rfind(b'\n') + 1
+            buf, carry = buf[:cut], buf[cut:]
+            for match in TOTALS_PATTERN.finditer(buf):
+                field = TOTALS_FIELDS[match.group(2)]
+                if totals[field] is None:
+                    totals[field] = int(match.group(1))
+            if all(value is not None for value in totals.values()):
+                return totals
+    for match in TOTALS_PATTERN.finditer(carry):
+        field = TOTALS_FIELDS[match.group(2)]
+        if totals[field] is None:
+            totals[field] = int(match.group(1))
+    return totals
+
+
+def build_time_index(log_file, stride=INDEX_STRIDE):
+    """稀疏时间索引：每隔stride字节取之后第一个以时间戳开头的行，记录[行首偏移, 时间戳]
+
+    只seek到各个采样点读取一小块，不读取整个日志；要求日志中的时间戳按时间顺序出现
+    """
+    entries = []
+    with open(log_file, 'rb') as f:
+        size = f.seek(0, 2)
+        for offset in range(0, size, stride):
+            f.seek(offset)
+            block = f.read(EDGE_BLOCK_SIZE)
+            # 不在文件开头时，采样点可能位于行中间，从下一行开始
+            skip = 0 if offset == 0 else block.find(b'\n') + 1
+            if offset and skip == 0:
+                continue
+            match = LINE_TIMESTAMP_PATTERN.search(block, skip)
+            if match and (not entries or entries[-1][0] < offset + match.start()):
+                entries.append([offset + match.start(), match.group(1).decode()])
+    return {'size': size, 'stride': stride, 'entries': entries}
+
+
+def load_time_index(log_file, cache=None):
+    """读取（必要时构建）时间索引；cache为SQLite缓存文件路径时索引按文件身份缓存"""
+    conn = open_cache(cache) if cache else None
+    try:
+        return cached_parse(conn, 'nnsmith_time_index', log_file, TIME_INDEX_VERSION, build_time_index)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def window_byte_range(index, start, end):
+    """时间窗口[start, end)对应的字节范围(begin, stop)
+
+    begin为最后一个时间早于start的采样点，stop为第一个时间不早于end的采样点（没有时为文件末尾）
+    """
+    entries = index['entries']
+    times = [stamp for _, stamp in entries]
+    lo = bisect.bisect_left(times, start.strftime(TIME_FORMAT)) - 1
+    hi = bisect.bisect_left(times, end.strftime(TIME_FORMAT))
+    begin = entries[lo][0] if lo >= 0 else 0
+    stop = entries[hi][0] if hi < len(entries) else index['size']
+    return begin, stop
+
+
+def window_timestamps(log_file, start, end, index=None, cache=None):
+    """时间窗口[start, end)内bug/error日志行的时间戳，只读取窗口对应的字节范围"""
+    if index is None:
+        index = load_time_index(log_file, cache)
+    begin, stop = window_byte_range(index, start, end)
+    times = timeline_timestamps(log_file, start=begin, end=stop)
+    return times[(times >= np.datetime64(start, 's')) & (times < np.datetime64(end, 's'))]
+
+
+def hourly_counts(log_file, hours, index=None, cache=None):
+    """从日志开头起每小时的bug/error日志行数，每个小时只读取对应的字节范围"""
+    if index is None:
+        index = load_time_index(log_file, cache)
+    if not index['entries']:
+        return [0] * hours
+    origin = datetime.strptime(index['entries'][0][1], TIME_FORMAT)
+    return [len(window_timestamps(log_file, origin + timedelta(hours=h), origin + timedelta(hours=h + 1), index))
+            for h in range(hours)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parse NNSmith fuzz.log timelines')
+    parser.add_argument('log_file')
+    parser.add_argument('--from', dest='start', type=float, default=None, help='window start (hours since log start)')
+    parser.add_argument('--to', dest='end', type=float, default=None, help='window end (hours since log start)')
+    parser.add_argument('--cache', default=None, help='SQLite analysis cache for the time index')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    runtime = log_runtime_hours(args.log_file)
+    print(f"Runtime: {runtime if runtime is None else f'{runtime:.2f} h'} ({time.perf_counter() - start:.3f} s)")
+    if args.start is None:
+        times = timeline_timestamps(args.log_file)
+        span = (times[-1] - times[0]) / np.timedelta64(1, 'h') if len(times) else 0.0
+        print(f"{len(times)} bug/error lines over {span:.2f} h, parsed in {time.perf_counter() - start:.2f} s")
+    else:
+        index = load_time_index(args.log_file, args.cache)
+        with open(args.log_file, 'rb') as f:
+            origin = datetime.strptime(first_timestamp(f, index['size'])[1], TIME_FORMAT)
+        window = (origin + timedelta(hours=args.start), origin + timedelta(hours=args.end if args.end is not None else args.start + 1))
+        begin, stop = window_byte_range(index, *window)
+        times = window_timestamps(args.log_file, *window, index=index)
+        print(f"{len(times)} bug/error lines in [{window[0]}, {window[1]}), read {(stop - begin) / 1e6:.1f} MB "
+              f"of {index['size'] / 1e6:.1f} MB in {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+compute-sanitizer日志的错误模式表与预编译的多模式匹配器
+所有模式表合并为一个前缀树形式的交替正则，一次扫描即可得到日志中出现过的全部模式
+"""
+
+import re
+
+# 错误类型及其模式（按优先级排列，先匹配者生效：memory > config > OOM）
+ERROR_PATTERNS = {
+    'memory_errors': [
+        r'Invalid __global__ write',
+        r'Invalid __global__ read',
+        r'Invalid __shared__ write',
+        r'Invalid __shared__ read',
+        r'out of bounds',
+        r'misaligned'
+    ],
+    'config_errors': [
+        r'cudaErrorInvalidConfiguration',
+        r'invalid configuration argument'
+    ],
+    'oom_errors': [
+        r'cudaErrorMemoryAllocation',
+        r'out of memory'
+    ]
+}
+
+# 时间线只统计真实错误（排除OOM）
+TIMELINE_PATTERNS = [
+    r'Invalid __global__ write',
+    r'Invalid __global__ read',
+    r'Invalid __shared__ write',
+    r'Invalid __shared__ read',
+    r'cudaErrorInvalidConfiguration'
+]
+
+# 内存错误子类型
+MEMORY_SUBTYPE_PATTERNS = {
+    'invalid_global_write': r'Invalid __global__ write',
+    'invalid_global_read': r'Invalid __global__ read',
+    'invalid_shared_write': r'Invalid __shared__ write',
+    'invalid_shared_read': r'Invalid __shared__ read'
+}
+
+OPERATOR_PATTERN = re.compile(r'at::native::.*?::(\w+)')
+
+# 违规访问所在的kernel："at 0x1b0 in void at::native::(anonymous namespace)::col2im_kernel<float>(...)"中的col2im_kernel
+KERNEL_PATTERN = re.compile(r'at 0x[0-9a-fA-F]+ in (?:void )?(?:[\w:]*(?:\(anonymous namespace\))?::)*(\w+)')
+
+# 没有命中任何模式时，用于判断“其他错误”
+ERROR_WORD_PATTERN = re.compile(r'error', re.IGNORECASE)
+
+
+def all_patterns():
+    """按首次出现的顺序合并所有模式表（去重）"""
+    patterns = []
+    for table in ERROR_PATTERNS.values():
+        patterns.extend(table)
+    patterns.extend(TIMELINE_PATTERNS)
+    patterns.extend(MEMORY_SUBTYPE_PATTERNS.values())
+    return list(dict.fromkeys(patterns))
+
+
+def _overlap_free(literals):
+    """检查各模式的匹配之间不会首尾重叠（互相包含的情况由implied单独处理）
+
+    满足时，消耗字符的交替匹配与逐个模式re.search的结果完全一致；
+    否则需要退化为零宽前瞻，逐位置尝试所有模式
+    """
+    lowered = [p.lower() for p in literals]
+    for a in lowered:
+        for b in lowered:
+            if a == b or a in b or b in a:
+                continue
+            for k in range(1, min(len(a), len(b))):
+                if a[-k:] == b[:k]:
+                    return False
+    return True
+
+
+def _trie_regex(literals):
+    """把字面量构造成前缀树形式的交替正则，共享前缀只比较一次"""
+    trie = {}
+    for literal in literals:
+        node = trie
+        for ch in literal:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def emit(node):
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            body = f'(?:{body})?'
+        return body
+
+    return emit(trie)
+
+
+def build_matcher(patterns=None):
+    """把所有模式编译为一个匹配器
+
+    - trie: 小写字面量的前缀树正则，用于纯ASCII日志（先整体转小写，避免逐字符忽略大小写）
+    - groups_regex: 带命名分组的交替正则（IGNORECASE），用于非ASCII日志或模式不满足条件时
+    - implied: 匹配到的文本 -> 由此可知出现过的全部模式（包括被它包含的更短模式）
+    """
+    if patterns is None:
+        patterns = all_patterns()
+    literal = all(re.fullmatch(r'[\w ]+', p) for p in patterns)
+    exact = literal and _overlap_free(patterns)
+
+    groups = {f'p{i}': pattern for i, pattern in enumerate(patterns)}
+    alternation = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in groups.items())
+    if not exact:
+        alternation = f'(?=(?:{alternation}))'
+
+    implied = {}
+    for key in list(groups) + [p.lower() for p in patterns]:
+        text = groups.get(key, key).lower()
+        implied[key] = [p for p in patterns if p.lower() in text]
+
+    return {
+        'trie': re.compile(_trie_regex(sorted({p.lower() for p in patterns}))) if exact else None,
+        'groups_regex': re.compile(alternation, re.IGNORECASE),
+        'implied': implied
+    }
+
+
+MATCHER = build_matcher()
+
+
+def find_patterns(content, matcher=MATCHER):
+    """一次扫描日志内容，返回出现过的模式集合"""
+    implied = matcher['implied']
+    hits = set()
+    if matcher['trie'] is not None and content.isascii():
+        for text in set(matcher['trie'].findall(content.lower())):
+            hits.update(implied[text])
+    else:
+        for name in {m.lastgroup for m in matcher['groups_regex'].finditer(content)}:
+            hits.update(implied[name])
+    return hits
+
+
+def first_pattern_offset(content, matcher=MATCHER):
+    """第一个模式在内容中出现的位置，没有时返回None"""
+    if matcher['trie'] is not None and content.isascii():
+        match = matcher['trie'].search(content.lower())
+    else:
+        match = matcher['groups_regex'].search(content)
+    return match.start() if match else None
+
+
+def classify_error(hits):
+    """按优先级返回(error_type, pattern)，与原来逐个模式检查的先匹配者生效一致"""
+    for error_type, patterns in ERROR_PATTERNS.items():
+        for pattern in patterns:
+            if pattern in hits:
+                return error_type, pattern
+    return None, None
+
+
+def has_other_error(content):
+    """没有命中已知模式时，是否仍包含错误信息"""
+    return 'ERROR SUMMARY' in content or ERROR_WORD_PATTERN.search(content) is not None
+
+
+def memory_subtype(hits):
+    """返回第一个命中的内存错误子类型"""
+    for subtype, pattern in MEMORY_SUBTYPE_PATTERNS.items():
+        if pattern in hits:
+            return subtype
+    return None
+
+
+def is_timeline_error(hits):
+    """是否为计入时间线的真实错误（排除OOM）"""
+    return any(pattern in hits for pattern in TIMELINE_PATTERNS)
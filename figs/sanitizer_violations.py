@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+compute-sanitizer日志的逐条违规解析（流式）
+一个日志中可能有成千上万条重复的违规访问，每条都有自己的kernel、线程/block、地址和
+"is N bytes after the nearest allocation"距离。这里逐行读取日志，每条违规生成一个紧凑的记录
+（__slots__），内存占用与日志大小无关；可以按文件设置上限或蓄水池抽样，避免异常日志撑爆内存。
+越界距离保存为带符号的整数（after为正，before为负），可以按2的幂分桶，
+例如ConvTranspose2d那类int32溢出的bug集中在2^31附近
+
+用法：
+    python sanitizer_violations.py /path/to/log_dir [--limit 1000] [--reservoir] [--seed 0]
+    python sanitizer_violations.py log123.txt log456.txt
+"""
+
+import argparse
+import random
+import re
+from collections import Counter
+from pathlib import Path
+
+from gpufuzz_scan import log_sort_key
+from log_source import archive_order, list_logs, logical_name, open_log_text
+
+SANITIZER_PREFIX = re.compile(r'^=+ ?')
+# 一条违规的标题行："Invalid __global__ write of size 4 bytes"
+VIOLATION_LINE = re.compile(r'^Invalid __(\w+)__ (\w+) of size (\d+) bytes?')
+# 旧格式"at 0x1b0 in void ns::kernel<float>(...)"和新格式"at ns::kernel<float>(...)+0x1b0 in file.cu:12"
+KERNEL_LINE = re.compile(r'^at (?:0x[0-9a-fA-F]+ in )?(?:void )?(?:[\w:]*(?:\(anonymous namespace\))?::)*(\w+)')
+THREAD_LINE = re.compile(r'^by thread \((\d+),(\d+),(\d+)\) in block \((\d+),(\d+),(\d+)\)')
+ADDRESS_LINE = re.compile(r'^Address (0x[0-9a-fA-F]+) (?:is )?(.*?)\s*$')
+DISTANCE_LINE = re.compile(r'^and is (\d+) bytes (after|before) the nearest allocation'
+                           r'(?: at 0x[0-9a-fA-F]+)?(?: of size (\d+) bytes?)?')
+
+# int32/uint32溢出的边界：越界距离接近或超过2^31的违规通常是下标计算溢出
+INT32_OVERFLOW_DISTANCE = 1 << 31
+# "接近"的相对容差（与mat_shapes的DEFAULT_TOLERANCE相同）：2^31 - 4这类刚好低于边界的距离也计入
+INT32_OVERFLOW_TOLERANCE = 1 / 64
+
+
+class Violation:
+    """一条违规访问；没有出现在报告中的字段为None"""
+    __slots__ = ('space', 'access', 'size', 'kernel', 'thread', 'block', 'address', 'status',
+                 'distance', 'allocation_size', 'line')
+
+    def __init__(self, space, access, size, line):
+        self.space = space
+        self.access = access
+        self.size = size
+        self.line = line
+        self.kernel = None
+        self.thread = None
+        self.block = None
+        self.address = None
+        self.status = None
+        self.distance = None
+        self.allocation_size = None
+
+    @property
+    def subtype(self):
+        """与MEMORY_SUBTYPE_PATTERNS的键一致，例如invalid_global_write"""
+        return f"invalid_{self.space}_{self.access}"
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"Violation({self.subtype}, size={self.size}, kernel={self.kernel}, distance={self.distance})"
+
+
+def iter_violations(log_file, limit=None):
+    """逐条生成日志中的违规记录；limit不为None时生成limit条后停止读取"""
+    if limit is not None and limit <= 0:
+        return
+    current = None
+    count = 0
+    with open_log_text(log_file) as f:
+        for lineno, raw in enumerate(f, 1):
+            if not raw.startswith('='):
+                continue
+            line = SANITIZER_PREFIX.sub('', raw).strip()
+            header = VIOLATION_LINE.match(line)
+            if header:
+                if current is not None:
+                    yield current
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+                current = Violation(header.group(1), header.group(2), int(header.group(3)), lineno)
+                continue
+            if current is None:
+                continue
+            if not line:
+                # 空的=========行表示这条报告结束
+                yield current
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+                current = None
+                continue
+            if current.kernel is None:
+                kernel = KERNEL_LINE.match(line)
+                if kernel:
+                    current.kernel = kernel.group(1)
+                    continue
+            thread = THREAD_LINE.match(line)
+            if thread:
+                values = tuple(int(v) for v in thread.groups())
+                current.thread, current.block = values[:3], values[3:]
+                continue
+            address = ADDRESS_LINE.match(line)
+            if address:
+                current.address = int(address.group(1), 16)
+                current.status = address.group(2) or None
+                continue
+            distance = DISTANCE_LINE.match(line)
+            if distance:
+                current.distance = int(distance.group(1)) * (1 if distance.group(2) == 'after' else -1)
+                if distance.group(3):
+                    current.allocation_size = int(distance.group(3))
+    if current is not None:
+        yield current
+
+
+def sample_violations(log_file, k, seed=None):
+    """蓄水池抽样：从日志的全部违规中等概率保留至多k条，返回(样本, 违规总数)"""
+    rng = random.Random(seed)
+    sample = []
+    total = 0
+    for violation in iter_violations(log_file):
+        if total < k:
+            sample.append(violation)
+        else:
+            j = rng.randrange(total + 1)
+            if j < k:
+                sample[j] = violation
+        total += 1
+    return sample, total
+
+
+def distance_bucket(distance):
+    """越界距离按2的幂分桶：|distance|在[2^n, 2^(n+1))内时返回n，距离为0或未知时返回None"""
+    if not distance:
+        return None
+    return abs(distance).bit_length() - 1
+
+
+def is_int32_overflow(violation):
+    """越界距离接近（相对容差INT32_OVERFLOW_TOLERANCE）或超过2^31，通常是int32下标溢出"""
+    if violation.distance is None:
+        return False
+    return abs(violation.distance) >= INT32_OVERFLOW_DISTANCE * (1 - INT32_OVERFLOW_TOLERANCE)
+
+
+def collect_violations(log_files, limit=None, reservoir=False, seed=None):
+    """解析多个日志，返回(违规记录列表, 各文件的违规总数)
+
+    limit为每个文件最多保留的条数；reservoir为True时对超过limit的文件做蓄水池抽样
+    （总数仍然准确），否则只读取前limit条（总数为下限）
+    """
+    violations = []
+    totals = {}
+    for log_file in log_files:
+        if reservoir and limit is not None:
+            sample, total = sample_violations(log_file, limit, seed)
+        else:
+            sample = list(iter_violations(log_file, limit))
+            total = len(sample)
+        violations.extend(sample)
+        totals[Path(log_file).name] = total
+    return violations, totals
+
+
+def memory_error_logs(log_dir, records=None):
+    """需要逐条解析的日志：有扫描记录时只取内存错误日志，否则取目录下的全部日志
+
+    log_dir也可以是压缩文件的目录或归档，返回的逻辑路径由open_log_text读取；压缩的归档按成员顺序返回
+    """
+    log_path = Path(log_dir)
+    if records is not None:
+        names = [r['name'] for r in records if not r.get('read_error') and r.get('error_type') == 'memory_errors']
+        return archive_order([log_path / name for name in sorted(names, key=log_sort_key)])
+    logs = [log_path / logical_name(p.name) for p in list_logs(log_path) if logical_name(p.name) != 'trace.txt']
+    return archive_order(sorted(logs, key=lambda p: log_sort_key(p.name)))
+
+
+def summarize_violations(violations):
+    """违规记录的统计：子类型、kernel、越界距离分桶（log2）和int32溢出的条数"""
+    buckets = Counter(distance_bucket(v.distance) for v in violations)
+    buckets.pop(None, None)
+    return {
+        'violations': len(violations),
+        'subtypes': dict(Counter(v.subtype for v in violations).most_common()),
+        'kernels': dict(Counter(v.kernel for v in violations if v.kernel).most_common()),
+        'distance_buckets': dict(sorted(buckets.items())),
+        'int32_overflow': sum(1 for v in violations if is_int32_overflow(v))
+    }
+
+
+def print_violation_summary(summary, totals=None):
+    print(f"Violations: {summary['violations']}")
+    if totals:
+        print(f"Logs with violations: {sum(1 for t in totals.values() if t)}, "
+              f"max per log: {max(totals.values())}")
+    print(f"Subtypes: {summary['subtypes']}")
+    print(f"Kernels: {summary['kernels']}")
+    print("OOB distance (bytes):")
+    for bucket, count in summary['distance_buckets'].items():
+        print(f"  [2^{bucket}, 2^{bucket + 1}): {count}")
+    print(f"Near/above 2^31 (within {INT32_OVERFLOW_TOLERANCE:.1%} below, int32 overflow): {summary['int32_overflow']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stream per-violation records from compute-sanitizer logs')
+    parser.add_argument('paths', nargs='+', help='log directory or log files')
+    parser.add_argument('--limit', type=int, default=None, help='max violations kept per log')
+    parser.add_argument('--reservoir', action='store_true', help='reservoir-sample instead of keeping the first --limit')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    log_files = []
+    for path in args.paths:
+        log_files.extend(memory_error_logs(path) if Path(path).is_dir() else [Path(path)])
+    violations, totals = collect_violations(log_files, args.limit, args.reservoir, args.seed)
+    print_violation_summary(summarize_violations(violations), totals)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+合成的fuzzing活动语料
+按给定的测试用例数生成与真实活动格式一致的数据，用于在没有原始数据时对分析脚本做基准测试和回归测试：
+- gpufuzz/：log{errid}.txt（compute-sanitizer输出：干净的日志、多条违规的内存错误、配置错误、OOM、
+  Python异常；--clean-log-bytes指定时干净的日志中夹杂平均这么多字节的模型输出），以及trace.txt（每个测试用例一行[[...]]形状记录，夹杂模型输出等填充行，可以达到数GB）
+- nnsmith/fuzz.log：带时间戳的fuzz日志和最后的Total统计行
+- nnsmith/bugs/bug-*：每个bug一个目录（err.log和report.json）
+- corpus.json：生成参数和生成时已知的真实数量
+
+用法：
+    python synth_corpus.py /tmp/corpus --testcases 100000 [--seed 0] [--trace-bytes 2048] [--clean-log-bytes 65536]
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# GPU-Fuzz日志的错误类别及其比例
+GPUFUZZ_MIX = {
+    'clean': 0.62,
+    'memory': 0.12,
+    'config': 0.08,
+    'oom': 0.06,
+    'other': 0.12
+}
+# 每个日志（一次model_gen.py执行）的测试用例数范围
+TESTCASES_PER_LOG = (1, 8)
+# trace.txt中每个测试用例平均的字节数（形状记录加填充行），100万个测试用例约2GB
+TRACE_BYTES_PER_TESTCASE = 2048
+# NNSmith：每个测试用例产生bug、生成失败的概率
+NNSMITH_BUG_RATE = 0.016
+NNSMITH_FAIL_RATE = 0.001
+CAMPAIGN_HOURS = 24.0
+
+KERNELS = [
+    'void at::native::(anonymous namespace)::col2im_kernel<float>(int, const float *, int, int, int, float *)',
+    'void at::native::(anonymous namespace)::im2col_kernel<float>(long, const float *, long, long, float *)',
+    'void at::native::(anonymous namespace)::adaptive_max_pool2d_kernel<float>(const float *, float *, long *)',
+    'void at::native::vectorized_elementwise_kernel<4, at::native::FillFunctor<float>>(int, at::native::FillFunctor<float>)',
+    'void at::native::(anonymous namespace)::upsample_bilinear2d_out_frame<float, float>(int, float, float, bool)',
+    'void at::native::reduce_kernel<512, 1, at::native::ReduceOp<float, at::native::MaxOps<float>>>(ReduceOp)'
+]
+HOST_FRAMES = [
+    'at::native::conv_transpose2d', 'at::native::im2col_out_cuda', 'at::native::adaptive_max_pool2d_cuda',
+    'at::native::fill_', 'at::native::upsample_bilinear2d_out_cuda', 'at::native::max_out'
+]
+OPERATORS = ['Conv2d', 'ConvTranspose2d', 'AdaptiveMaxPool2d', 'Upsample', 'MaxPool2d', 'Linear', 'BatchNorm2d']
+DIMENSIONS = [1, 1, 2, 3, 3, 4, 7, 16, 32, 64, 128, 224, 512, 1024, 46341, 65536, 2147483647]
+# 越界距离：大多很小，少数在2^31附近（int32溢出）
+DISTANCES = [4, 8, 16, 512, 4096, 179912, 2**31 - 4, 2**31 + 12, 2**32 + 4096, 8562580432]
+SANITIZER = '========= '
+
+
+def _violation(rng):
+    space = rng.choice(['global', 'global', 'global', 'shared'])
+    access = rng.choice(['read', 'write'])
+    kernel = rng.randrange(len(KERNELS))
+    lines = [
+        f"Invalid __{space}__ {access} of size {rng.choice([1, 2, 4, 8, 16])} bytes",
+        f"    at 0x{rng.randrange(0x100, 0x4000):x} in {KERNELS[kernel]}",
+        f"    by thread ({rng.randrange(1024)},0,0) in block ({rng.randrange(65535)},0,0)",
+        f"    Address 0x{rng.randrange(1 << 44):x} is out of bounds",
+        f"    and is {rng.choice(DISTANCES)} bytes {rng.choice(['after', 'before'])} the nearest allocation "
+        f"at 0x{rng.randrange(1 << 44):x} of size {rng.choice([1024, 65536, 1 << 20, 1 << 30])} bytes",
+        "    Saved host backtrace up to driver entry point at kernel launch time",
+        f"    Host Frame: [0x{rng.randrange(1 << 24):x}] in /usr/lib/x86_64-linux-gnu/libcuda.so.1",
+        f"    Host Frame: {HOST_FRAMES[kernel]} [0x{rng.randrange(1 << 24):x}] in /opt/torch/lib/libtorch_cuda.so",
+        ""
+    ]
+    return ''.join(SANITIZER + line + '\n' for line in lines)
+
+
+def gpufuzz_log(kind, rng):
+    """一个日志文件的内容"""
+    body = [SANITIZER + 'COMPUTE-SANITIZER\n', 'model_gen: building model with %d layers\n' % rng.randrange(2, 12)]
+    errors = 0
+    if kind == 'memory':
+        # 违规数为几何分布，偶尔有成千上万条重复违规的异常日志
+        n = 1
+        while rng.random() < 0.6 and n < 64:
+            n += 1
+        if rng.random() < 0.002:
+            n = rng.randrange(1000, 5000)
+        body.extend(_violation(rng) for _ in range(n))
+        errors = n
+    elif kind == 'config':
+        body.append(SANITIZER + 'Program hit cudaErrorInvalidConfiguration (error 9) due to "invalid configuration '
+                    'argument" on CUDA API call to cudaLaunchKernel.\n')
+        errors = 1
+    elif kind == 'oom':
+        body.append(SANITIZER + 'Program hit cudaErrorMemoryAllocation (error 2) due to "out of memory" on CUDA API '
+                    'call to cudaMalloc.\n')
+        errors = 1
+    elif kind == 'other':
+        body.append('Traceback (most recent call last):\n  File "model_gen.py", line 212, in <module>\n'
+                    f'RuntimeError: {rng.choice(["CUDA error: unspecified launch failure", "shape mismatch"])}\n')
+    body.append(f"{SANITIZER}ERROR SUMMARY: {errors} error{'s' if errors != 1 else ''}\n")
+    return ''.join(body)
+
+
+def _record_pool(rng, size=4096):
+    """trace.txt中的形状记录行（[[...]] 算子名）"""
+    pool = []
+    for _ in range(size):
+        shapes = ', '.join('[' + ', '.join(str(rng.choice(DIMENSIONS)) for _ in range(rng.randrange(0, 5))) + ']'
+                           for _ in range(rng.randrange(1, 4)))
+        pool.append(f"[[{shapes[1:-1]}]] {rng.choice(OPERATORS)}\n" if rng.random() < 0.9 else f"[[{shapes[1:-1]}]]\n")
+    return pool
+
+
+def _padding_pool(rng, size=256):
+    """填充行：模型结构、日志输出等不是记录的行"""
+    pool = []
+    for _ in range(size):
+        layer = rng.choice(OPERATORS)
+        pool.append(f"  ({rng.randrange(64)}): {layer}(in={rng.choice(DIMENSIONS)}, out={rng.choice(DIMENSIONS)}, "
+                    f"kernel_size=({rng.randrange(1, 8)}, {rng.randrange(1, 8)}), stride={rng.randrange(1, 3)})\n")
+    return pool
+
+
+def generate_gpufuzz(out_dir, testcases, rng, trace_bytes=TRACE_BYTES_PER_TESTCASE, start=None, clean_log_bytes=0):
+    """生成GPU-Fuzz的日志目录，返回真实数量"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    kinds, weights = list(GPUFUZZ_MIX), list(GPUFUZZ_MIX.values())
+    records, padding = _record_pool(rng), _padding_pool(rng)
+    padding_size = sum(map(len, padding)) / len(padding)
+    record_size = sum(map(len, records)) / len(records)
+    # 每个测试用例平均需要的填充行数
+    pad_per_case = max(0.0, (trace_bytes - record_size) / padding_size)
+    start = start or datetime(2025, 11, 1, 0, 0, 0)
+    # 干净日志的模型输出用单独的随机数生成器，不指定时语料与原来完全相同
+    output_rng = random.Random(rng.random()) if clean_log_bytes else None
+    counts = {kind: 0 for kind in kinds}
+    written = 0
+    errid = 0
+    logs = []
+    with open(out_dir / 'trace.txt', 'w', buffering=1 << 20) as trace:
+        while written < testcases:
+            n = min(rng.randint(*TESTCASES_PER_LOG), testcases - written)
+            kind = rng.choices(kinds, weights)[0]
+            counts[kind] += 1
+            lines = [f"errid {errid}\n"]
+            for _ in range(n):
+                k = int(pad_per_case) + (rng.random() < pad_per_case % 1)
+                lines.extend(rng.choices(padding, k=k))
+                lines.append(rng.choice(records))
+            if rng.random() < 0.01:
+                # 被截断的不完整记录
+                lines.append('[[1, 3, 224\n')
+            trace.write(''.join(lines))
+            log_file = out_dir / f"log{errid}.txt"
+            content = gpufuzz_log(kind, rng)
+            if kind == 'clean' and clean_log_bytes:
+                k = output_rng.randint(0, int(2 * clean_log_bytes / padding_size))
+                body, summary = content.rsplit(SANITIZER + 'ERROR SUMMARY', 1)
+                content = body + ''.join(output_rng.choices(padding, k=k)) + SANITIZER + 'ERROR SUMMARY' + summary
+            log_file.write_text(content)
+            logs.append(log_file)
+            written += n
+            errid += 1
+    # 日志的修改时间均匀分布在活动期间
+    t0 = start.timestamp()
+    step = CAMPAIGN_HOURS * 3600 / max(1, len(logs))
+    for i, log_file in enumerate(logs):
+        os.utime(log_file, (t0 + i * step, t0 + i * step))
+    return {'testcases': written, 'logs': len(logs), **{f"{kind}_logs": count for kind, count in counts.items()}}
+
+
+def _bug_report(rng, index):
+    if rng.random() < 0.9:
+        n = rng.randint(10, 10000)
+        m = rng.randint(1, n)
+        name = f"bug-Symptom.INCONSISTENCY-Stage.VERIFICATION-{index}"
+        err = (f"{rng.choice(['pt2 (cuda opt: True)', 'torchjit (cuda opt: True)'])} != torch[cpu] eager at output 0\n\n"
+               f"Not equal to tolerance rtol=0.01, atol=0.001\n\nMismatched elements: {m} / {n} ({100 * m / n:.1f}%)\n"
+               f"Max absolute difference: {rng.choice([7, 0.5, 1e3, 3.25])}\n"
+               f"Max relative difference: {rng.choice([1.0, 0.25, 12.5])}\n")
+        meta = {'symptom': 'Symptom.INCONSISTENCY', 'stage': 'Stage.VERIFICATION'}
+    else:
+        name = f"bug-Symptom.EXCEPTION-Stage.COMPILATION-{index}"
+        err = ("Traceback (most recent call last):\n  File \"nnsmith/backends/pt2.py\", line 88, in make_backend\n"
+               "torch._dynamo.exc.BackendCompilerFailed: backend='inductor' raised:\n"
+               f"{rng.choice(['KeyError', 'NotImplementedError', 'AssertionError'])}: 'complex64'\n")
+        meta = {'symptom': 'Symptom.EXCEPTION', 'stage': 'Stage.COMPILATION'}
+    meta.update({'system': 'pt2', 'version': '2.1.0', 'version_id': 'abcdef0'})
+    return name, err, meta
+
+
+def generate_nnsmith(out_dir, testcases, rng, start=None):
+    """生成NNSmith的fuzz.log和bug目录，返回真实数量"""
+    bug_dir = out_dir / 'bugs'
+    bug_dir.mkdir(parents=True, exist_ok=True)
+    start = start or datetime(2025, 11, 6, 21, 40, 49)
+    step = CAMPAIGN_HOURS * 3600 / max(1, testcases)
+    bugs = failed = 0
+    with open(out_dir / 'fuzz.log', 'w', buffering=1 << 20) as log:
+        lines = []
+        for i in range(testcases):
+            stamp = (start + timedelta(seconds=i * step)).strftime('%Y-%m-%d %H:%M:%S')
+            ms = rng.randrange(1000)
+            lines.append(f"[{stamp},{ms:03d}][fuzz][INFO] - generating model\n")
+            r = rng.random()
+            if r < NNSMITH_BUG_RATE:
+                name, err, meta = _bug_report(rng, bugs)
+                path = bug_dir / name
+                path.mkdir(exist_ok=True)
+                (path / 'err.log').write_text(err)
+                (path / 'report.json').write_text(json.dumps(meta))
+                lines.append(f"[{stamp},{ms:03d}][fuzz][WARNING] - Saved a bug report to {name}\n")
+                bugs += 1
+            elif r < NNSMITH_BUG_RATE + NNSMITH_FAIL_RATE:
+                lines.append(f"[{stamp},{ms:03d}][fuzz][ERROR] - error in compile: failed to make testcase\n")
+                failed += 1
+            if len(lines) >= 65536:
+                log.write(''.join(lines))
+                lines = []
+        end = (start + timedelta(seconds=testcases * step)).strftime('%Y-%m-%d %H:%M:%S')
+        lines.append(f"[{end},000][fuzz][INFO] - Total {testcases} testcases generated.\n"
+                     f"Total {bugs} bugs found.\nTotal {failed} failed to make testcases.\n")
+        log.write(''.join(lines))
+    return {'testcases': testcases, 'bugs': bugs, 'failed': failed}
+
+
+def generate_corpus(out_dir, testcases, seed=0, trace_bytes=TRACE_BYTES_PER_TESTCASE, clean_log_bytes=0):
+    """生成完整的语料，返回corpus.json的内容；相同参数的语料已存在时直接返回"""
+    out_dir = Path(out_dir)
+    manifest_file = out_dir / 'corpus.json'
+    params = {'testcases': testcases, 'seed': seed, 'trace_bytes': trace_bytes}
+    if clean_log_bytes:
+        params['clean_log_bytes'] = clean_log_bytes
+    if manifest_file.exists():
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+        if manifest.get('params') == params:
+            return manifest
+        print(f"Warning: {out_dir} holds a corpus with different parameters, regenerating")
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    manifest = {
+        'params': params,
+        'gpufuzz': generate_gpufuzz(out_dir / 'gpufuzz', testcases, rng, trace_bytes, clean_log_bytes=clean_log_bytes),
+        'nnsmith': generate_nnsmith(out_dir / 'nnsmith', testcases, rng),
+        'generated_in': round(time.perf_counter() - start, 2)
+    }
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def corpus_paths(out_dir):
+    """语料中各分析入口使用的路径"""
+    out_dir = Path(out_dir)
+    return {'gpufuzz': out_dir / 'gpufuzz', 'bugs': out_dir / 'nnsmith' / 'bugs',
+            'fuzz_log': out_dir / 'nnsmith' / 'fuzz.log'}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic GPU-Fuzz/NNSmith campaign corpus')
+    parser.add_argument('out_dir')
+    parser.add_argument('--testcases', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace-bytes', type=int, default=TRACE_BYTES_PER_TESTCASE,
+                        help='average trace.txt bytes per testcase')
+    parser.add_argument('--clean-log-bytes', type=int, default=0,
+                        help='average model output bytes in clean sanitizer logs')
+    args = parser.parse_args()
+
+    manifest = generate_corpus(args.out_dir, args.testcases, args.seed, args.trace_bytes, args.clean_log_bytes)
+    print(json.dumps(manifest, indent=2))
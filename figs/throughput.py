@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+GPU-Fuzz的测试用例吞吐量与停滞分析
+trace.txt中没有时间戳，时间来自日志：model_gen.py按errid顺序执行，log{errid}.txt的修改时间是该次执行结束的时间，
+上一个日志的修改时间是它开始的时间。trace.txt按块流式扫描一遍（内存与文件大小无关），
+用分隔行（默认"errid N"，--marker可以指定）把[[...]]记录归到各次执行，得到：
+- 每个日志的测试用例产出（记录数、耗时、每分钟测试用例数）
+- 按分钟（--bin）的测试用例数序列：每次执行的记录在其开始和结束时间之间均匀分布
+- 相邻记录的时间间隔分布（同上的均匀假设；产出为0的执行的时间计入下一个间隔）
+- 自动标记的停滞区间：相邻记录的间隔超过--stall秒，或连续--min-minutes个分箱的速率低于中位数的--fraction
+trace.txt中没有分隔行时只能按执行耗时平均分配记录，产出标记为估计值，停滞只来自日志之间的间隔
+
+用法：
+    python throughput.py /path/to/log_dir [--csv throughput.csv] [--yield-csv log_yield.csv] [--plot throughput.pdf]
+"""
+
+import argparse
+import csv
+import re
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from gpufuzz_scan import is_timeline_log, log_sort_key
+from log_source import archive_index, find_log, is_archive, list_logs, logical_name, open_log
+from trace_scan import TRACE_CHUNK_SIZE, UNCLOSED_LINE
+
+# trace.txt中每次执行开头的分隔行，第一个分组为errid
+DEFAULT_MARKER = rb'errid (\d+)'
+DEFAULT_BIN_MINUTES = 1.0
+# 与follow_campaign.py一致：超过10分钟没有新的测试用例视为停滞
+DEFAULT_STALL_SECONDS = 600.0
+# 速率低于中位数的该比例、并持续DEFAULT_MIN_BINS个分箱时也视为停滞
+DEFAULT_STALL_FRACTION = 0.1
+DEFAULT_MIN_BINS = 5
+
+
+def log_times(log_dir):
+    """log{errid}.txt按errid排序，返回(errid数组, 修改时间数组)；只stat（归档只读成员头），不读取内容"""
+    entries = []
+    if is_archive(log_dir):
+        for name, member in archive_index(log_dir)['members'].items():
+            if is_timeline_log(name):
+                entries.append((log_sort_key(name), member['mtime']))
+    else:
+        for path in list_logs(log_dir):
+            name = logical_name(path.name)
+            if is_timeline_log(name):
+                entries.append((log_sort_key(name), path.stat().st_mtime))
+    entries.sort()
+    errids = np.array([key[0] for key, _ in entries], dtype=np.int64)
+    mtimes = np.array([mtime for _, mtime in entries], dtype=np.float64)
+    return errids, mtimes
+
+
+def count_records_by_marker(trace_file, marker=DEFAULT_MARKER, chunk_size=TRACE_CHUNK_SIZE):
+    """流式扫描trace.txt，返回(errid -> 记录数, 第一个分隔行之前的记录数)
+
+    分隔行把文件切成段，每段的记录用与trace_scan相同的方法计数（以[[开头且同一行内有]]的行）
+    """
+    marker_line = re.compile(rb'\n' + marker)
+    counts = {}
+    current = None
+    before_first = 0
+    carry = b''
+    with open_log(trace_file) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if b'\r' in chunk:
+                chunk = chunk.replace(b'\r', b'\n')
+            # 前面补一个换行：每一行（包括第一行）都以\n开头，只处理完整的行
+            buf = b'\n' + carry + chunk
+            if chunk:
+                cut = buf.rfind(b'\n')
+                buf, carry = buf[:cut + 1], buf[cut + 1:]
+            elif len(buf) > 1:
+                buf += b'\n'
+            else:
+                break
+            start = 0
+            for match in marker_line.finditer(buf):
+                n = buf.count(b'\n[[', start, match.start() + 1) - len(UNCLOSED_LINE.findall(buf, start, match.start() + 1))
+                if current is None:
+                    before_first += n
+                else:
+                    counts[current] += n
+                current = int(match.group(1))
+                counts.setdefault(current, 0)
+                start = match.start() + 1
+            n = buf.count(b'\n[[', start) - len(UNCLOSED_LINE.findall(buf, start))
+            if current is None:
+                before_first += n
+            else:
+                counts[current] += n
+            if not chunk:
+                break
+    return counts, before_first
+
+
+def _gaps(starts, ends, records):
+    """相邻记录的时间间隔：每次执行的记录在[start, end]内均匀分布，最后一条记录在end；返回(间隔, 次数, 结束时间)"""
+    gaps, weights, times = [], [], []
+    carry = 0.0
+    for start, end, n in zip(starts.tolist(), ends.tolist(), records.tolist()):
+        duration = max(end - start, 0.0)
+        if n <= 0:
+            carry += duration
+            continue
+        spacing = duration / n
+        gaps.append(carry + spacing)
+        weights.append(1)
+        times.append(start + spacing)
+        if n > 1:
+            gaps.append(spacing)
+            weights.append(n - 1)
+            times.append(end)
+        carry = 0.0
+    return np.array(gaps), np.array(weights, dtype=np.int64), np.array(times)
+
+
+def _weighted_percentiles(values, weights, percentiles):
+    if not len(values):
+        return [float('nan')] * len(percentiles)
+    order = np.argsort(values)
+    values, cum = values[order], np.cumsum(weights[order])
+    return [float(values[np.searchsorted(cum, p / 100 * cum[-1], side='left').clip(0, len(values) - 1)])
+            for p in percentiles]
+
+
+def _merge_intervals(intervals):
+    merged = []
+    for start, end, reason in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            last = merged[-1]
+            merged[-1] = (last[0], max(last[1], end), last[2] if reason in last[2] else f"{last[2]}+{reason}")
+        else:
+            merged.append((start, end, reason))
+    return merged
+
+
+def find_stalls(gaps, gap_times, edges, counts, stall_seconds=DEFAULT_STALL_SECONDS,
+                fraction=DEFAULT_STALL_FRACTION, min_bins=DEFAULT_MIN_BINS):
+    """停滞区间[(开始, 结束, 原因)]：单个间隔超过stall_seconds（gap），或连续min_bins个分箱的速率低于中位数的fraction（rate）"""
+    intervals = [(t - g, t, 'gap') for g, t in zip(gaps.tolist(), gap_times.tolist()) if g > stall_seconds]
+    if len(counts):
+        threshold = fraction * np.median(counts)
+        low = np.concatenate([[False], counts < threshold, [False]])
+        changes = np.flatnonzero(low[1:] != low[:-1])
+        for first, last in zip(changes[::2], changes[1::2]):
+            if last - first >= min_bins:
+                intervals.append((float(edges[first]), float(edges[last]), 'rate'))
+    return _merge_intervals(intervals)
+
+
+def analyze_throughput(log_dir, marker=DEFAULT_MARKER, bin_minutes=DEFAULT_BIN_MINUTES,
+                       stall_seconds=DEFAULT_STALL_SECONDS, fraction=DEFAULT_STALL_FRACTION,
+                       min_bins=DEFAULT_MIN_BINS):
+    """吞吐量分析，目录或日志不存在时返回None"""
+    log_path = Path(log_dir)
+    if not log_path.exists():
+        return None
+    errids, ends = log_times(log_path)
+    if not len(errids):
+        return None
+    # 修改时间应随errid递增；被touch等打乱时取前缀最大值，保证每次执行的耗时非负
+    ends = np.maximum.accumulate(ends)
+    durations = np.diff(ends)
+    first = np.median(durations) if len(durations) else 0.0
+    starts = np.concatenate([[ends[0] - first], ends[:-1]])
+
+    trace_file = find_log(log_path, 'trace.txt')
+    estimated = True
+    unattributed = 0
+    records = np.zeros(len(errids), dtype=np.int64)
+    if trace_file is not None:
+        counts, unattributed = count_records_by_marker(trace_file, marker)
+        if counts:
+            estimated = False
+            index = {errid: i for i, errid in enumerate(errids.tolist())}
+            for errid, n in counts.items():
+                if errid in index:
+                    records[index[errid]] = n
+                else:
+                    unattributed += n
+        else:
+            # 没有分隔行：按执行耗时平均分配
+            total = unattributed
+            unattributed = 0
+            weights = np.maximum(ends - starts, 0.0)
+            share = weights / weights.sum() if weights.sum() > 0 else np.full(len(weights), 1 / len(weights))
+            records = np.floor(share * total).astype(np.int64)
+            records[-1] += total - records.sum()
+
+    # 累计记录数曲线经过(执行结束时间, 累计记录数)，分箱计数为曲线在分箱边界上的差
+    width = bin_minutes * 60
+    curve_t = np.concatenate([[starts[0]], ends])
+    curve_n = np.concatenate([[0], np.cumsum(records)])
+    edges = starts[0] + np.arange(int(np.ceil((ends[-1] - starts[0]) / width)) + 1) * width
+    if len(edges) < 2:
+        edges = np.array([starts[0], starts[0] + width])
+    series = np.diff(np.interp(edges, curve_t, curve_n))
+    finished = np.histogram(ends, bins=edges)[0]
+
+    gaps, weights, gap_times = _gaps(starts, ends, records)
+    stalls = find_stalls(gaps, gap_times, edges, series, stall_seconds, fraction, min_bins)
+    durations = ends - starts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_minute = np.where(durations > 0, records / (durations / 60), np.nan)
+    return {
+        'log_dir': str(log_path),
+        'estimated': estimated,
+        'total_records': int(records.sum()),
+        'unattributed_records': int(unattributed),
+        'logs': {'errid': errids, 'start': starts, 'end': ends, 'records': records, 'per_minute': per_minute},
+        'series': {'edges': edges, 'testcases': series, 'logs_finished': finished, 'bin_minutes': bin_minutes},
+        'gaps': {
+            'values': gaps,
+            'weights': weights,
+            'percentiles': dict(zip(['p50', 'p90', 'p99', 'max'],
+                                    _weighted_percentiles(gaps, weights, [50, 90, 99, 100])))
+        },
+        'stalls': stalls
+    }
+
+
+def gap_histogram(result):
+    """间隔的log2分箱（秒）：[(下界指数, 次数)]"""
+    values, weights = result['gaps']['values'], result['gaps']['weights']
+    if not len(values):
+        return []
+    buckets = np.floor(np.log2(np.maximum(values, 1e-3))).astype(np.int64)
+    keys, inverse = np.unique(buckets, return_inverse=True)
+    return list(zip(keys.tolist(), np.bincount(inverse, weights=weights).astype(np.int64).tolist()))
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds')
+
+
+def write_series_csv(path, result):
+    """每个分箱一行：开始时间、距开始的分钟数、测试用例数、每分钟速率、结束的执行数、是否处于停滞区间"""
+    series = result['series']
+    edges = series['edges']
+    stalls = result['stalls']
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['start', 'minute', 'testcases', 'per_minute', 'logs_finished', 'stalled'])
+        for i, (count, finished) in enumerate(zip(series['testcases'].tolist(), series['logs_finished'].tolist())):
+            lo, hi = edges[i], edges[i + 1]
+            stalled = any(start < hi and end > lo for start, end, _ in stalls)
+            writer.writerow([_iso(lo), f"{(lo - edges[0]) / 60:.2f}", f"{count:.2f}",
+                             f"{count / series['bin_minutes']:.2f}", finished, int(stalled)])
+
+
+def write_yield_csv(path, result):
+    """每个日志一行：errid、开始和结束时间、耗时、测试用例数、每分钟测试用例数"""
+    logs = result['logs']
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['errid', 'start', 'end', 'seconds', 'testcases', 'per_minute'])
+        for errid, start, end, n, rate in zip(logs['errid'].tolist(), logs['start'].tolist(), logs['end'].tolist(),
+                                              logs['records'].tolist(), logs['per_minute'].tolist()):
+            writer.writerow([errid, _iso(start), _iso(end), f"{end - start:.3f}", n, f"{rate:.3f}"])
+
+
+def print_throughput_summary(result):
+    logs = result['logs']
+    series = result['series']
+    print("\n--- GPU-Fuzz Throughput ---")
+    hours = (logs['end'][-1] - logs['start'][0]) / 3600
+    print(f"Test Cases: {result['total_records']} in {len(logs['errid'])} logs over {hours:.2f} h"
+          f"{' (per-log yield estimated: no markers in trace.txt)' if result['estimated'] else ''}")
+    if result['unattributed_records']:
+        print(f"Unattributed Records: {result['unattributed_records']}")
+    yields = logs['records']
+    print(f"Per-Log Yield: mean {yields.mean():.2f}, median {np.median(yields):.0f}, max {yields.max()}, "
+          f"zero-yield logs {int(np.count_nonzero(yields == 0))}")
+    rate = series['testcases'] / series['bin_minutes']
+    print(f"Test Cases per Minute: median {np.median(rate):.1f}, p10 {np.percentile(rate, 10):.1f}, "
+          f"max {rate.max():.1f}")
+    p = result['gaps']['percentiles']
+    print(f"Record Gaps (s): p50 {p['p50']:.2f}, p90 {p['p90']:.2f}, p99 {p['p99']:.2f}, max {p['max']:.2f}")
+    print(f"Stalls: {len(result['stalls'])}")
+    for start, end, reason in result['stalls']:
+        print(f"  {_iso(start)} - {_iso(end)} ({(end - start) / 60:.1f} min, {reason})")
+
+
+def plot_throughput(result, path='throughput.pdf'):
+    """每分钟测试用例数随时间的变化，停滞区间加阴影"""
+    import matplotlib.pyplot as plt
+    series = result['series']
+    edges = series['edges']
+    hours = (edges[:-1] - edges[0]) / 3600
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.plot(hours, series['testcases'] / series['bin_minutes'], linewidth=1, color='#404040')
+    for i, (start, end, _) in enumerate(result['stalls']):
+        ax.axvspan((start - edges[0]) / 3600, (end - edges[0]) / 3600, color='#d62728', alpha=0.2,
+                   label='Stall' if i == 0 else None)
+    ax.set_xlabel('Time (hours)', fontsize=12)
+    ax.set_ylabel('Test Cases per Minute', fontsize=12)
+    ax.set_title('GPU-Fuzz Generation Throughput', fontsize=14, fontweight='bold', pad=10)
+    if result['stalls']:
+        ax.legend(fontsize=11)
+    ax.grid(True, alpha=0.3, linestyle='--')
+    ax.set_xlim(left=0)
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    print(f"Saved: {path}")
+    plt.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='GPU-Fuzz test-case throughput and stall analysis')
+    parser.add_argument('log_dir')
+    parser.add_argument('--marker', default=DEFAULT_MARKER.decode(),
+                        help='regex of the trace.txt line that starts a run; group 1 is the errid')
+    parser.add_argument('--bin', type=float, default=DEFAULT_BIN_MINUTES, help='minutes per series bin')
+    parser.add_argument('--stall', type=float, default=DEFAULT_STALL_SECONDS,
+                        help='seconds between records that count as a stall')
+    parser.add_argument('--fraction', type=float, default=DEFAULT_STALL_FRACTION,
+                        help='rate below this fraction of the median counts as a stall')
+    parser.add_argument('--min-bins', type=int, default=DEFAULT_MIN_BINS,
+                        help='consecutive low-rate bins that form a stall')
+    parser.add_argument('--csv', default='throughput.csv')
+    parser.add_argument('--yield-csv', default=None)
+    parser.add_argument('--plot', default=None, help='write the throughput plot (PDF)')
+    args = parser.parse_args()
+
+    result = analyze_throughput(args.log_dir, args.marker.encode(), args.bin, args.stall, args.fraction,
+                                args.min_bins)
+    if result is None:
+        print(f"Warning: no logs in {args.log_dir}")
+    else:
+        print_throughput_summary(result)
+        write_series_csv(args.csv, result)
+        print(f"Saved: {args.csv}")
+        if args.yield_csv:
+            write_yield_csv(args.yield_csv, result)
+            print(f"Saved: {args.yield_csv}")
+        if args.plot:
+            plot_throughput(result, args.plot)
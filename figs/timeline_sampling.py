@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+累计曲线（bug发现时间线）的降采样
+事件数很多时，逐点绘制会让PDF非常大；先合并同一时刻的台阶，再用LTTB或等宽分箱
+把曲线降到固定的点数，图的大小与事件数无关
+"""
+
+import numpy as np
+
+# 每条时间线最多绘制的点数
+MAX_TIMELINE_POINTS = 500
+
+
+def compress_steps(x, y):
+    """合并x相同的连续点，只保留每个时刻的最后一个（累计值最大的）点"""
+    if len(x) < 2:
+        return x, y
+    keep = np.append(x[1:] != x[:-1], True)
+    return x[keep], y[keep]
+
+
+def bin_cumulative(x, y, bins):
+    """等宽分箱：取每个箱右边界处的累计值（x需要递增）"""
+    if len(x) <= bins + 1:
+        return x, y
+    edges = np.linspace(x[0], x[-1], bins + 1)
+    index = np.searchsorted(x, edges, side='right') - 1
+    return edges, y[index]
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets降采样，保留首尾点和视觉上最显著的拐点"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # 中间的n-2个点分成n_out-2个桶
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = bounds[i], bounds[i + 1]
+        # 下一个桶的平均点（最后一个桶用终点）
+        next_end = bounds[i + 2] if i + 2 < len(bounds) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev]) -
+                      (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return x[selected], y[selected]
+
+
+def downsample_timeline(x, y, max_points=MAX_TIMELINE_POINTS, method='lttb'):
+    """点数超过max_points时先合并同一时刻的台阶，仍然超过时用lttb或bins降采样；点数不多的时间线原样返回"""
+    if len(x) <= max_points:
+        return x, y
+    x, y = compress_steps(np.asarray(x), np.asarray(y))
+    if len(x) <= max_points:
+        return x, y
+    if method == 'bins':
+        return bin_cumulative(x, y, max_points - 1)
+    return lttb(x, y, max_points)
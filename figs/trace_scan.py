@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+trace.txt的流式扫描
+按固定大小的块读取，内存占用只与块大小有关，与trace.txt的大小无关；
+跨块的记录行只保留几个字节的状态，扫描可以从上次的位置继续；.gz/.xz/.zst压缩的trace.txt在读取时解压
+
+用法：
+    python trace_scan.py /path/to/trace.txt
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+from log_source import compression, open_compressed
+
+# 每个测试用例执行时打印的mat_shapes：以[[开头、同一行内有]]的行（与原来的 ^\[\[.*?\]\] 一致）
+# 先用bytes.count统计以[[开头的行，再减去同一行内没有]]的行；
+# 后者以字面量\n[[开头，re可以用快速的子串查找跳过其他内容，且只为极少数不完整的行构造匹配
+UNCLOSED_LINE = re.compile(rb'\n\[\[(?![^\n]*\]\])')
+
+TRACE_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def _is_record(line):
+    return line.startswith(b'[[') and line.find(b']]', 2) >= 0
+
+
+def _compact_tail(line):
+    """把不完整的最后一行压缩为至多4个字节，保留判断它是否为记录所需的全部信息"""
+    if not line.startswith(b'[['):
+        # 不足两个字节时原样保留；否则行首已确定不是[[，后续内容不影响结果
+        return line[:2]
+    if line.find(b']]', 2) >= 0:
+        return b'[[]]'
+    # 保留最后一个字节，用于识别跨块的]]
+    return b'[[' + line[2:][-1:]
+
+
+def new_trace_state():
+    """扫描状态：已读取的字节数、已完成行中的记录数、未完成的最后一行"""
+    return {'offset': 0, 'records': 0, 'tail': b''}
+
+
+def scan_trace_stream(stream, state=None, chunk_size=TRACE_CHUNK_SIZE):
+    """从二进制流的当前位置继续扫描，返回更新后的状态（不修改传入的state）"""
+    state = dict(state or new_trace_state())
+    offset, records, tail = state['offset'], state['records'], state['tail']
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        offset += len(chunk)
+        # 与文本模式的通用换行一致：单独的\r也是行结束符（\r\n多出的空行不影响计数）
+        if b'\r' in chunk:
+            chunk = chunk.replace(b'\r', b'\n')
+
+        last = chunk.rfind(b'\n')
+        if last < 0:
+            tail = _compact_tail(tail + chunk)
+            continue
+        first = chunk.find(b'\n')
+        records += _is_record(tail + chunk[:first])
+        # 从第一个换行开始：统计在[first, last)内的换行之后开始的完整行
+        records += chunk.count(b'\n[[', first, last + 1)
+        records -= len(UNCLOSED_LINE.findall(chunk, first, last + 1))
+        tail = _compact_tail(chunk[last + 1:])
+
+    state.update(offset=offset, records=records, tail=tail)
+    return state
+
+
+def trace_record_count(state):
+    """状态对应的记录总数（文件末尾没有换行的最后一行也计入）"""
+    return state['records'] + _is_record(state['tail'])
+
+
+def count_trace_records(trace_file, state=None, chunk_size=TRACE_CHUNK_SIZE):
+    """统计trace.txt中的测试用例数，并报告扫描速度
+
+    传入上次返回的state时，只读取state['offset']之后追加的字节（压缩文件中的偏移是解压后的，需要解压跳过）
+    """
+    start = time.perf_counter()
+    with open_compressed(trace_file, compression(Path(trace_file).name)) as f:
+        if state:
+            f.seek(state['offset'])
+        new_state = scan_trace_stream(f, state, chunk_size)
+    seconds = time.perf_counter() - start
+    return trace_result(new_state, new_state['offset'] - (state['offset'] if state else 0), seconds)
+
+
+def trace_result(new_state, scanned, seconds):
+    """扫描结果：记录总数、本次扫描的字节数和速度、新的状态"""
+    return {
+        'records': trace_record_count(new_state),
+        'bytes': scanned,
+        'seconds': seconds,
+        'bytes_per_sec': scanned / seconds if seconds > 0 else 0.0,
+        'state': new_state
+    }
+
+
+def format_throughput(trace):
+    """例如：1024.0 MB in 2.10 s (487.6 MB/s)"""
+    mb = trace['bytes'] / 1e6
+    return f"{mb:.1f} MB in {trace['seconds']:.2f} s ({trace['bytes_per_sec'] / 1e6:.1f} MB/s)"
+
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        trace = count_trace_records(Path(path))
+        print(f"{path}: {trace['records']} testcases, {format_throughput(trace)}")